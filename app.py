@@ -15,6 +15,8 @@ warnings.filterwarnings('ignore')
 sys.path.insert(0, str(Path(__file__).parent))
 
 from src.chatbot import StudentSupportChatbot
+from src.embeddings import DELETE_UNSUPPORTED_MESSAGE
+from src.jobs import JobQueue, IngestionWorker, save_upload
 from src.utils import load_config
 
 
@@ -236,6 +238,72 @@ def load_chatbot():
         return None
 
 
+@st.cache_resource(show_spinner=False)
+def start_ingestion_worker(_chatbot):
+    """
+    Khởi động worker ingest nền (một lần cho mỗi process Streamlit)
+    
+    Worker dùng chung EmbeddingManager với chatbot nên tài liệu mới được
+    tìm thấy ngay khi job xong, và query vẫn được trả lời trong lúc ingest.
+    """
+    config = load_config()
+    jobs_config = config.get('jobs', {})
+    job_queue = JobQueue(
+        jobs_config.get('db_path', './data/jobs.sqlite3'),
+        stale_after=jobs_config.get('stale_after', 600.0),
+    )
+    worker = IngestionWorker(
+        config,
+        job_queue,
+        _chatbot.embedding_manager,
+        max_workers=jobs_config.get('max_workers', 1),
+        poll_interval=jobs_config.get('poll_interval', 2.0),
+    )
+    worker.start()
+    return job_queue
+
+
+def render_upload_panel(config: dict, chatbot):
+    """
+    Sidebar: upload tài liệu vào hàng đợi ingest và xem tiến độ các job
+    """
+    jobs_config = config.get('jobs', {})
+    if not chatbot.embedding_manager.supports_delete():
+        with st.sidebar:
+            st.info(f"📤 Upload tài liệu bị tắt: {DELETE_UNSUPPORTED_MESSAGE}")
+        return
+    job_queue = start_ingestion_worker(chatbot)
+    
+    with st.sidebar:
+        with st.expander("📤 Thêm tài liệu"):
+            uploaded_files = st.file_uploader(
+                "Chọn file",
+                type=config['document_processing']['supported_formats'],
+                accept_multiple_files=True,
+                key="upload_files",
+            )
+            
+            if uploaded_files and st.button("📥 Đưa vào hàng đợi", use_container_width=True):
+                upload_dir = jobs_config.get('upload_dir', './data/documents/uploads')
+                for uploaded_file in uploaded_files:
+                    path = save_upload(uploaded_file.name, uploaded_file.getvalue(), upload_dir)
+                    job_queue.enqueue(path)
+                st.success(f"Đã thêm {len(uploaded_files)} file vào hàng đợi")
+            
+            jobs = job_queue.list_jobs(limit=5)
+            if jobs:
+                st.caption("Job gần đây")
+            for job in jobs:
+                name = Path(job['file_path']).name
+                if job['status'] == 'failed':
+                    st.error(f"{name}: {job['error']}")
+                else:
+                    st.progress(job['progress'], text=f"{name}: {job['message']}")
+            
+            if st.button("🔄 Cập nhật trạng thái", use_container_width=True):
+                st.rerun()
+
+
 def display_chat_message(role: str, content: str, sources: list = None):
     """
     Hiển thị chat message
@@ -358,6 +426,10 @@ def main():
         st.stop()
         return
     
+    # Upload tài liệu (chỉ bật khi app chạy nội bộ, xem config jobs.upload_enabled)
+    if config.get('jobs', {}).get('upload_enabled', False):
+        render_upload_panel(config, st.session_state.chatbot)
+    
     # Welcome message khi mới vào
     if len(st.session_state.messages) == 0:
         st.info("""
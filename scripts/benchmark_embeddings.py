@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Script benchmark tốc độ encode documents (vectors/s)
+So sánh các batch_size, số process và bucket theo độ dài để chọn cấu hình/phần cứng ingest
+"""
+
+import sys
+import time
+import argparse
+from copy import deepcopy
+from itertools import islice
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.utils import load_config, load_environment
+from src.chunk_store import ChunkStore
+from src.document_processor import DocumentProcessor
+from src.embeddings import EmbeddingManager
+from src.batch_encoder import BatchEncoder
+
+
+def load_texts(config, docs_dir, limit):
+    """
+    Lấy texts để benchmark: từ chunk store nếu có, nếu không thì xử lý documents
+    """
+    chunk_store = ChunkStore(config['document_processing'].get('chunk_store_dir', './data/chunks'))
+    if chunk_store.exists():
+        documents = chunk_store.iter_documents()
+    else:
+        processor = DocumentProcessor(config)
+        documents = processor.iter_chunks(docs_dir)
+    return [doc.page_content for doc in islice(documents, limit)]
+
+
+def main():
+    """
+    Main function
+    """
+    parser = argparse.ArgumentParser(description="Benchmark embedding encode")
+    parser.add_argument('--docs-dir', default="data/documents", help="Thư mục documents (khi chưa có chunk store)")
+    parser.add_argument('--limit', type=int, default=2000, help="Số chunks dùng để benchmark")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[16, 32, 64])
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2])
+    args = parser.parse_args()
+    
+    config = deepcopy(load_config())
+    # Đo model thật, không qua cache
+    config['embedding']['cache'] = {'enabled': False}
+    config['embedding']['query_cache'] = {'enabled': False}
+    
+    texts = load_texts(config, args.docs_dir, args.limit)
+    if not texts:
+        print("❌ Không có chunks để benchmark")
+        return
+    
+    model = EmbeddingManager(config, load_environment()).encoder.embeddings
+    
+    print("=" * 70)
+    print(f"⏱️  BENCHMARK EMBEDDING ({config['embedding']['model_name']}, {len(texts)} chunks)")
+    print("=" * 70)
+    print(f"   {'Process':>7} {'Batch':>6} {'Bucket':>7} {'Thời gian':>10} {'vectors/s':>10}")
+    
+    for num_processes in args.processes:
+        for batch_size in args.batch_sizes:
+            for length_bucketing in (False, True):
+                encoder = BatchEncoder(model, batch_size, num_processes, length_bucketing)
+                # Warm-up (khởi động pool, load model ở các process)
+                encoder.embed_documents(texts[:batch_size * max(num_processes, 1) + 1])
+                
+                start = time.perf_counter()
+                encoder.embed_documents(texts)
+                elapsed = time.perf_counter() - start
+                encoder.close()
+                
+                print(f"   {num_processes:>7} {batch_size:>6} {'có' if length_bucketing else 'không':>7} "
+                      f"{elapsed:>9.2f}s {len(texts) / elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Script benchmark các loader backend trên corpus documents
+So sánh thời gian extract và độ dài text của từng backend theo định dạng
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.utils import load_config
+from src.loaders import LOADERS
+
+
+def benchmark_backend(loader, files, options):
+    """
+    Load tất cả files bằng một backend
+    
+    Returns:
+        (tổng thời gian, tổng số ký tự, số file lỗi)
+    """
+    total_chars = 0
+    errors = 0
+    start = time.perf_counter()
+    
+    for file_path in files:
+        try:
+            documents = loader(str(file_path), options)
+            total_chars += sum(len(doc.page_content) for doc in documents)
+        except ImportError:
+            raise
+        except Exception as e:
+            errors += 1
+            print(f"   ⚠️  {file_path.name}: {e}")
+    
+    return time.perf_counter() - start, total_chars, errors
+
+
+def main():
+    """
+    Main function
+    """
+    parser = argparse.ArgumentParser(description="Benchmark loader backends")
+    parser.add_argument('--docs-dir', default="data/documents", help="Thư mục documents")
+    args = parser.parse_args()
+    
+    config = load_config()
+    options = config['document_processing']
+    docs_dir = Path(args.docs_dir)
+    
+    print("=" * 70)
+    print("⏱️  BENCHMARK LOADER BACKENDS")
+    print("=" * 70)
+    
+    for extension, backends in LOADERS.items():
+        files = sorted(docs_dir.rglob(f"*.{extension}"))
+        if not files:
+            continue
+        
+        print(f"\n📄 .{extension} ({len(files)} file)")
+        print(f"   {'Backend':<14} {'Thời gian':>10} {'s/file':>8} {'Ký tự':>12} {'Lỗi':>5}")
+        
+        for name, loader in backends.items():
+            try:
+                elapsed, total_chars, errors = benchmark_backend(loader, files, options)
+            except ImportError as e:
+                print(f"   {name:<14} (thiếu thư viện: {e.name})")
+                continue
+            
+            print(f"   {name:<14} {elapsed:>9.2f}s {elapsed / len(files):>8.3f} "
+                  f"{total_chars:>12,} {errors:>5}")
+
+
+if __name__ == "__main__":
+    main()
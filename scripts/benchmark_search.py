@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Script benchmark tìm kiếm nhiều query
+So sánh throughput (queries/s) của similarity_search_with_score từng query với similarity_search_batch
+"""
+
+import sys
+import time
+import argparse
+from copy import deepcopy
+from itertools import islice
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.utils import load_config, load_environment, batched
+from src.chunk_store import ChunkStore
+from src.embeddings import EmbeddingManager
+
+SAMPLE_QUERIES = [
+    "Điều kiện tốt nghiệp USSH?",
+    "Quy định về điểm danh?",
+    "Đăng ký môn học thế nào?",
+    "Học phí và miễn giảm?",
+    "Liên hệ phòng CTSV?",
+    "Sinh viên bị cảnh báo học vụ khi nào?",
+    "Thủ tục bảo lưu kết quả học tập",
+    "Điểm rèn luyện được tính như thế nào?",
+]
+
+
+def load_queries(config, queries_file, limit):
+    """
+    Lấy queries: từ file (mỗi dòng một query), từ câu đầu của các chunks, hoặc các câu hỏi mẫu
+    """
+    if queries_file:
+        with open(queries_file, 'r', encoding='utf-8') as f:
+            queries = [line.strip() for line in f if line.strip()]
+    else:
+        chunk_store = ChunkStore(config['document_processing'].get('chunk_store_dir', './data/chunks'))
+        if chunk_store.exists():
+            documents = islice(chunk_store.iter_documents(), limit)
+            queries = [doc.page_content.strip().split('\n')[0][:200] for doc in documents]
+        else:
+            print("⚠️  Chưa có chunk store, dùng các câu hỏi mẫu")
+            queries = SAMPLE_QUERIES
+    
+    # Lặp lại cho đủ số query (các query trùng vẫn được encode vì đã tắt cache)
+    return [queries[i % len(queries)] for i in range(limit)]
+
+
+def main():
+    """
+    Main function
+    """
+    parser = argparse.ArgumentParser(description="Benchmark tìm kiếm nhiều query")
+    parser.add_argument('--queries-file', help="File queries, mỗi dòng một query")
+    parser.add_argument('--limit', type=int, default=256, help="Số queries")
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[8, 32, 128])
+    args = parser.parse_args()
+    
+    config = deepcopy(load_config())
+    # Đo model thật, không qua cache
+    config['embedding']['cache'] = {'enabled': False}
+    config['embedding']['query_cache'] = {'enabled': False}
+    
+    embedding_manager = EmbeddingManager(config, load_environment())
+    if not embedding_manager.load_vectorstore():
+        return
+    
+    queries = load_queries(config, args.queries_file, args.limit)
+    embedding_manager.similarity_search_with_score(queries[0], k=args.k)
+    
+    print("=" * 70)
+    print(f"🔎 BENCHMARK TÌM KIẾM ({embedding_manager.vectorstore_type}, {len(queries)} queries, k={args.k})")
+    print("=" * 70)
+    
+    start = time.perf_counter()
+    single = [embedding_manager.similarity_search_with_score(query, k=args.k) for query in queries]
+    single_seconds = time.perf_counter() - start
+    print(f"   {'Từng query':<16} {len(queries) / single_seconds:>9.1f} queries/s")
+    
+    for batch_size in args.batch_sizes:
+        start = time.perf_counter()
+        results = []
+        for batch in batched(queries, batch_size):
+            results.extend(embedding_manager.similarity_search_batch(batch, k=args.k))
+        seconds = time.perf_counter() - start
+        
+        # Kết quả phải giống tìm kiếm từng query (so top-1)
+        same_top = sum(
+            1 for expected, found in zip(single, results)
+            if expected and found and expected[0][0].page_content == found[0][0].page_content
+        )
+        print(f"   {f'Batch {batch_size}':<16} {len(queries) / seconds:>9.1f} queries/s "
+              f"(x{single_seconds / seconds:.1f}, top-1 khớp {same_top}/{len(queries)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Script đánh giá giảm số chiều embedding
+So sánh recall@k của PCA/truncate ở nhiều số chiều với tìm kiếm chính xác trên vector đầy đủ
+"""
+
+import sys
+import argparse
+from itertools import islice
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.utils import load_config, load_environment
+from src.chunk_store import ChunkStore
+from src.embeddings import EmbeddingManager
+from src.projection import EmbeddingProjection, recall_at_k
+
+
+def main():
+    """
+    Main function
+    """
+    parser = argparse.ArgumentParser(description="Đánh giá projection embedding (recall@k)")
+    parser.add_argument('--limit', type=int, default=20000, help="Số chunks dùng để đánh giá")
+    parser.add_argument('--queries', type=int, default=500, help="Số chunks dùng làm query")
+    parser.add_argument('--dims', type=int, nargs='+', default=[64, 128, 256, 384])
+    parser.add_argument('--methods', nargs='+', default=['pca'], choices=['pca', 'truncate'])
+    parser.add_argument('--k', type=int, nargs='+', default=[5, 10])
+    args = parser.parse_args()
+    
+    config = load_config()
+    chunk_store = ChunkStore(config['document_processing'].get('chunk_store_dir', './data/chunks'))
+    if not chunk_store.exists():
+        print(f"❌ Chưa có chunk store tại {chunk_store.directory} (chạy process_documents.py --save-chunks)")
+        return
+    
+    texts = [doc.page_content for doc in islice(chunk_store.iter_documents(), args.limit)]
+    if len(texts) <= args.queries:
+        print(f"❌ Cần nhiều hơn {args.queries} chunks (có {len(texts)})")
+        return
+    
+    # Vector đầy đủ (qua embedding cache nếu bật, không qua projection của index)
+    embedding_manager = EmbeddingManager(config, load_environment())
+    print(f"🔢 Embed {len(texts)} chunks...")
+    full = np.asarray(embedding_manager.projected.embeddings.embed_documents(texts), dtype=np.float32)
+    full /= np.clip(np.linalg.norm(full, axis=1, keepdims=True), 1e-12, None)
+    queries, corpus = full[:args.queries], full[args.queries:]
+    
+    print("=" * 70)
+    print(f"📐 RECALL@K SO VỚI {full.shape[1]} CHIỀU ({len(corpus)} chunks, {len(queries)} query)")
+    print("=" * 70)
+    recall_headers = " ".join(f"{f'R@{k}':>7}" for k in args.k)
+    print(f"   {'Method':<9} {'Chiều':>6} {'Phương sai':>10} {recall_headers} {'Index':>9}")
+    
+    for method in args.methods:
+        for dim in args.dims:
+            if dim > full.shape[1]:
+                continue
+            projection = EmbeddingProjection.fit(corpus, dim, method=method)
+            projected_corpus = projection.transform(corpus)
+            projected_queries = projection.transform(queries)
+            
+            recalls = " ".join(
+                f"{recall_at_k(corpus, queries, projected_corpus, projected_queries, k=k):>7.3f}"
+                for k in args.k
+            )
+            variance = projection.info.get('explained_variance')
+            variance = f"{variance:.3f}" if variance is not None else "-"
+            size_mb = len(full) * dim * 4 / 1024 / 1024
+            print(f"   {method:<9} {dim:>6} {variance:>10} {recalls} {size_mb:>7.1f}MB")
+    
+    print(f"\n   Đầy đủ: {len(full) * full.shape[1] * 4 / 1024 / 1024:.1f}MB. "
+          f"Chọn số chiều trong embedding.projection.dimension rồi build lại vectorstore.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Script export embedding model sang ONNX và benchmark so với PyTorch
+
+    python scripts/export_onnx.py export --quantize
+    python scripts/export_onnx.py benchmark
+    python scripts/export_onnx.py check      # so vector ONNX với vectorstore hiện có
+
+Sau khi export, đặt embedding.provider: "onnx" trong config.yaml để dùng ONNX Runtime.
+"""
+
+import sys
+import time
+import argparse
+import multiprocessing
+from copy import deepcopy
+from itertools import islice
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.utils import load_config, load_environment
+from src.chunk_store import ChunkStore
+from src.onnx_embeddings import export_onnx, QUANTIZED_MODEL_FILE
+
+SAMPLE_QUERIES = [
+    "Điều kiện tốt nghiệp USSH?",
+    "Quy định về điểm danh?",
+    "Đăng ký môn học thế nào?",
+    "Học phí và miễn giảm?",
+    "Liên hệ phòng CTSV?",
+    "Sinh viên bị cảnh báo học vụ khi nào?",
+    "Thủ tục bảo lưu kết quả học tập",
+    "Điểm rèn luyện được tính như thế nào?",
+]
+
+
+def parse_args():
+    """
+    Parse command line arguments
+    """
+    parser = argparse.ArgumentParser(description="Embedding ONNX Runtime")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    export_parser = subparsers.add_parser('export', help="Export model sang ONNX")
+    export_parser.add_argument('--model', help="Model sentence-transformers (mặc định embedding.model_name)")
+    export_parser.add_argument('--output-dir', help="Thư mục output (mặc định embedding.onnx.model_dir)")
+    export_parser.add_argument('--quantize', action='store_true', help="Tạo thêm bản lượng tử hóa int8")
+    
+    benchmark_parser = subparsers.add_parser('benchmark', help="So sánh PyTorch và ONNX")
+    benchmark_parser.add_argument('--limit', type=int, default=256, help="Số chunks để đo throughput và cosine")
+    benchmark_parser.add_argument('--repeat', type=int, default=5, help="Số lần lặp các query mẫu")
+    
+    subparsers.add_parser('check', help="Kiểm tra vector ONNX khớp vectorstore hiện có")
+    
+    return parser.parse_args()
+
+
+def peak_rss_mb():
+    """
+    Bộ nhớ RSS lớn nhất của process hiện tại (MB), None nếu không đo được
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_backend(backend, config, texts, queries, repeat):
+    """
+    Load một backend và đo (chạy trong process riêng để đo RSS độc lập)
+    """
+    start = time.perf_counter()
+    if backend == 'pytorch':
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        
+        embeddings = HuggingFaceEmbeddings(
+            model_name=config['embedding']['model_name'],
+            model_kwargs={'device': 'cpu'},
+            encode_kwargs={'normalize_embeddings': True, 'batch_size': config['embedding'].get('batch_size', 32)},
+        )
+    else:
+        from src.onnx_embeddings import OnnxEmbeddings
+        
+        onnx_config = config['embedding'].get('onnx', {})
+        embeddings = OnnxEmbeddings(
+            onnx_config.get('model_dir', './models/onnx'),
+            quantized=backend == 'onnx-int8',
+            batch_size=config['embedding'].get('batch_size', 32),
+            num_threads=onnx_config.get('num_threads'),
+        )
+    load_seconds = time.perf_counter() - start
+    
+    embeddings.embed_query(queries[0])
+    latencies = []
+    for _ in range(repeat):
+        for query in queries:
+            query_start = time.perf_counter()
+            embeddings.embed_query(query)
+            latencies.append((time.perf_counter() - query_start) * 1000)
+    
+    start = time.perf_counter()
+    vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    encode_seconds = time.perf_counter() - start
+    
+    return {
+        'load_seconds': load_seconds,
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'vectors_per_second': len(texts) / encode_seconds if encode_seconds else 0.0,
+        'rss_mb': peak_rss_mb(),
+        'vectors': vectors,
+    }
+
+
+def benchmark(config, limit, repeat):
+    """
+    Đo latency query, throughput, RSS và cosine với vector PyTorch
+    """
+    chunk_store = ChunkStore(config['document_processing'].get('chunk_store_dir', './data/chunks'))
+    if chunk_store.exists():
+        texts = [doc.page_content for doc in islice(chunk_store.iter_documents(), limit)]
+    else:
+        print("⚠️  Chưa có chunk store, dùng các câu hỏi mẫu để so sánh vector")
+        texts = SAMPLE_QUERIES
+    
+    backends = ['pytorch', 'onnx']
+    model_dir = Path(config['embedding'].get('onnx', {}).get('model_dir', './models/onnx'))
+    if (model_dir / QUANTIZED_MODEL_FILE).exists():
+        backends.append('onnx-int8')
+    
+    # Mỗi backend chạy trong process riêng: RSS không bị cộng dồn
+    context = multiprocessing.get_context('spawn')
+    results = {}
+    for backend in backends:
+        print(f"⏱️  Đang đo {backend}...")
+        with context.Pool(1) as pool:
+            results[backend] = pool.apply(run_backend, (backend, config, texts, SAMPLE_QUERIES, repeat))
+    
+    reference = results['pytorch']['vectors']
+    print("=" * 70)
+    print(f"⏱️  BENCHMARK EMBEDDING ({config['embedding']['model_name']}, {len(texts)} texts)")
+    print("=" * 70)
+    print(f"   {'Backend':<10} {'Load':>7} {'p50':>8} {'p95':>8} {'vectors/s':>10} {'RSS':>8} "
+          f"{'cos TB':>7} {'cos min':>7}")
+    
+    for backend, result in results.items():
+        cosines = (result['vectors'] * reference).sum(axis=1)
+        rss = f"{result['rss_mb']:.0f}MB" if result['rss_mb'] is not None else "-"
+        print(f"   {backend:<10} {result['load_seconds']:>6.1f}s {result['p50_ms']:>6.1f}ms "
+              f"{result['p95_ms']:>6.1f}ms {result['vectors_per_second']:>10.1f} {rss:>8} "
+              f"{cosines.mean():>7.4f} {cosines.min():>7.4f}")
+
+
+def main():
+    """
+    Main function
+    """
+    args = parse_args()
+    config = load_config()
+    
+    if args.command == 'export':
+        model_name = args.model or config['embedding']['model_name']
+        output_dir = args.output_dir or config['embedding'].get('onnx', {}).get('model_dir', './models/onnx')
+        onnx_config = export_onnx(model_name, output_dir, quantize=args.quantize)
+        print(f"✅ Đã export ({onnx_config['dimension']} chiều, pooling {onnx_config['pooling']}) tại {output_dir}")
+    
+    elif args.command == 'benchmark':
+        benchmark(config, args.limit, args.repeat)
+    
+    elif args.command == 'check':
+        from src.embeddings import EmbeddingManager
+        
+        config = deepcopy(config)
+        config['embedding']['provider'] = 'onnx'
+        config['embedding'].setdefault('onnx', {})['verify_on_load'] = False
+        
+        embedding_manager = EmbeddingManager(config, load_environment())
+        if not embedding_manager.load_vectorstore():
+            return
+        report = embedding_manager.check_embedding_compatibility(sample_size=64)
+        if not report['compatible']:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Script quản lý hàng đợi ingest (cùng hàng đợi với mục upload trong app.py)
+
+    python scripts/ingest_jobs.py add data/documents/moi.pdf ...
+    python scripts/ingest_jobs.py status
+    python scripts/ingest_jobs.py run            # xử lý hết job đang chờ rồi thoát
+    python scripts/ingest_jobs.py run --watch    # chạy liên tục như worker nền
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.utils import load_config, load_environment
+from src.embeddings import EmbeddingManager, DELETE_UNSUPPORTED_MESSAGE
+from src.jobs import JobQueue, IngestionWorker
+
+
+def parse_args():
+    """
+    Parse command line arguments
+    """
+    parser = argparse.ArgumentParser(description="Hàng đợi ingest documents")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    add_parser = subparsers.add_parser('add', help="Thêm file vào hàng đợi")
+    add_parser.add_argument('files', nargs='+', help="Các file cần index")
+    
+    status_parser = subparsers.add_parser('status', help="Xem trạng thái các job gần đây")
+    status_parser.add_argument('--limit', type=int, default=20)
+    
+    run_parser = subparsers.add_parser('run', help="Xử lý các job đang chờ")
+    run_parser.add_argument('--watch', action='store_true', help="Chạy liên tục, không thoát khi hết job")
+    
+    return parser.parse_args()
+
+
+def main():
+    """
+    Main function
+    """
+    args = parse_args()
+    config = load_config()
+    jobs_config = config.get('jobs', {})
+    job_queue = JobQueue(
+        jobs_config.get('db_path', './data/jobs.sqlite3'),
+        stale_after=jobs_config.get('stale_after', 600.0),
+    )
+    
+    if args.command == 'add':
+        for file_path in args.files:
+            if not Path(file_path).exists():
+                print(f"❌ Không tìm thấy file: {file_path}")
+                continue
+            job_id = job_queue.enqueue(file_path)
+            print(f"📥 Job {job_id}: {file_path}")
+    
+    elif args.command == 'status':
+        for job in job_queue.list_jobs(limit=args.limit):
+            detail = job['error'] if job['status'] == 'failed' else job['message']
+            print(f"[{job['id']:>4}] {job['status']:<8} {job['progress'] * 100:5.1f}%  "
+                  f"{job['file_path']}  {detail}")
+    
+    elif args.command == 'run':
+        embedding_manager = EmbeddingManager(config, load_environment())
+        embedding_manager.load_vectorstore()
+        if not embedding_manager.supports_delete():
+            print(f"❌ {DELETE_UNSUPPORTED_MESSAGE}")
+            sys.exit(1)
+        worker = IngestionWorker(
+            config,
+            job_queue,
+            embedding_manager,
+            max_workers=jobs_config.get('max_workers', 1),
+            poll_interval=jobs_config.get('poll_interval', 2.0),
+        )
+        
+        if args.watch:
+            print("👷 Worker đang chạy (Ctrl+C để dừng)...")
+            worker.start()
+            try:
+                while True:
+                    time.sleep(1)
+            except KeyboardInterrupt:
+                print("\n⏹️  Đang dừng sau job hiện tại...")
+                worker.stop()
+        else:
+            job_queue.requeue_stale()
+            processed = worker.run_pending()
+            print(f"✅ Đã xử lý {processed} job")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,81 +4,709 @@ Script để OCR các PDF scan trong thư mục documents
 """
 
 import sys
+import argparse
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import pdfplumber
 import pytesseract
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
 from PIL import Image
 import os
+import time
+import hashlib
+import difflib
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from tqdm import tqdm
 
+from src.utils import load_config
+from src.manifest import file_sha256
 
-def is_pdf_scanned(pdf_path):
+
+# Cấu hình OCR mặc định, bị ghi đè bởi mục 'ocr' trong config.yaml và CLI
+DEFAULT_OCR_OPTIONS = {
+    'lang': 'vie+eng',
+    'dpi': 300,
+    'workers': 1,
+    'window_size': 4,
+    'cache_dir': 'data/ocr_cache',
+    'cache_max_mb': 512,
+    'min_text_chars': 50,
+    'min_text_density': 0.5,
+    # Tiền xử lý ảnh trước khi OCR
+    'grayscale': False,
+    'threshold': None,  # None, 'otsu' hoặc ngưỡng 0-255
+    'deskew': False,
+    # dpi: 'auto' chọn trong auto_dpi_candidates theo kích thước trang và confidence
+    'auto_dpi_candidates': [150, 200, 300],
+    'auto_dpi_min_confidence': 80,
+    'max_page_pixels': 4000,  # Cạnh dài tối đa của ảnh rasterize (pixel)
+    # 'pytesseract' (mỗi trang một process tesseract) hoặc 'tesserocr' (engine in-process)
+    'backend': 'pytesseract',
+}
+
+# Engine tesserocr được giữ suốt đời của mỗi process (key: ngôn ngữ), để
+# model ngôn ngữ chỉ load một lần thay vì một lần mỗi trang
+_tesserocr_engines = {}
+
+
+def resolve_backend(backend):
+    """
+    Kiểm tra backend OCR có dùng được không, fallback về pytesseract nếu không
+    """
+    if backend == 'tesserocr':
+        try:
+            import tesserocr  # noqa: F401
+        except ImportError:
+            print("⚠️  Không import được tesserocr, dùng pytesseract")
+            return 'pytesseract'
+    elif backend != 'pytesseract':
+        raise ValueError(f"OCR backend không được hỗ trợ: {backend}")
+    return backend
+
+
+def get_tesserocr_engine(lang):
+    """
+    Lấy (hoặc khởi tạo) engine tesserocr của process hiện tại
+    """
+    engine = _tesserocr_engines.get(lang)
+    if engine is None:
+        import tesserocr
+        engine = tesserocr.PyTessBaseAPI(lang=lang)
+        _tesserocr_engines[lang] = engine
+    return engine
+
+
+def init_ocr_worker(options):
     """
-    Kiểm tra xem PDF có phải là scan (không có text) không
+    Initializer của worker process: khởi tạo sẵn engine in-process
+    """
+    if options['backend'] == 'tesserocr':
+        get_tesserocr_engine(options['lang'])
+
+
+def image_to_text(image, options):
+    """
+    OCR một ảnh bằng backend đã cấu hình
+    
+    Với tesserocr, ảnh được truyền thẳng vào engine đang chạy trong process,
+    không tạo process tesseract mới và không ghi file ảnh tạm.
+    """
+    if options['backend'] == 'tesserocr':
+        engine = get_tesserocr_engine(options['lang'])
+        engine.SetImage(image)
+        return engine.GetUTF8Text()
+    
+    return pytesseract.image_to_string(image, lang=options['lang'])
+
+
+class OCRCache:
+    """
+    Cache kết quả OCR theo từng trang, địa chỉ hóa theo nội dung
+    
+    Key gồm hash của PDF, số trang và các tham số ảnh hưởng tới kết quả
+    (DPI, ngôn ngữ...). Mỗi trang là một file text nhỏ; khi tổng dung lượng
+    vượt giới hạn, các trang lâu nhất không được dùng bị xóa trước.
+    """
+    
+    def __init__(self, cache_dir, max_bytes):
+        """
+        Args:
+            cache_dir: Thư mục chứa cache
+            max_bytes: Dung lượng tối đa của cache (bytes)
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.total_bytes = sum(f.stat().st_size for f in self._iter_entries())
+    
+    @staticmethod
+    def make_key(pdf_hash, page_no, signature):
+        """
+        Tạo key cache cho một trang
+        
+        Args:
+            pdf_hash: SHA-256 của file PDF
+            page_no: Số trang (1-based)
+            signature: Chuỗi mô tả tham số OCR (xem ocr_signature)
+        """
+        return hashlib.sha256(f"{pdf_hash}:{page_no}:{signature}".encode('utf-8')).hexdigest()
+    
+    def _path(self, key):
+        return self.cache_dir / key[:2] / f"{key}.txt"
+    
+    def _iter_entries(self):
+        return self.cache_dir.glob("*/*.txt")
+    
+    def get(self, key):
+        """
+        Lấy text đã cache (None nếu chưa có)
+        """
+        path = self._path(key)
+        try:
+            text = path.read_text(encoding='utf-8')
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        
+        # Cập nhật mtime để eviction giữ lại các trang vừa được dùng
+        os.utime(path, None)
+        self.hits += 1
+        return text
+    
+    def put(self, key, text):
+        """
+        Lưu text của một trang, evict nếu vượt dung lượng
+        """
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(text, encoding='utf-8')
+        old_size = path.stat().st_size if path.exists() else 0
+        os.replace(tmp_path, path)
+        
+        self.total_bytes += path.stat().st_size - old_size
+        if self.total_bytes > self.max_bytes:
+            self.evict()
+    
+    def evict(self):
+        """
+        Xóa các trang ít được dùng nhất cho tới khi còn dưới 90% dung lượng
+        """
+        target = int(self.max_bytes * 0.9)
+        entries = []
+        for path in self._iter_entries():
+            stat = path.stat()
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        
+        self.total_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self.total_bytes <= target:
+                break
+            path.unlink(missing_ok=True)
+            self.total_bytes -= size
+            self.evictions += 1
+    
+    def stats(self):
+        """
+        Thống kê cache
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'size_mb': self.total_bytes / (1 << 20),
+        }
+
+
+def ocr_signature(options):
+    """
+    Chuỗi mô tả các tham số ảnh hưởng tới kết quả OCR (dùng trong key cache)
+    
+    Với dpi 'auto', chuỗi này chỉ là key của DPI đã chọn cho PDF (xem
+    ocr_pdf); key của từng trang dùng DPI thực tế.
+    """
+    signature = f"dpi={options['dpi']}:lang={options['lang']}"
+    if options['dpi'] == 'auto':
+        signature += f":candidates={options['auto_dpi_candidates']}" \
+                     f":conf={options['auto_dpi_min_confidence']}" \
+                     f":max_pixels={options['max_page_pixels']}"
+    if options['grayscale'] or options['threshold'] is not None or options['deskew']:
+        signature += f":gray={options['grayscale']}:threshold={options['threshold']}" \
+                     f":deskew={options['deskew']}"
+    if options['backend'] != 'pytesseract':
+        signature += f":backend={options['backend']}"
+    return signature
+
+
+def otsu_threshold(image):
+    """
+    Tính ngưỡng nhị phân hóa Otsu từ histogram của ảnh grayscale
+    """
+    histogram = image.histogram()[:256]
+    total = sum(histogram)
+    sum_all = sum(i * count for i, count in enumerate(histogram))
+    
+    sum_background = 0
+    weight_background = 0
+    best_threshold, best_variance = 127, -1.0
+    
+    for t, count in enumerate(histogram):
+        weight_background += count
+        if weight_background == 0:
+            continue
+        weight_foreground = total - weight_background
+        if weight_foreground == 0:
+            break
+        
+        sum_background += t * count
+        mean_background = sum_background / weight_background
+        mean_foreground = (sum_all - sum_background) / weight_foreground
+        variance = weight_background * weight_foreground * (mean_background - mean_foreground) ** 2
+        
+        if variance > best_variance:
+            best_threshold, best_variance = t, variance
+    
+    return best_threshold
+
+
+def estimate_skew_angle(image, max_angle=5.0, step=0.5):
+    """
+    Ước lượng góc nghiêng của trang bằng projection profile
+    
+    Xoay bản thu nhỏ của ảnh trong khoảng [-max_angle, max_angle] và chọn góc
+    làm tổng pixel tối theo từng dòng dao động mạnh nhất (các dòng chữ thẳng).
     
     Returns:
-        True nếu là scan, False nếu có text
+        Góc (độ) cần xoay để trang thẳng
     """
-    try:
-        with pdfplumber.open(pdf_path) as pdf:
-            # Check first page
-            first_page = pdf.pages[0]
-            text = first_page.extract_text()
+    import numpy as np
+    
+    small = image.convert('L')
+    small.thumbnail((800, 800))
+    
+    best_angle, best_score = 0.0, -1.0
+    n_steps = int(round(2 * max_angle / step))
+    for i in range(n_steps + 1):
+        angle = -max_angle + i * step
+        rotated = small.rotate(angle, expand=True, fillcolor=255)
+        ink = 255 - np.asarray(rotated, dtype=np.float32)
+        score = float(np.var(ink.sum(axis=1)))
+        if score > best_score:
+            best_angle, best_score = angle, score
+    
+    return best_angle
+
+
+def preprocess_image(image, options):
+    """
+    Tiền xử lý ảnh trang theo options: grayscale, nhị phân hóa, chỉnh nghiêng
+    """
+    if options['grayscale'] or options['threshold'] is not None or options['deskew']:
+        image = image.convert('L')
+    
+    if options['deskew']:
+        angle = estimate_skew_angle(image)
+        if angle:
+            image = image.rotate(angle, expand=True, fillcolor=255)
+    
+    threshold = options['threshold']
+    if threshold is not None:
+        if threshold == 'otsu':
+            threshold = otsu_threshold(image)
+        image = image.point(lambda p: 255 if p > threshold else 0)
+    
+    return image
+
+
+def rasterize(pdf_path, first_page, last_page, dpi, options):
+    """
+    Rasterize các trang [first_page, last_page] và tiền xử lý
+    """
+    images = convert_from_path(
+        pdf_path, dpi=dpi, first_page=first_page, last_page=last_page,
+        grayscale=bool(options['grayscale']),
+    )
+    return [preprocess_image(image, options) for image in images]
+
+
+def mean_confidence(image, options):
+    """
+    Confidence trung bình của tesseract trên một ảnh (0-100)
+    """
+    lang = options['lang']
+    if options['backend'] == 'tesserocr':
+        engine = get_tesserocr_engine(lang)
+        engine.SetImage(image)
+        return float(engine.MeanTextConf())
+    
+    data = pytesseract.image_to_data(image, lang=lang, output_type=pytesseract.Output.DICT)
+    confidences = [float(c) for c in data['conf'] if float(c) >= 0]
+    return sum(confidences) / len(confidences) if confidences else 0.0
+
+
+def choose_dpi(pdf_path, probe_page, options):
+    """
+    Chọn DPI cho một PDF khi options['dpi'] == 'auto'
+    
+    Loại các DPI làm cạnh dài của trang vượt max_page_pixels, sau đó OCR thử
+    một dải giữa của trang probe từ DPI thấp lên cao và dừng ở DPI đầu tiên
+    đạt auto_dpi_min_confidence.
+    
+    Args:
+        pdf_path: Đường dẫn PDF
+        probe_page: Số trang dùng để thử
+        options: OCR options
+    
+    Returns:
+        DPI được chọn
+    """
+    candidates = sorted(options['auto_dpi_candidates'])
+    
+    with pdfplumber.open(pdf_path) as pdf:
+        page = pdf.pages[probe_page - 1]
+        long_side_inches = max(float(page.width), float(page.height)) / 72
+    
+    fitting = [dpi for dpi in candidates if dpi * long_side_inches <= options['max_page_pixels']]
+    candidates = fitting or candidates[:1]
+    
+    for dpi in candidates[:-1]:
+        image = rasterize(pdf_path, probe_page, probe_page, dpi, options)[0]
+        width, height = image.size
+        probe = image.crop((0, height // 3, width, 2 * height // 3))
+        if mean_confidence(probe, options) >= options['auto_dpi_min_confidence']:
+            return dpi
+    
+    return candidates[-1]
+
+
+def classify_pages(pdf_path, min_chars=50, min_density=0.5):
+    """
+    Phân loại từng trang PDF: có text layer dùng được hay cần OCR
+    
+    Một trang được coi là có text nếu có ít nhất min_chars ký tự chữ/số và
+    mật độ ký tự (ký tự / inch vuông) đạt min_density.
+    
+    Args:
+        pdf_path: Đường dẫn PDF
+        min_chars: Số ký tự chữ/số tối thiểu
+        min_density: Mật độ ký tự tối thiểu
+    
+    Returns:
+        List text gốc của từng trang, None với các trang cần OCR
+    """
+    native_text = []
+    
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages:
+            try:
+                text = page.extract_text() or ''
+            except Exception:
+                text = ''
+            
+            usable_chars = sum(ch.isalnum() for ch in text)
+            area = max(float(page.width) * float(page.height) / (72 * 72), 1e-6)
             
-            # Nếu không có text hoặc text rất ít, coi như là scan
-            if not text or len(text.strip()) < 50:
-                return True
-    except:
-        return True
+            if usable_chars >= min_chars and usable_chars / area >= min_density:
+                native_text.append(text)
+            else:
+                native_text.append(None)
+    
+    return native_text
+
+
+def get_page_count(pdf_path):
+    """
+    Lấy số trang của PDF (không rasterize)
+    """
+    return pdfinfo_from_path(pdf_path)['Pages']
+
+
+def make_windows(pages, window_size):
+    """
+    Gom danh sách số trang thành các cửa sổ liên tiếp (first_page, last_page)
+    
+    Args:
+        pages: List số trang (1-based), tăng dần
+        window_size: Số trang tối đa mỗi cửa sổ
+    
+    Returns:
+        List of (first_page, last_page)
+    """
+    windows = []
+    for page in pages:
+        if windows and page == windows[-1][1] + 1 and page - windows[-1][0] < window_size:
+            windows[-1] = (windows[-1][0], page)
+        else:
+            windows.append((page, page))
+    return windows
+
+
+def ocr_window(pdf_path, first_page, last_page, options):
+    """
+    Rasterize và OCR một cửa sổ trang (chạy trong worker process)
+    
+    Chỉ các trang trong cửa sổ được giữ trong bộ nhớ.
+    
+    Returns:
+        List text của từng trang, theo thứ tự
+    """
+    images = rasterize(pdf_path, first_page, last_page, options['dpi'], options)
+    return [image_to_text(image, options) for image in images]
+
+
+def iter_ocr_pages(pdf_path, pages, options):
+    """
+    OCR các trang được chỉ định, yield (số trang, text) theo đúng thứ tự trang
+    
+    Với workers > 1, các cửa sổ trang được OCR song song trên process pool.
+    Chỉ tối đa `workers` cửa sổ được xử lý cùng lúc, nên bộ nhớ và thời gian
+    phụ thuộc vào số worker chứ không phụ thuộc độ dài tài liệu.
+    
+    Args:
+        pdf_path: Đường dẫn PDF
+        pages: List số trang cần OCR (1-based)
+        options: OCR options (xem DEFAULT_OCR_OPTIONS)
+    """
+    windows = make_windows(sorted(pages), options['window_size'])
+    workers = options['workers']
     
-    return False
+    if workers <= 1:
+        for first_page, last_page in windows:
+            texts = ocr_window(pdf_path, first_page, last_page, options)
+            yield from zip(range(first_page, last_page + 1), texts)
+        return
+    
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=init_ocr_worker,
+        initargs=(options,),
+    ) as executor:
+        window_iter = iter(windows)
+        running = {}
+        done_windows = {}
+        next_index = 0
+        submitted = 0
+        
+        def submit_next():
+            nonlocal submitted
+            window = next(window_iter, None)
+            if window is not None:
+                future = executor.submit(ocr_window, pdf_path, window[0], window[1], options)
+                running[future] = submitted
+                submitted += 1
+        
+        for _ in range(workers):
+            submit_next()
+        
+        while running:
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                done_windows[running.pop(future)] = future.result()
+                submit_next()
+            
+            # Yield các cửa sổ đã xong theo thứ tự, giữ lại cửa sổ về sớm
+            while next_index in done_windows:
+                first_page, last_page = windows[next_index]
+                texts = done_windows.pop(next_index)
+                yield from zip(range(first_page, last_page + 1), texts)
+                next_index += 1
+
+
+def ocr_output_path(pdf_file):
+    """
+    File text output của một PDF: cùng thư mục, tên <tên PDF>_ocr.txt
+    (chỉ đổi phần đuôi, kể cả khi đường dẫn có ".pdf" ở giữa hoặc đuôi viết hoa)
+    """
+    pdf_file = Path(pdf_file)
+    return pdf_file.with_name(f"{pdf_file.stem}_ocr.txt")
 
 
-def ocr_pdf(pdf_path, output_path, lang='vie+eng'):
+def ocr_pdf(pdf_path, output_path, lang='vie+eng', options=None, cache=None, native_text=None):
     """
-    OCR một PDF scan và tạo PDF mới có text layer
+    OCR một PDF scan và lưu text ra file
     
     Args:
         pdf_path: Đường dẫn PDF gốc
-        output_path: Đường dẫn PDF output
+        output_path: Đường dẫn file output
         lang: Ngôn ngữ OCR (vie cho tiếng Việt, eng cho tiếng Anh)
+        options: OCR options (workers, window_size, dpi...), mặc định DEFAULT_OCR_OPTIONS
+        cache: OCRCache (optional); chỉ các trang chưa có trong cache mới được OCR
+        native_text: Kết quả classify_pages (optional); trang có text gốc
+            không bị OCR mà được ghép thẳng vào output theo thứ tự trang
     """
     print(f"📄 OCR file: {os.path.basename(pdf_path)}")
+    options = {**DEFAULT_OCR_OPTIONS, **(options or {}), 'lang': lang}
+    
+    # Save as text file (easier to process than PDF with text layer)
+    txt_path = str(Path(output_path).with_suffix('.txt'))
+    tmp_path = txt_path + '.tmp'
     
     try:
-        # Convert PDF to images
-        print("   - Converting PDF to images...")
-        images = convert_from_path(pdf_path, dpi=300)
+        num_pages = get_page_count(pdf_path)
+        
+        # Trang có text layer dùng được thì lấy thẳng, không OCR
+        known_pages = {}
+        if native_text is not None:
+            known_pages = {i + 1: text for i, text in enumerate(native_text) if text is not None}
+        ocr_page_count = num_pages - len(known_pages)
+        
+        print(f"   - {num_pages} trang ({ocr_page_count} cần OCR), {options['workers']} worker(s), "
+              f"cửa sổ {options['window_size']} trang, {options['dpi']} DPI, {options['backend']}")
+        
+        pending_pages = [p for p in range(1, num_pages + 1) if p not in known_pages]
+        pdf_hash = file_sha256(pdf_path) if cache is not None else None
+        
+        # DPI 'auto' được chọn một lần cho mỗi PDF và lưu trong cache (trang 0),
+        # để key của từng trang chứa DPI thực tế đã dùng
+        run_options = options
+        if options['dpi'] == 'auto' and pending_pages:
+            chosen = None
+            if cache is not None:
+                dpi_key = OCRCache.make_key(pdf_hash, 0, ocr_signature(options))
+                chosen = cache.get(dpi_key)
+            if chosen is None:
+                chosen = choose_dpi(pdf_path, pending_pages[0], options)
+                if cache is not None:
+                    cache.put(dpi_key, str(chosen))
+            run_options = {**options, 'dpi': int(chosen)}
+            print(f"   - DPI tự động: {run_options['dpi']}")
+        
+        # Lấy các trang đã OCR từ cache, chỉ OCR các trang còn thiếu
+        cached_pages = {}
+        keys = {}
+        if cache is not None:
+            signature = ocr_signature(run_options)
+            for page_no in pending_pages:
+                keys[page_no] = OCRCache.make_key(pdf_hash, page_no, signature)
+                text = cache.get(keys[page_no])
+                if text is not None:
+                    cached_pages[page_no] = text
+            print(f"   - {len(cached_pages)}/{ocr_page_count} trang lấy từ cache")
         
-        # OCR each page and create text file
-        all_text = []
+        missing_pages = [p for p in pending_pages if p not in cached_pages]
         
-        for i, image in enumerate(tqdm(images, desc="   - OCR pages")):
-            # Perform OCR
-            text = pytesseract.image_to_string(image, lang=lang)
-            all_text.append(f"--- Trang {i+1} ---\n{text}\n\n")
+        ocr_results = iter_ocr_pages(pdf_path, missing_pages, run_options)
         
-        # Save as text file (easier to process than PDF with text layer)
-        txt_path = output_path.replace('.pdf', '.txt')
-        with open(txt_path, 'w', encoding='utf-8') as f:
-            f.writelines(all_text)
+        # Ghi từng trang ngay khi có kết quả (theo thứ tự trang) vào file tạm,
+        # chỉ đổi tên thành file output khi mọi trang đều xong: file _ocr.txt
+        # tồn tại nghĩa là OCR đã hoàn tất
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for page_no in tqdm(range(1, num_pages + 1), desc="   - OCR pages"):
+                if page_no in known_pages:
+                    text = known_pages.pop(page_no)
+                elif page_no in cached_pages:
+                    text = cached_pages.pop(page_no)
+                else:
+                    _, text = next(ocr_results)
+                    if cache is not None:
+                        cache.put(keys[page_no], text)
+                f.write(f"--- Trang {page_no} ---\n{text}\n\n")
+                f.flush()
+        os.replace(tmp_path, txt_path)
         
         print(f"   ✅ OCR hoàn tất: {os.path.basename(txt_path)}")
         return txt_path
         
     except Exception as e:
         print(f"   ❌ Lỗi OCR: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
         return None
 
 
+def benchmark_pdf(pdf_path, options, sample_pages=3):
+    """
+    So sánh cấu hình OCR hiện tại với baseline 300 DPI không tiền xử lý
+    
+    In số giây mỗi trang của từng cấu hình và độ khớp ký tự
+    (difflib ratio) của text so với baseline.
+    
+    Args:
+        pdf_path: Đường dẫn PDF
+        options: OCR options cần đánh giá
+        sample_pages: Số trang mẫu (trải đều trong tài liệu)
+    """
+    num_pages = get_page_count(pdf_path)
+    step = max(num_pages // sample_pages, 1)
+    pages = list(range(1, num_pages + 1, step))[:sample_pages]
+    
+    baseline_options = {
+        **options, 'dpi': 300, 'grayscale': False, 'threshold': None, 'deskew': False,
+    }
+    
+    print(f"\n📏 Benchmark {os.path.basename(pdf_path)} (trang {pages})")
+    results = {}
+    for name, bench_options in (('baseline', baseline_options), ('configured', options)):
+        texts = []
+        elapsed = 0.0
+        for page_no in pages:
+            start = time.perf_counter()
+            page_options = bench_options
+            if bench_options['dpi'] == 'auto':
+                page_options = {**bench_options, 'dpi': choose_dpi(pdf_path, page_no, bench_options)}
+            texts.extend(ocr_window(pdf_path, page_no, page_no, page_options))
+            elapsed += time.perf_counter() - start
+        results[name] = (elapsed / len(pages), texts)
+    
+    baseline_time, baseline_texts = results['baseline']
+    configured_time, configured_texts = results['configured']
+    agreement = [
+        difflib.SequenceMatcher(None, a, b, autojunk=False).ratio()
+        for a, b in zip(baseline_texts, configured_texts)
+    ]
+    
+    print(f"   baseline (300 DPI)  : {baseline_time:.2f} s/trang")
+    print(f"   cấu hình hiện tại   : {configured_time:.2f} s/trang "
+          f"(x{baseline_time / max(configured_time, 1e-9):.1f})")
+    print(f"   độ khớp ký tự       : {sum(agreement) / len(agreement):.1%} "
+          f"(thấp nhất {min(agreement):.1%})")
+
+
+def load_ocr_options(args):
+    """
+    Gộp OCR options: mặc định < config.yaml < command line
+    """
+    options = dict(DEFAULT_OCR_OPTIONS)
+    
+    try:
+        options.update(load_config().get('ocr') or {})
+    except FileNotFoundError:
+        pass
+    
+    for key in DEFAULT_OCR_OPTIONS:
+        value = getattr(args, key, None)
+        if value is not None:
+            options[key] = value
+    
+    if options['dpi'] != 'auto':
+        options['dpi'] = int(options['dpi'])
+    if options['threshold'] not in (None, 'otsu'):
+        options['threshold'] = int(options['threshold'])
+    options['backend'] = resolve_backend(options['backend'])
+    
+    return options
+
+
+def parse_args():
+    """
+    Parse command line arguments
+    """
+    parser = argparse.ArgumentParser(description="OCR các PDF scan trong thư mục documents")
+    parser.add_argument('--workers', type=int, help="Số process OCR song song")
+    parser.add_argument('--window-size', dest='window_size', type=int,
+                        help="Số trang rasterize mỗi lần")
+    parser.add_argument('--dpi', help="Độ phân giải rasterize (số hoặc 'auto')")
+    parser.add_argument('--lang', help="Ngôn ngữ tesseract (vd: vie+eng)")
+    parser.add_argument('--no-cache', action='store_true', help="Không dùng cache OCR")
+    parser.add_argument('--grayscale', action='store_true', default=None,
+                        help="Rasterize ảnh grayscale")
+    parser.add_argument('--threshold', help="Nhị phân hóa ảnh: 'otsu' hoặc ngưỡng 0-255")
+    parser.add_argument('--deskew', action='store_true', default=None,
+                        help="Tự động chỉnh nghiêng trang")
+    parser.add_argument('--backend', choices=['pytesseract', 'tesserocr'],
+                        help="OCR backend (tesserocr giữ engine trong process, nhanh hơn với trang ngắn)")
+    parser.add_argument('--benchmark', type=int, metavar='N',
+                        help="Chỉ benchmark N trang mẫu mỗi PDF so với baseline 300 DPI")
+    return parser.parse_args()
+
+
 def main():
     """
     Main function
     """
+    args = parse_args()
+    options = load_ocr_options(args)
+    
     print("=" * 70)
     print("🔍 OCR PDF SCAN TOOL")
     print("=" * 70)
@@ -99,29 +727,55 @@ def main():
     print(f"\n📚 Tìm thấy {len(pdf_files)} file PDF")
     print("\n🔍 Kiểm tra PDF nào là scan...")
     
+    # Phân loại từng trang: PDF hỗn hợp chỉ OCR các trang không có text
     scanned_pdfs = []
+    native_texts = {}
     for pdf_file in pdf_files:
-        if is_pdf_scanned(str(pdf_file)):
-            scanned_pdfs.append(pdf_file)
+        try:
+            native_text = classify_pages(
+                str(pdf_file), options['min_text_chars'], options['min_text_density']
+            )
+        except Exception as e:
+            print(f"   ⚠️  {pdf_file.name} - Không đọc được text layer ({e}), OCR toàn bộ")
+            native_text = None
+        
+        if native_text is not None and all(text is not None for text in native_text):
+            print(f"   ✅ {pdf_file.name} - Đã có text")
+            continue
+        
+        scanned_pdfs.append(pdf_file)
+        native_texts[pdf_file] = native_text
+        if native_text is None or all(text is None for text in native_text):
             print(f"   📄 {pdf_file.name} - PDF scan (cần OCR)")
         else:
-            print(f"   ✅ {pdf_file.name} - Đã có text")
+            n_scanned = sum(text is None for text in native_text)
+            print(f"   📄 {pdf_file.name} - PDF hỗn hợp ({n_scanned}/{len(native_text)} trang cần OCR)")
     
     if not scanned_pdfs:
         print("\n✅ Tất cả PDF đều có text, không cần OCR!")
         return
     
+    if args.benchmark:
+        for pdf_file in scanned_pdfs:
+            benchmark_pdf(str(pdf_file), options, sample_pages=args.benchmark)
+        return
+    
     print(f"\n⚡ Bắt đầu OCR {len(scanned_pdfs)} file...")
-    print("   (Ngôn ngữ: Tiếng Việt + Tiếng Anh)")
+    print(f"   (Ngôn ngữ: {options['lang']})")
     print()
     
+    cache = None
+    if not args.no_cache:
+        cache = OCRCache(options['cache_dir'], int(options['cache_max_mb'] * (1 << 20)))
+    
     success_count = 0
     
     for pdf_file in scanned_pdfs:
         # OCR and save as .txt
-        output_path = str(pdf_file).replace('.pdf', '_ocr.txt')
+        output_path = str(ocr_output_path(pdf_file))
         
-        result = ocr_pdf(str(pdf_file), output_path, lang='vie+eng')
+        result = ocr_pdf(str(pdf_file), output_path, lang=options['lang'],
+                         options=options, cache=cache, native_text=native_texts[pdf_file])
         
         if result:
             success_count += 1
@@ -129,14 +783,19 @@ def main():
     
     print("=" * 70)
     print(f"✅ Hoàn tất! OCR thành công {success_count}/{len(scanned_pdfs)} file")
+    if cache is not None:
+        cache_stats = cache.stats()
+        print(f"   Cache: {cache_stats['hits']} hit / {cache_stats['misses']} miss "
+              f"({cache_stats['hit_ratio']:.0%}), {cache_stats['evictions']} evicted, "
+              f"{cache_stats['size_mb']:.1f} MB")
     print("=" * 70)
     
     if success_count > 0:
         print("\n📝 Các file TXT đã được tạo từ PDF scan:")
         for pdf_file in scanned_pdfs:
-            txt_file = str(pdf_file).replace('.pdf', '_ocr.txt')
-            if Path(txt_file).exists():
-                print(f"   - {os.path.basename(txt_file)}")
+            txt_file = ocr_output_path(pdf_file)
+            if txt_file.exists():
+                print(f"   - {txt_file.name}")
         
         print("\n🚀 Bước tiếp theo:")
         print("   1. Kiểm tra các file TXT vừa tạo")
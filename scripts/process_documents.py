@@ -5,6 +5,8 @@ Chạy script này để chuẩn bị dữ liệu cho chatbot
 """
 
 import sys
+import time
+import argparse
 from pathlib import Path
 
 # Add parent directory to path
@@ -13,12 +15,70 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from src.utils import load_config, load_environment, validate_api_keys, ensure_directory
 from src.document_processor import DocumentProcessor
 from src.embeddings import EmbeddingManager
+from src.manifest import IndexManifest
+from src.chunk_store import ChunkStore, processing_settings
+from src.ingest_report import build_ingest_report, save_ingest_report, print_ingest_summary
+
+
+def count_chunks(documents, chunk_counts):
+    """
+    Đếm số chunks theo file nguồn trong khi chuyển tiếp documents
+    (dùng được cho cả list lẫn stream)
+    """
+    for doc in documents:
+        file_path = doc.metadata.get('file_path')
+        chunk_counts[file_path] = chunk_counts.get(file_path, 0) + 1
+        yield doc
+
+
+def write_manifest(embedding_manager, files, chunk_counts, duplicate_files, reset=False):
+    """
+    Ghi manifest các file vừa được index để update_vectorstore.py
+    chỉ cần xử lý các file mới/thay đổi ở lần sau, cùng các file có chunk
+    bị near-duplicate filter bỏ (được index lại khi file giữ đại diện thay đổi)
+    """
+    manifest = IndexManifest(embedding_manager.manifest_path)
+    if reset:
+        manifest.entries = {}
+        manifest.duplicates = {}
+    
+    for file_path in files:
+        manifest.update(file_path, chunk_counts.get(file_path, 0))
+    manifest.add_duplicates(duplicate_files)
+    
+    manifest.save()
+
+
+def parse_args():
+    """
+    Parse command line arguments
+    """
+    parser = argparse.ArgumentParser(description="Xử lý documents và tạo vectorstore")
+    parser.add_argument(
+        '--stream', action='store_true',
+        help="Load, chia chunks và embed theo từng batch thay vì giữ toàn bộ corpus trong bộ nhớ",
+    )
+    parser.add_argument(
+        '--save-chunks', action='store_true',
+        help="Lưu chunks đã xử lý vào chunk store (document_processing.chunk_store_dir)",
+    )
+    parser.add_argument(
+        '--from-chunks', action='store_true',
+        help="Embed từ chunk store đã lưu, bỏ qua bước load và chia chunks",
+    )
+    parser.add_argument(
+        '--no-resume', action='store_true',
+        help="Bỏ build dở dang (nếu có) và tạo vectorstore lại từ đầu",
+    )
+    return parser.parse_args()
 
 
 def main():
     """
     Main function để process documents
     """
+    args = parse_args()
+    
     print("=" * 70)
     print("📚 XỬ LÝ VÀ INDEX DOCUMENTS CHO CHATBOT")
     print("=" * 70)
@@ -33,9 +93,15 @@ def main():
         print("\n❌ Vui lòng cấu hình API keys trong file .env")
         return
     
+    chunk_store = ChunkStore(config['document_processing'].get('chunk_store_dir', './data/chunks'))
+    if args.from_chunks and not chunk_store.exists():
+        print(f"\n❌ Chunk store chưa tồn tại tại {chunk_store.directory}")
+        print("   Chạy lại với --save-chunks (không có --from-chunks) để tạo")
+        return
+    
     # Kiểm tra thư mục documents
     docs_dir = "data/documents"
-    if not Path(docs_dir).exists() or not any(Path(docs_dir).iterdir()):
+    if not args.from_chunks and (not Path(docs_dir).exists() or not any(Path(docs_dir).iterdir())):
         print(f"\n⚠️  Thư mục {docs_dir} trống hoặc không tồn tại")
         print(f"\nVui lòng:")
         print(f"  1. Tạo thư mục: mkdir -p {docs_dir}")
@@ -53,20 +119,43 @@ def main():
         print("=" * 70)
         
         processor = DocumentProcessor(config)
-        documents = processor.process_documents(docs_dir)
-        
-        if not documents:
-            print("\n❌ Không có documents nào được xử lý thành công")
-            return
+        stage_seconds = {}
+        stage_start = time.perf_counter()
         
-        # Show statistics
-        stats = processor.get_document_stats(documents)
-        print("\n📊 Thống kê Documents:")
-        print(f"   ✓ Tổng số chunks: {stats['total_chunks']}")
-        print(f"   ✓ Tổng số ký tự: {stats['total_characters']:,}")
-        print(f"   ✓ Kích thước chunk trung bình: {stats['avg_chunk_size']} ký tự")
-        print(f"   ✓ Số file nguồn: {stats['unique_sources']}")
-        print(f"   ✓ Loại file: {stats['file_types']}")
+        if args.from_chunks:
+            meta = chunk_store.read_meta()
+            print(f"\n📦 Dùng chunk store {chunk_store.directory}: {meta['num_chunks']} chunks, "
+                  f"{len(meta['files'])} file(s), tạo lúc {meta['created_at']}")
+            if meta['settings'] != processing_settings(config):
+                print("⚠️  Thiết lập document_processing đã thay đổi kể từ khi tạo chunk store; "
+                      "chạy không có --from-chunks để xử lý lại")
+            documents = chunk_store.iter_documents()
+        elif args.stream:
+            # Chunks được sinh lazily và tiêu thụ ở bước 2
+            print("\n🌊 Chế độ streaming: documents được xử lý cùng lúc với embedding")
+            documents = processor.iter_chunks(docs_dir)
+        else:
+            documents = processor.process_documents(docs_dir)
+            
+            if not documents:
+                print("\n❌ Không có documents nào được xử lý thành công")
+                return
+            
+            # Show statistics
+            stats = processor.get_document_stats(documents)
+            print("\n📊 Thống kê Documents:")
+            print(f"   ✓ Tổng số chunks: {stats['total_chunks']}")
+            print(f"   ✓ Tổng số ký tự: {stats['total_characters']:,}")
+            print(f"   ✓ Kích thước chunk trung bình: {stats['avg_chunk_size']} ký tự")
+            print(f"   ✓ Số file nguồn: {stats['unique_sources']}")
+            print(f"   ✓ Loại file: {stats['file_types']}")
+            
+            if args.save_chunks:
+                # Lưu trước khi embed để lần sau có thể --from-chunks dù embed lỗi
+                chunk_store.save(documents, processing_settings(config), processor.duplicate_files)
+                print(f"\n💾 Đã lưu {len(documents)} chunks vào {chunk_store.directory}")
+            
+            stage_seconds['process'] = time.perf_counter() - stage_start
         
         # Step 2: Create embeddings and vectorstore
         print("\n" + "=" * 70)
@@ -74,27 +163,77 @@ def main():
         print("=" * 70)
         
         embedding_manager = EmbeddingManager(config, env)
+        chunk_counts = {}
+        if args.save_chunks and args.stream:
+            # Chunks được ghi vào store trong lúc embed
+            documents = chunk_store.write(documents, processing_settings(config), processor.duplicate_files)
+        documents = count_chunks(documents, chunk_counts)
+        
+        # Check if vectorstore already exists (thư mục được tạo sẵn ở trên nên kiểm tra nội dung)
+        persist_directory = Path(config['vectorstore']['persist_directory'])
+        vectorstore_exists = persist_directory.exists() and any(persist_directory.iterdir())
+        reset_manifest = True
         
-        # Check if vectorstore already exists
-        vectorstore_exists = Path(config['vectorstore']['persist_directory']).exists()
+        if Path(embedding_manager.build_directory).exists() and not args.no_resume:
+            print(f"\n♻️  Có build dở dang tại {embedding_manager.build_directory}, "
+                  f"tạo mới sẽ chạy tiếp từ checkpoint (--no-resume để bỏ)")
         
         if vectorstore_exists:
             print("\n⚠️  Vectorstore đã tồn tại!")
-            choice = input("Bạn muốn:\n  [1] Xóa và tạo mới\n  [2] Thêm vào vectorstore hiện tại\n  [3] Hủy\nChọn (1/2/3): ")
+            choice = input("Bạn muốn:\n  [1] Tạo mới (thay thế khi build xong)\n  [2] Thêm vào vectorstore hiện tại\n  [3] Hủy\nChọn (1/2/3): ")
             
             if choice == '1':
                 print("\n🔨 Tạo vectorstore mới...")
-                embedding_manager.create_vectorstore(documents)
             elif choice == '2':
                 print("\n➕ Thêm documents vào vectorstore hiện tại...")
                 embedding_manager.load_vectorstore()
-                embedding_manager.add_documents(documents)
+                reset_manifest = False
             else:
                 print("\n❌ Đã hủy")
                 return
         else:
             print("\n🔨 Tạo vectorstore mới...")
-            embedding_manager.create_vectorstore(documents)
+        
+        # Vectorstore đã load thì upsert vào đó; nếu không thì build mới có
+        # checkpoint, vectorstore cũ chỉ bị thay khi build xong
+        stage_start = time.perf_counter()
+        if embedding_manager.vectorstore is not None:
+            total = embedding_manager.index_documents_stream(documents)
+        else:
+            total = embedding_manager.build_vectorstore(documents, resume=not args.no_resume)
+        
+        if args.from_chunks:
+            # File nguồn đã sửa sau khi tạo chunk store không được ghi vào manifest,
+            # để update_vectorstore.py index lại chúng
+            indexed_files = list(chunk_store.unchanged_files())
+            duplicate_files = chunk_store.read_meta().get('duplicate_files', {})
+        else:
+            indexed_files = [s['file'] for s in processor.load_stats if not s['error']]
+            duplicate_files = processor.duplicate_files
+        
+        if total == 0:
+            print("\n❌ Không có documents nào được xử lý thành công")
+            return
+        
+        if args.save_chunks and args.stream:
+            print(f"💾 Đã lưu {total} chunks vào {chunk_store.directory}")
+        
+        # Ở chế độ stream, load/split chạy song song trong bước index
+        stage_seconds['stream' if args.stream else 'index'] = time.perf_counter() - stage_start
+        
+        write_manifest(embedding_manager, indexed_files, chunk_counts, duplicate_files, reset=reset_manifest)
+        
+        # Báo cáo ingest (JSON)
+        ingestion_config = config.get('ingestion', {})
+        report = build_ingest_report(
+            config, processor, embedding_manager, chunk_counts, stage_seconds,
+            mode='from-chunks' if args.from_chunks else 'stream' if args.stream else 'batch',
+            slowest_files=ingestion_config.get('slowest_files', 5),
+        )
+        report_path = save_ingest_report(report, ingestion_config.get('report_dir', './data/reports'))
+        print()
+        print_ingest_summary(report)
+        print(f"📝 Báo cáo ingest: {report_path}")
         
         # Step 3: Test retrieval
         print("\n" + "=" * 70)
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """
 Script để update vectorstore với documents mới
+Chỉ embed lại các file mới/đã thay đổi và xóa chunks của file đã bị xóa
 """
 
 import sys
@@ -11,7 +12,8 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from src.utils import load_config, load_environment
 from src.document_processor import DocumentProcessor
-from src.embeddings import EmbeddingManager
+from src.embeddings import EmbeddingManager, DELETE_UNSUPPORTED_MESSAGE
+from src.manifest import IndexManifest
 
 
 def main():
@@ -30,38 +32,80 @@ def main():
     docs_dir = "data/documents"
     print(f"\n📂 Kiểm tra documents trong {docs_dir}...")
     
-    # Process documents
     processor = DocumentProcessor(config)
-    documents = processor.process_documents(docs_dir)
+    embedding_manager = EmbeddingManager(config, env)
+    manifest = IndexManifest(embedding_manager.manifest_path)
     
-    if not documents:
-        print("\n❌ Không có documents mới để thêm")
-        return
+    changes = manifest.diff(processor.find_files(docs_dir))
+    print(f"\n📊 Mới: {len(changes['new'])} | Thay đổi: {len(changes['changed'])} | "
+          f"Đã xóa: {len(changes['deleted'])} | Không đổi: {len(changes['unchanged'])}")
     
-    stats = processor.get_document_stats(documents)
-    print(f"\n📊 Tìm thấy {stats['total_chunks']} chunks từ {stats['unique_sources']} file(s)")
+    to_index = changes['new'] + changes['changed']
+    
+    if not to_index and not changes['deleted']:
+        print("\n✅ Vectorstore đã cập nhật, không có gì thay đổi")
+        manifest.save()
+        return
     
     # Load existing vectorstore
     print("\n🔧 Loading vectorstore hiện tại...")
-    embedding_manager = EmbeddingManager(config, env)
+    vectorstore_loaded = embedding_manager.load_vectorstore()
+    if not embedding_manager.supports_delete():
+        print(f"\n❌ {DELETE_UNSUPPORTED_MESSAGE}")
+        sys.exit(1)
+    
+    if vectorstore_loaded:
+        # File mới/thay đổi được thay bằng replace_source (ghi chunks mới trước,
+        # xóa chunks cũ sau, kể cả chunks không có ID ổn định từ lần index trước
+        # manifest); chỉ file đã xóa bị xóa chunks ở đây. Chunks bị thay/xóa có
+        # thể là đại diện near-duplicate của file khác (lúc build toàn bộ): các
+        # file đó được index lại nguyên vẹn để không mất nội dung. Cập nhật
+        # incremental không lọc near-duplicate.
+        affected = changes['deleted'] + to_index
+        scheduled = set(affected)
+        for file_path in affected:
+            for holder in manifest.duplicate_holders(file_path):
+                if holder not in scheduled and Path(holder).exists():
+                    scheduled.add(holder)
+                    affected.append(holder)
+                    to_index.append(holder)
+                    print(f"   ♻️  {holder}: index lại (có chunk trùng được lưu dưới {file_path})")
+        
+        for file_path in changes['deleted']:
+            removed = embedding_manager.delete_by_source(file_path)
+            if removed:
+                print(f"   🗑️  {file_path}: xóa {removed} chunk(s) cũ")
+            manifest.remove(file_path)
     
-    if not embedding_manager.load_vectorstore():
-        print("\n⚠️  Vectorstore chưa tồn tại. Tạo mới...")
-        embedding_manager.create_vectorstore(documents)
-    else:
-        # Add new documents
-        print("\n➕ Thêm documents mới vào vectorstore...")
-        embedding_manager.add_documents(documents)
+    # Process các file cần index
+    failed = []
+    for file_path in to_index:
+        documents = processor.load_document(file_path)
+        if processor.load_stats[-1]['error']:
+            # Không ghi manifest: lần chạy sau file này vẫn là mới/thay đổi và được thử lại
+            failed.append(file_path)
+            continue
+        chunks = processor.split_documents(documents) if documents else []
+        
+        if embedding_manager.vectorstore is not None:
+            removed = embedding_manager.replace_source(file_path, chunks)
+            if removed:
+                print(f"   🗑️  {file_path}: xóa {removed} chunk(s) cũ")
+        elif chunks:
+            print("\n⚠️  Vectorstore chưa tồn tại. Tạo mới...")
+            embedding_manager.create_vectorstore(chunks)
+        
+        manifest.update(file_path, len(chunks))
+        # Lưu sau mỗi file để lần chạy sau không làm lại file đã xong
+        manifest.save()
     
+    manifest.save()
+    if failed:
+        print(f"\n⚠️  {len(failed)} file load lỗi, sẽ được thử lại ở lần cập nhật sau:")
+        for file_path in failed:
+            print(f"   - {file_path}")
     print("\n✅ Hoàn tất!")
 
 
 if __name__ == "__main__":
     main()
-
-
-
-
-
-
-
@@ -0,0 +1,208 @@
+"""
+ANN Index Module
+Cấu hình index FAISS (Flat, IVF-Flat, IVF-PQ, HNSW) và HNSW của Chroma, lưu cùng index để load lại đúng thiết lập
+"""
+
+import json
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, Optional, Union, Iterator
+
+import numpy as np
+
+
+INDEX_CONFIG_FILE = 'index_config.json'
+
+FAISS_INDEX_TYPES = ('flat', 'ivf_flat', 'ivf_pq', 'hnsw')
+
+# Tham số chỉ dùng lúc search, đổi được mà không cần build lại
+FAISS_SEARCH_PARAMS = ('nprobe', 'ef_search')
+
+_CHROMA_SPACES = {'cosine': 'cosine', 'l2': 'l2', 'euclidean': 'l2', 'ip': 'ip', 'inner_product': 'ip'}
+
+
+def faiss_index_settings(faiss_config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Thiết lập index FAISS đầy đủ (điền giá trị mặc định) từ vectorstore.faiss
+    
+    Args:
+        faiss_config: Dictionary vectorstore.faiss trong config
+    
+    Returns:
+        Dictionary thiết lập chỉ gồm các tham số của loại index đã chọn
+    """
+    index_type = faiss_config.get('index_type', 'flat')
+    if index_type not in FAISS_INDEX_TYPES:
+        raise ValueError(f"FAISS index_type không được hỗ trợ: {index_type} ({', '.join(FAISS_INDEX_TYPES)})")
+    
+    settings: Dict[str, Any] = {'index_type': index_type}
+    if index_type in ('ivf_flat', 'ivf_pq'):
+        settings['nlist'] = faiss_config.get('nlist', 256)
+        settings['nprobe'] = faiss_config.get('nprobe', 16)
+        settings['train_size'] = faiss_config.get('train_size', 20000)
+    if index_type == 'ivf_pq':
+        settings['pq_m'] = faiss_config.get('pq_m', 16)
+        settings['pq_nbits'] = faiss_config.get('pq_nbits', 8)
+    if index_type == 'hnsw':
+        settings['hnsw_m'] = faiss_config.get('hnsw_m', 32)
+        settings['ef_construction'] = faiss_config.get('ef_construction', 200)
+        settings['ef_search'] = faiss_config.get('ef_search', 64)
+    return settings
+
+
+def faiss_factory_string(settings: Dict[str, Any]) -> str:
+    """
+    Chuỗi index_factory của FAISS cho một thiết lập
+    """
+    index_type = settings['index_type']
+    if index_type == 'ivf_flat':
+        return f"IVF{settings['nlist']},Flat"
+    if index_type == 'ivf_pq':
+        return f"IVF{settings['nlist']},PQ{settings['pq_m']}x{settings['pq_nbits']}"
+    if index_type == 'hnsw':
+        return f"HNSW{settings['hnsw_m']}"
+    return "Flat"
+
+
+def build_faiss_index(vectors: np.ndarray, settings: Dict[str, Any]):
+    """
+    Tạo index FAISS rỗng (đã train nếu là IVF) theo thiết lập
+    
+    Flat và IVF được thêm vector bằng add_with_ids và xóa bằng remove_ids
+    theo ID ổn định (xem faiss_supports_ids); HNSW không xóa được.
+    
+    Args:
+        vectors: Vector mẫu để train (n, dim); chỉ cần cho IVF
+        settings: Thiết lập từ faiss_index_settings
+    
+    Returns:
+        faiss.Index chưa có vector nào
+    """
+    import faiss
+    
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    factory = faiss_factory_string(settings)
+    if settings['index_type'] == 'flat':
+        # IndexFlat không nhận ID riêng: bọc IDMap2 để xóa được theo ID (remove_ids)
+        factory = f"IDMap2,{factory}"
+    index = faiss.index_factory(vectors.shape[1], factory, faiss.METRIC_L2)
+    
+    if settings['index_type'] == 'hnsw':
+        index.hnsw.efConstruction = settings['ef_construction']
+    
+    if not index.is_trained:
+        print(f"🏋️  Train FAISS {faiss_factory_string(settings)} trên {len(vectors)} vectors...")
+        index.train(vectors)
+    
+    apply_faiss_search_params(index, settings)
+    return index
+
+
+def apply_faiss_search_params(index, settings: Dict[str, Any]) -> None:
+    """
+    Đặt tham số lúc search (nprobe cho IVF, efSearch cho HNSW)
+    """
+    import faiss
+    
+    if 'nprobe' in settings:
+        faiss.extract_index_ivf(index).nprobe = settings['nprobe']
+    if 'ef_search' in settings and hasattr(index, 'hnsw'):
+        index.hnsw.efSearch = settings['ef_search']
+
+
+def faiss_supports_ids(index) -> bool:
+    """
+    Index nhận ID riêng khi thêm (add_with_ids) và xóa theo ID (remove_ids)
+    mà không đánh số lại các vector còn lại: IVF, hoặc index được bọc IDMap
+    """
+    import faiss
+    
+    return isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)) or faiss.try_extract_index_ivf(index) is not None
+
+
+def with_faiss_ids(index):
+    """
+    Bọc index Flat cũ (tạo bởi FAISS.from_documents, ID là vị trí) bằng IDMap2
+    với ID = vị trí hiện tại, để các lần xóa sau không đánh số lại vector
+    
+    Args:
+        index: faiss.Index đã load
+    
+    Returns:
+        Index hỗ trợ ID (index gốc nếu đã hỗ trợ hoặc không phải Flat)
+    """
+    import faiss
+    
+    if faiss_supports_ids(index) or not isinstance(index, faiss.IndexFlat):
+        return index
+    
+    wrapped = faiss.index_factory(index.d, "IDMap2,Flat", index.metric_type)
+    if index.ntotal:
+        wrapped.add_with_ids(index.reconstruct_n(0, index.ntotal), np.arange(index.ntotal, dtype=np.int64))
+    return wrapped
+
+
+@contextmanager
+def faiss_reconstructable(index) -> Iterator[None]:
+    """
+    Cho phép index.reconstruct(id) trong khối with
+    
+    Index IVF cần direct map để reconstruct; dùng dạng hashtable vì ID
+    không liên tục, và tắt lại sau đó để không tốn bộ nhớ.
+    """
+    import faiss
+    
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is None or ivf.direct_map.type != faiss.DirectMap.NoMap:
+        yield
+        return
+    
+    ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+    try:
+        yield
+    finally:
+        ivf.set_direct_map_type(faiss.DirectMap.NoMap)
+
+
+def chroma_collection_metadata(vectorstore_config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Metadata collection Chroma cho không gian khoảng cách và tham số HNSW
+    
+    Args:
+        vectorstore_config: Dictionary vectorstore trong config
+    
+    Returns:
+        Dictionary 'hnsw:*' truyền vào collection_metadata
+    """
+    metric = vectorstore_config.get('distance_metric', 'l2')
+    if metric not in _CHROMA_SPACES:
+        raise ValueError(f"distance_metric không được hỗ trợ: {metric} ({', '.join(_CHROMA_SPACES)})")
+    
+    chroma_config = vectorstore_config.get('chroma', {})
+    return {
+        'hnsw:space': _CHROMA_SPACES[metric],
+        'hnsw:M': chroma_config.get('hnsw_m', 16),
+        'hnsw:construction_ef': chroma_config.get('construction_ef', 100),
+        'hnsw:search_ef': chroma_config.get('search_ef', 64),
+    }
+
+
+def save_index_config(directory: Union[str, Path], settings: Dict[str, Any]) -> None:
+    """
+    Lưu thiết lập index vào index_config.json cạnh index
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / INDEX_CONFIG_FILE, 'w', encoding='utf-8') as f:
+        json.dump(settings, f, ensure_ascii=False, indent=2)
+
+
+def load_index_config(directory: Union[str, Path]) -> Optional[Dict[str, Any]]:
+    """
+    Đọc index_config.json (None nếu index không có, ví dụ index Flat cũ)
+    """
+    path = Path(directory) / INDEX_CONFIG_FILE
+    if not path.exists():
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,134 @@
+"""
+Batch Encoder Module
+Encode documents theo bucket độ dài với batch_size cấu hình, có thể chia cho nhiều process
+"""
+
+import time
+import atexit
+from typing import List, Dict, Any, Optional
+
+try:
+    from langchain_core.embeddings import Embeddings
+except ImportError:
+    from langchain.embeddings.base import Embeddings
+
+from src.utils import batched
+
+
+class BatchEncoder(Embeddings):
+    """
+    Bọc embedding model để encode documents với throughput cao
+    
+    Texts được sắp theo độ dài rồi chia thành các batch batch_size, nên
+    mỗi batch gồm các text dài gần bằng nhau và ít phải padding. Với
+    num_processes > 1 (chỉ sentence-transformers), các batch được chia cho
+    một pool process, mỗi process giữ một bản model; pool được tạo ở lần
+    embed_documents đầu tiên nên không tốn tài nguyên khi chỉ embed query.
+    Thứ tự vector trả về giống thứ tự texts đầu vào.
+    """
+    
+    def __init__(self,
+                 embeddings: Embeddings,
+                 batch_size: int = 32,
+                 num_processes: int = 1,
+                 length_bucketing: bool = True):
+        """
+        Khởi tạo encoder
+        
+        Args:
+            embeddings: Embedding model
+            batch_size: Số texts mỗi batch đưa vào model
+            num_processes: Số process encode song song
+            length_bucketing: Sắp texts theo độ dài trước khi chia batch
+        """
+        self.embeddings = embeddings
+        self.batch_size = batch_size
+        self.num_processes = num_processes
+        self.length_bucketing = length_bucketing
+        self._pool: Optional[Dict[str, Any]] = None
+        self.seconds = 0.0
+        self.num_texts = 0
+    
+    def _client(self):
+        """
+        SentenceTransformer bên trong HuggingFaceEmbeddings (None nếu không có)
+        """
+        client = getattr(self.embeddings, 'client', None)
+        return client if hasattr(client, 'encode_multi_process') else None
+    
+    def _get_pool(self) -> Optional[Dict[str, Any]]:
+        if self.num_processes <= 1:
+            return None
+        
+        if self._pool is None:
+            client = self._client()
+            if client is None:
+                print("⚠️  Encode nhiều process chỉ hỗ trợ sentence-transformers, dùng 1 process")
+                self.num_processes = 1
+                return None
+            
+            print(f"🔧 Khởi động {self.num_processes} process encode")
+            self._pool = client.start_multi_process_pool(target_devices=['cpu'] * self.num_processes)
+            atexit.register(self.close)
+        
+        return self._pool
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        start = time.perf_counter()
+        
+        if self.length_bucketing:
+            order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        else:
+            order = list(range(len(texts)))
+        ordered = [texts[i] for i in order]
+        
+        pool = self._get_pool() if len(texts) > self.batch_size else None
+        if pool is not None:
+            # chunk_size = batch_size: mỗi process nhận nguyên một bucket
+            encode_kwargs = getattr(self.embeddings, 'encode_kwargs', {})
+            vectors = self._client().encode_multi_process(
+                ordered,
+                pool,
+                batch_size=self.batch_size,
+                chunk_size=self.batch_size,
+                normalize_embeddings=encode_kwargs.get('normalize_embeddings', False),
+            ).tolist()
+        else:
+            vectors = []
+            for batch in batched(ordered, self.batch_size):
+                vectors.extend(self.embeddings.embed_documents(batch))
+        
+        result: List[List[float]] = [None] * len(texts)
+        for position, index in enumerate(order):
+            result[index] = vectors[position]
+        
+        self.seconds += time.perf_counter() - start
+        self.num_texts += len(texts)
+        return result
+    
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Thống kê encode (chỉ tính texts thực sự đưa vào model)
+        """
+        return {
+            'batch_size': self.batch_size,
+            'num_processes': self.num_processes,
+            'length_bucketing': self.length_bucketing,
+            'texts': self.num_texts,
+            'seconds': self.seconds,
+            'vectors_per_second': self.num_texts / self.seconds if self.seconds else 0.0,
+        }
+    
+    def close(self) -> None:
+        """
+        Dừng pool process (nếu có)
+        """
+        if self._pool is not None:
+            self._client().stop_multi_process_pool(self._pool)
+            self._pool = None
+    
+    def __getattr__(self, name):
+        return getattr(self.embeddings, name)
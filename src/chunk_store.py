@@ -0,0 +1,192 @@
+"""
+Chunk Store Module
+Lưu chunks đã xử lý (text + metadata + hash) xuống đĩa để embed lại mà không cần parse lại documents
+"""
+
+import os
+import gzip
+import json
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Union
+
+try:
+    from langchain_core.documents import Document
+except ImportError:
+    from langchain.schema import Document
+
+
+# Các key document_processing không ảnh hưởng tới nội dung chunks
+_RUNTIME_KEYS = {'num_workers', 'pdf_page_workers', 'chunk_store_dir'}
+
+
+def processing_settings(config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Các thiết lập quyết định nội dung chunks (để phát hiện chunk store cũ)
+    
+    Args:
+        config: Configuration dictionary
+    
+    Returns:
+        Dictionary thiết lập document_processing (bỏ các key runtime)
+    """
+    return {
+        key: value for key, value in config['document_processing'].items()
+        if key not in _RUNTIME_KEYS
+    }
+
+
+class ChunkStore:
+    """
+    Chunk store dạng gzip JSON Lines, mỗi dòng một chunk
+    
+    Thư mục store gồm:
+        chunks.jsonl.gz: {"id", "hash", "text", "metadata"} mỗi dòng
+        meta.json: số chunks, thiết lập xử lý, các file nguồn (mtime, size)
+            và duplicate_files của near-duplicate filter
+    
+    Store được ghi vào file tạm và chỉ thay thế bản cũ khi ghi xong, nên
+    một lần ghi bị ngắt giữa chừng không làm hỏng store hiện có.
+    """
+    
+    def __init__(self, directory: Union[str, Path]):
+        """
+        Khởi tạo chunk store
+        
+        Args:
+            directory: Thư mục chứa store
+        """
+        self.directory = Path(directory)
+        self.chunks_path = self.directory / 'chunks.jsonl.gz'
+        self.meta_path = self.directory / 'meta.json'
+    
+    def exists(self) -> bool:
+        """
+        Store đã được ghi hoàn chỉnh hay chưa
+        """
+        return self.chunks_path.exists() and self.meta_path.exists()
+    
+    def read_meta(self) -> Dict[str, Any]:
+        """
+        Đọc meta.json của store
+        """
+        with open(self.meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def write(self,
+              documents: Iterable[Document],
+              settings: Optional[Dict[str, Any]] = None,
+              duplicate_files: Optional[Dict[str, List[str]]] = None) -> Iterator[Document]:
+        """
+        Ghi chunks vào store trong khi chuyển tiếp chúng (dùng được với stream)
+        
+        Store chỉ được thay thế khi documents đã được duyệt hết.
+        
+        Args:
+            documents: Iterable of chunk Documents
+            settings: Thiết lập xử lý để lưu vào meta (xem processing_settings)
+            duplicate_files: DocumentProcessor.duplicate_files, được đọc khi
+                documents đã duyệt hết (lúc đó stream mới đầy đủ)
+        
+        Yields:
+            Các documents đầu vào, không thay đổi
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.chunks_path.with_name(self.chunks_path.name + '.tmp')
+        files: Dict[str, Dict[str, Any]] = {}
+        num_chunks = 0
+        
+        with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=6) as f:
+            for doc in documents:
+                metadata = dict(doc.metadata)
+                record = {
+                    'id': metadata.pop('chunk_id', None),
+                    'hash': metadata.pop('content_hash', None),
+                    'text': doc.page_content,
+                    'metadata': metadata,
+                }
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                num_chunks += 1
+                
+                file_path = metadata.get('file_path')
+                if file_path is not None:
+                    entry = files.setdefault(file_path, {'num_chunks': 0})
+                    entry['num_chunks'] += 1
+                
+                yield doc
+        
+        # mtime/size để biết file nguồn có thay đổi sau khi store được ghi
+        for file_path, entry in files.items():
+            if os.path.exists(file_path):
+                stat = os.stat(file_path)
+                entry['mtime'] = stat.st_mtime
+                entry['size'] = stat.st_size
+        
+        os.replace(tmp_path, self.chunks_path)
+        meta = {
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'num_chunks': num_chunks,
+            'settings': settings or {},
+            'files': files,
+            'duplicate_files': dict(duplicate_files or {}),
+        }
+        meta_tmp_path = self.meta_path.with_name(self.meta_path.name + '.tmp')
+        with open(meta_tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        os.replace(meta_tmp_path, self.meta_path)
+    
+    def save(self,
+             documents: Iterable[Document],
+             settings: Optional[Dict[str, Any]] = None,
+             duplicate_files: Optional[Dict[str, List[str]]] = None) -> int:
+        """
+        Ghi toàn bộ chunks vào store
+        
+        Args:
+            documents: Iterable of chunk Documents
+            settings: Thiết lập xử lý để lưu vào meta
+            duplicate_files: Kết quả near-duplicate (xem write)
+        
+        Returns:
+            Số chunks đã ghi
+        """
+        return sum(1 for _ in self.write(documents, settings, duplicate_files))
+    
+    def iter_documents(self) -> Iterator[Document]:
+        """
+        Đọc lần lượt các chunks từ store
+        
+        Yields:
+            Document với metadata giống lúc ghi (gồm 'chunk_id', 'content_hash')
+        """
+        with gzip.open(self.chunks_path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                metadata = record['metadata']
+                if record['id'] is not None:
+                    metadata['chunk_id'] = record['id']
+                if record['hash'] is not None:
+                    metadata['content_hash'] = record['hash']
+                yield Document(page_content=record['text'], metadata=metadata)
+    
+    def load_documents(self) -> List[Document]:
+        """
+        Đọc toàn bộ chunks từ store
+        """
+        return list(self.iter_documents())
+    
+    def unchanged_files(self) -> Dict[str, int]:
+        """
+        Các file nguồn chưa thay đổi kể từ khi store được ghi
+        
+        Returns:
+            Dictionary file_path -> số chunks
+        """
+        result = {}
+        for file_path, entry in self.read_meta()['files'].items():
+            if not os.path.exists(file_path):
+                continue
+            stat = os.stat(file_path)
+            if entry.get('mtime') == stat.st_mtime and entry.get('size') == stat.st_size:
+                result[file_path] = entry['num_chunks']
+        return result
@@ -0,0 +1,392 @@
+"""
+Chunking Module
+Chia văn bản quy chế/quy định theo cấu trúc Chương - Điều - Khoản - điểm
+"""
+
+import re
+from collections import namedtuple
+from typing import List, Dict, Any, Optional, Callable, Iterator, Tuple
+
+try:
+    from langchain_core.documents import Document
+except ImportError:
+    from langchain.schema import Document
+
+
+CHUONG_PATTERN = re.compile(r'^\s*(ch[ưu][ơo]ng)\s+([IVXLCDM]+|\d+)\b', re.IGNORECASE)
+DIEU_PATTERN = re.compile(r'^\s*(đi[ềe]u)\s+(\d+)\s*(?:[.:]|$)', re.IGNORECASE)
+KHOAN_PATTERN = re.compile(r'^\s*(\d{1,2})\.\s+\S')
+DIEM_PATTERN = re.compile(r'^\s*([a-zđ])\)\s+')
+PAGE_MARKER_PATTERN = re.compile(r'^\s*-{3}\s*Trang\s+(\d+)\s*-{3}\s*$')
+
+# Một dòng văn bản kèm vị trí của nó trong cấu trúc văn bản
+_Line = namedtuple('_Line', ['text', 'page', 'khoan', 'diem'])
+
+
+# Số token đặc biệt (CLS/SEP) mà model thêm vào mỗi input
+SPECIAL_TOKENS = 2
+
+
+class EmbeddingTokenCounter:
+    """
+    Đếm token bằng tokenizer của embedding model
+    
+    Tokenizer chỉ được load ở lần đếm đầu tiên, nên có thể tạo counter trong
+    các worker process chỉ dùng để load file mà không tốn chi phí.
+    """
+    
+    def __init__(self, embedding_config: Dict[str, Any]):
+        """
+        Args:
+            embedding_config: Mục 'embedding' của config
+        """
+        self.provider = embedding_config['provider']
+        self.model_name = embedding_config['model_name']
+        self.max_seq_length = embedding_config.get('max_seq_length')
+        self._count = None
+        self._window = None
+    
+    def _load(self) -> None:
+        if self.provider == 'openai':
+            from src.utils import count_tokens
+            self._count = lambda text: count_tokens(text, self.model_name)
+            self._window = self.max_seq_length or 8191
+            return
+        
+        from transformers import AutoTokenizer
+        
+        tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        self._count = lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+        
+        max_seq_length = self.max_seq_length or _sentence_transformers_max_length(self.model_name)
+        if max_seq_length is None:
+            # model_max_length là giá trị rất lớn khi tokenizer không khai báo
+            max_seq_length = tokenizer.model_max_length if tokenizer.model_max_length < 100_000 else 512
+        self._window = max_seq_length - SPECIAL_TOKENS
+    
+    @property
+    def window(self) -> int:
+        """
+        Số token nội dung tối đa model nhận (không tính token đặc biệt)
+        """
+        if self._window is None:
+            self._load()
+        return self._window
+    
+    def __call__(self, text: str) -> int:
+        if self._count is None:
+            self._load()
+        return self._count(text)
+    
+    def fit_to_window(self, text: str, window: int) -> List[str]:
+        """
+        Cắt text thành các đoạn chắc chắn không vượt window token
+        
+        Tìm nhị phân tiền tố dài nhất vừa window, ưu tiên cắt ở khoảng trắng.
+        
+        Args:
+            text: Text cần cắt
+            window: Số token tối đa mỗi đoạn
+        
+        Returns:
+            List các đoạn text
+        """
+        pieces = []
+        while text and self(text) > window:
+            low, high = 1, len(text)
+            while low < high:
+                mid = (low + high + 1) // 2
+                if self(text[:mid]) <= window:
+                    low = mid
+                else:
+                    high = mid - 1
+            
+            cut = text.rfind(' ', 0, low)
+            cut = cut if cut > low // 2 else low
+            pieces.append(text[:cut].strip())
+            text = text[cut:].strip()
+        
+        if text:
+            pieces.append(text)
+        return pieces
+
+
+def _sentence_transformers_max_length(model_name: str) -> Optional[int]:
+    """
+    Đọc max_seq_length từ sentence_bert_config.json của model (nếu có)
+    """
+    import json
+    from pathlib import Path
+    
+    try:
+        if Path(model_name).is_dir():
+            config_path = Path(model_name) / 'sentence_bert_config.json'
+        else:
+            from huggingface_hub import hf_hub_download
+            config_path = hf_hub_download(model_name, 'sentence_bert_config.json')
+        with open(config_path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('max_seq_length')
+    except Exception:
+        return None
+
+
+class _Unit:
+    """
+    Một đơn vị logic: một Điều (kể cả các Khoản/điểm của nó), hoặc phần
+    văn bản nằm ngoài Điều (phần mở đầu, phụ lục...)
+    """
+    
+    def __init__(self, chuong: Optional[str], dieu: Optional[str]):
+        self.chuong = chuong
+        self.dieu = dieu
+        self.lines: List[_Line] = []
+        self.length = 0
+
+
+class RegulationTextSplitter:
+    """
+    Text splitter cho văn bản quy phạm tiếng Việt
+    
+    Mỗi Điều là một chunk; Điều quá dài được chia theo Khoản, rồi theo điểm,
+    cuối cùng mới dùng fallback splitter. Marker "--- Trang N ---" (do
+    scripts/ocr_pdfs.py sinh ra) được dùng để xác định trang rồi bỏ khỏi text.
+    Toàn bộ quá trình duyệt văn bản một lần theo dòng nên chạy trong thời
+    gian tuyến tính.
+    """
+    
+    def __init__(self,
+                 chunk_size: int,
+                 fallback_splitter,
+                 length_function: Callable[[str], int] = len,
+                 min_chunk_chars: int = 20):
+        """
+        Khởi tạo splitter
+        
+        Args:
+            chunk_size: Độ dài tối đa mỗi chunk (theo length_function)
+            fallback_splitter: Splitter cho đoạn không chia được theo cấu trúc
+                (cần có split_text)
+            length_function: Hàm đo độ dài text
+            min_chunk_chars: Chunk ngắn hơn (ký tự, không tính khoảng trắng) bị bỏ
+        """
+        self.chunk_size = chunk_size
+        self.fallback_splitter = fallback_splitter
+        self.length_function = length_function
+        self.min_chunk_chars = min_chunk_chars
+    
+    def split_documents(self, documents: List[Document]) -> List[Document]:
+        """
+        Chia documents thành chunks theo cấu trúc văn bản
+        
+        Các Document liên tiếp của cùng một file (ví dụ các trang PDF) được
+        ghép lại để một Điều nằm vắt qua hai trang vẫn thành một chunk.
+        
+        Args:
+            documents: List of Document objects
+        
+        Returns:
+            List of chunked Document objects
+        """
+        chunks = []
+        
+        for group in self._group_by_source(documents):
+            text = self._join_pages(group)
+            base_metadata = {k: v for k, v in group[0].metadata.items() if k != 'page'}
+            
+            for unit in self._iter_units(text):
+                chunks.extend(self._split_unit(unit, base_metadata))
+        
+        return chunks
+    
+    @staticmethod
+    def _group_by_source(documents: List[Document]) -> Iterator[List[Document]]:
+        group = []
+        for doc in documents:
+            source = doc.metadata.get('file_path', doc.metadata.get('source'))
+            if group and source != group[0].metadata.get('file_path', group[0].metadata.get('source')):
+                yield group
+                group = []
+            group.append(doc)
+        if group:
+            yield group
+    
+    @staticmethod
+    def _join_pages(documents: List[Document]) -> str:
+        """
+        Ghép các trang, thêm marker trang nếu Document có metadata 'page'
+        (PyPDFLoader đánh số trang từ 0)
+        """
+        parts = []
+        for doc in documents:
+            page = doc.metadata.get('page')
+            if isinstance(page, int):
+                parts.append(f"--- Trang {page + 1} ---")
+            parts.append(doc.page_content)
+        return "\n".join(parts)
+    
+    def _iter_units(self, text: str) -> Iterator[_Unit]:
+        """
+        Duyệt văn bản một lần, cắt thành các đơn vị Điều
+        """
+        page = None
+        chuong = None
+        khoan = None
+        diem = None
+        unit = _Unit(chuong=None, dieu=None)
+        
+        for raw_line in text.splitlines():
+            page_match = PAGE_MARKER_PATTERN.match(raw_line)
+            if page_match:
+                page = int(page_match.group(1))
+                continue
+            
+            line = raw_line.rstrip()
+            chuong_match = CHUONG_PATTERN.match(line)
+            dieu_match = DIEU_PATTERN.match(line)
+            
+            if chuong_match or dieu_match:
+                if chuong_match:
+                    chuong = f"Chương {chuong_match.group(2).upper()}"
+                
+                carry = []
+                if unit.dieu is None and unit.length <= self.chunk_size // 4:
+                    # Tiêu đề Chương, phần mở đầu ngắn: ghép vào Điều kế tiếp
+                    carry = unit.lines
+                elif unit.lines:
+                    yield unit
+                
+                dieu = f"Điều {dieu_match.group(2)}" if dieu_match else None
+                unit = _Unit(chuong=chuong, dieu=dieu)
+                for carried in carry:
+                    self._append(unit, carried)
+                khoan = diem = None
+            
+            else:
+                khoan_match = KHOAN_PATTERN.match(line)
+                diem_match = DIEM_PATTERN.match(line)
+                if khoan_match:
+                    khoan = khoan_match.group(1)
+                    diem = None
+                elif diem_match:
+                    diem = diem_match.group(1)
+            
+            if line.strip() or unit.lines:
+                self._append(unit, _Line(line, page, khoan, diem))
+        
+        if unit.lines:
+            yield unit
+    
+    def _append(self, unit: _Unit, line: _Line) -> None:
+        unit.lines.append(line)
+        unit.length += self.length_function(line.text) + 1
+    
+    def _split_unit(self, unit: _Unit, base_metadata: Dict[str, Any]) -> List[Document]:
+        """
+        Chia một đơn vị thành các chunks không vượt chunk_size
+        """
+        # Dòng tiêu đề Điều được lặp lại ở đầu các chunk tiếp theo của Điều
+        header = None
+        if unit.dieu is not None:
+            header = next((l.text for l in unit.lines if DIEU_PATTERN.match(l.text)), None)
+        
+        chunks = []
+        for text, lines in self._split_lines(unit.lines, header, level=0):
+            if len(re.sub(r'\s+', '', text)) < self.min_chunk_chars:
+                continue
+            chunks.append(Document(
+                page_content=text,
+                metadata={**base_metadata, **self._structure_metadata(unit, lines)},
+            ))
+        return chunks
+    
+    def _join(self, lines: List[_Line], header: Optional[str]) -> str:
+        text = "\n".join(l.text for l in lines).strip()
+        if header and all(l.text != header for l in lines):
+            text = f"{header}\n{text}"
+        return text
+    
+    def _split_lines(self,
+                     lines: List[_Line],
+                     header: Optional[str],
+                     level: int) -> List[Tuple[str, List[_Line]]]:
+        """
+        Chia đệ quy theo Khoản (level 0), điểm (level 1), rồi fallback (level 2)
+        
+        Độ dài mỗi dòng chỉ được tính một lần, các nhóm được gom tham lam
+        nên mỗi level chạy tuyến tính theo số dòng.
+        """
+        text = self._join(lines, header)
+        if self.length_function(text) <= self.chunk_size:
+            return [(text, lines)]
+        
+        if level >= 2:
+            return [(piece, lines) for piece in self.fallback_splitter.split_text(text)]
+        
+        key = 'khoan' if level == 0 else 'diem'
+        groups = []
+        for line in lines:
+            # Phần đầu chưa thuộc Khoản/điểm nào (tiêu đề, dẫn nhập) được
+            # ghép vào nhóm đầu tiên thay vì thành một chunk riêng
+            leading = len(groups) == 1 and getattr(groups[0][-1], key) is None
+            if groups and (leading or getattr(groups[-1][-1], key) == getattr(line, key)):
+                groups[-1].append(line)
+            else:
+                groups.append([line])
+        
+        if len(groups) == 1:
+            return self._split_lines(lines, header, level + 1)
+        
+        header_length = self.length_function(header) + 1 if header else 0
+        result = []
+        current: List[_Line] = []
+        current_length = header_length
+        
+        for group in groups:
+            group_length = sum(
+                self.length_function(l.text) + 1 for l in group if l.text != header
+            )
+            if current and current_length + group_length > self.chunk_size:
+                result.extend(self._split_lines(current, header, level + 1))
+                current, current_length = [], header_length
+            current.extend(group)
+            current_length += group_length
+        
+        if current:
+            result.extend(self._split_lines(current, header, level + 1))
+        
+        return result
+    
+    @staticmethod
+    def _structure_metadata(unit: _Unit, lines: List[_Line]) -> Dict[str, Any]:
+        """
+        Metadata vị trí của chunk: Chương, Điều, đường dẫn và trang
+        """
+        metadata = {}
+        path = []
+        
+        if unit.chuong:
+            metadata['chuong'] = unit.chuong
+            path.append(unit.chuong)
+        
+        if unit.dieu:
+            metadata['dieu'] = unit.dieu
+            path.append(unit.dieu)
+            
+            khoans = sorted({l.khoan for l in lines if l.khoan}, key=int)
+            if len(khoans) == 1:
+                path.append(f"Khoản {khoans[0]}")
+                diems = [l.diem for l in lines if l.diem]
+                if diems and len(set(diems)) == 1:
+                    path.append(f"điểm {diems[0]}")
+            elif khoans:
+                path.append(f"Khoản {khoans[0]}-{khoans[-1]}")
+        
+        if path:
+            metadata['article_path'] = " > ".join(path)
+        
+        pages = [l.page for l in lines if l.page is not None]
+        if pages:
+            metadata['page'] = pages[0]
+            metadata['page_end'] = pages[-1]
+        
+        return metadata
@@ -0,0 +1,171 @@
+"""
+Text Cleaning Module
+Làm sạch text OCR: bỏ header/footer lặp lại, số trang, dòng nhiễu và chuẩn hóa Unicode
+"""
+
+import re
+import unicodedata
+from collections import Counter
+from typing import List, Dict, Any, Tuple
+
+try:
+    from langchain_core.documents import Document
+except ImportError:
+    from langchain.schema import Document
+
+from src.chunking import PAGE_MARKER_PATTERN, CHUONG_PATTERN, DIEU_PATTERN
+
+
+_PAGE_SPLIT_PATTERN = re.compile(r'^(\s*-{3}\s*Trang\s+\d+\s*-{3}\s*)$', re.MULTILINE)
+_PAGE_NUMBER_PATTERN = re.compile(
+    r'^\s*(?:trang\s*)?[-–—(\[]?\s*\d{1,4}\s*(?:/\s*\d{1,4})?\s*[-–—)\]]?\s*$',
+    re.IGNORECASE,
+)
+_SPACES_PATTERN = re.compile(r'[ \t\u00a0\u200b]+')
+_BLANK_LINES_PATTERN = re.compile(r'\n{3,}')
+_DIGITS_PATTERN = re.compile(r'\d+')
+
+
+def _line_key(line: str) -> str:
+    """
+    Key so sánh dòng lặp lại: bỏ khác biệt về hoa/thường và số (số trang, ngày)
+    """
+    return _DIGITS_PATTERN.sub('#', line.lower())
+
+
+def _is_noise(line: str, min_alnum_ratio: float) -> bool:
+    """
+    Dòng rác của tesseract: phần lớn là ký hiệu thay vì chữ/số
+    """
+    chars = line.replace(' ', '')
+    if not chars:
+        return False
+    alnum = sum(1 for c in chars if c.isalnum())
+    return alnum / len(chars) < min_alnum_ratio
+
+
+def _is_protected(line: str) -> bool:
+    """
+    Dòng cấu trúc không bao giờ được xóa (marker trang, Chương, Điều)
+    """
+    return bool(
+        PAGE_MARKER_PATTERN.match(line) or CHUONG_PATTERN.match(line) or DIEU_PATTERN.match(line)
+    )
+
+
+class TextCleaner:
+    """
+    Làm sạch các Document của cùng một file nguồn
+    
+    Các trang được lấy từ từng Document (PDF) hoặc từ marker '--- Trang N ---'
+    (file OCR). Dòng nằm ở vùng đầu/cuối trang và lặp lại trên nhiều trang
+    được coi là header/footer và bị xóa.
+    """
+    
+    def __init__(self,
+                 edge_lines: int = 3,
+                 min_repeat_pages: int = 3,
+                 min_repeat_ratio: float = 0.3,
+                 max_repeated_line_chars: int = 120,
+                 min_alnum_ratio: float = 0.6):
+        """
+        Khởi tạo cleaner
+        
+        Args:
+            edge_lines: Số dòng đầu/cuối mỗi trang được xét là header/footer
+            min_repeat_pages: Số trang tối thiểu một dòng phải lặp lại
+            min_repeat_ratio: Tỉ lệ số trang tối thiểu một dòng phải lặp lại
+            max_repeated_line_chars: Dòng dài hơn không bị coi là header/footer
+            min_alnum_ratio: Dòng có tỉ lệ chữ/số thấp hơn bị coi là nhiễu OCR
+        """
+        self.edge_lines = edge_lines
+        self.min_repeat_pages = min_repeat_pages
+        self.min_repeat_ratio = min_repeat_ratio
+        self.max_repeated_line_chars = max_repeated_line_chars
+        self.min_alnum_ratio = min_alnum_ratio
+    
+    @staticmethod
+    def normalize(text: str) -> str:
+        """
+        Chuẩn hóa Unicode (NFC) và khoảng trắng
+        """
+        text = unicodedata.normalize('NFC', text).replace('\r\n', '\n').replace('\r', '\n')
+        lines = [_SPACES_PATTERN.sub(' ', line).strip() for line in text.split('\n')]
+        return _BLANK_LINES_PATTERN.sub('\n\n', '\n'.join(lines)).strip()
+    
+    def _edge_lines(self, page: str) -> List[str]:
+        lines = [
+            line for line in page.split('\n')
+            if line and not _is_protected(line) and not _PAGE_NUMBER_PATTERN.match(line)
+        ]
+        if len(lines) <= 2 * self.edge_lines:
+            return lines
+        return lines[:self.edge_lines] + lines[-self.edge_lines:]
+    
+    def learn_repeated_lines(self, pages: List[str]) -> set:
+        """
+        Tìm các dòng header/footer lặp lại giữa các trang
+        
+        Args:
+            pages: Text đã chuẩn hóa của từng trang
+        
+        Returns:
+            Tập key (xem _line_key) của các dòng lặp lại
+        """
+        counts = Counter()
+        for page in pages:
+            counts.update({
+                _line_key(line) for line in self._edge_lines(page)
+                if len(line) <= self.max_repeated_line_chars
+            })
+        
+        min_pages = max(self.min_repeat_pages, int(self.min_repeat_ratio * len(pages)))
+        return {key for key, count in counts.items() if count >= min_pages}
+    
+    def _clean_page(self, page: str, repeated: set) -> str:
+        edge = set(self._edge_lines(page))
+        kept = []
+        for line in page.split('\n'):
+            if line and not _is_protected(line):
+                if _PAGE_NUMBER_PATTERN.match(line) or _is_noise(line, self.min_alnum_ratio):
+                    continue
+                if line in edge and _line_key(line) in repeated:
+                    continue
+            kept.append(line)
+        return _BLANK_LINES_PATTERN.sub('\n\n', '\n'.join(kept)).strip()
+    
+    def clean_documents(self, documents: List[Document]) -> Tuple[List[Document], Dict[str, int]]:
+        """
+        Làm sạch các Document của một file
+        
+        Args:
+            documents: List of Document objects của cùng một file
+        
+        Returns:
+            Tuple (documents đã làm sạch, {'bytes_before', 'bytes_after'})
+        """
+        bytes_before = sum(len(doc.page_content.encode('utf-8')) for doc in documents)
+        
+        # Tách trang: Document có marker được chia theo marker, giữ marker lại
+        pages = []
+        layout = []
+        for doc in documents:
+            parts = _PAGE_SPLIT_PATTERN.split(self.normalize(doc.page_content))
+            layout.append(len(parts))
+            pages.extend(parts)
+        
+        repeated = self.learn_repeated_lines([p for p in pages if not PAGE_MARKER_PATTERN.match(p)])
+        
+        cleaned = []
+        offset = 0
+        for doc, n_parts in zip(documents, layout):
+            parts = [
+                part.strip() if PAGE_MARKER_PATTERN.match(part) else self._clean_page(part, repeated)
+                for part in pages[offset:offset + n_parts]
+            ]
+            offset += n_parts
+            text = '\n'.join(part for part in parts if part)
+            cleaned.append(Document(page_content=text, metadata=doc.metadata))
+        
+        bytes_after = sum(len(doc.page_content.encode('utf-8')) for doc in cleaned)
+        return cleaned, {'bytes_before': bytes_before, 'bytes_after': bytes_after}
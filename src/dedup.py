@@ -0,0 +1,207 @@
+"""
+Near-Duplicate Filter Module
+Loại bỏ các chunks gần trùng nhau bằng MinHash + LSH trước khi embed
+"""
+
+import re
+import zlib
+import unicodedata
+from typing import List, Dict, Any, Iterable, Iterator, Optional
+
+import numpy as np
+
+try:
+    from langchain_core.documents import Document
+except ImportError:
+    from langchain.schema import Document
+
+
+_WORD_PATTERN = re.compile(r'\w+')
+
+# Số nguyên tố Mersenne 2^61 - 1 cho họ hàm hash (a * x + b) mod p
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def _choose_bands(num_perm: int, threshold: float) -> int:
+    """
+    Chọn số band LSH sao cho ngưỡng xấp xỉ (1/b)^(1/r) gần threshold nhất
+    
+    Args:
+        num_perm: Số hàm hash MinHash
+        threshold: Ngưỡng Jaccard
+    
+    Returns:
+        Số band (ước của num_perm)
+    """
+    candidates = [b for b in range(1, num_perm + 1) if num_perm % b == 0]
+    return min(
+        candidates,
+        key=lambda b: abs((1 / b) ** (b / num_perm) - threshold),
+    )
+
+
+def _append_value(metadata: Dict[str, Any], name: str, value: str, own_value: Optional[str]) -> None:
+    """
+    Thêm value vào danh sách metadata[name] (chuỗi ngăn cách bằng '; ',
+    vì metadata của Chroma chỉ nhận giá trị scalar)
+    """
+    if not value or value == own_value:
+        return
+    values = metadata[name].split('; ') if metadata.get(name) else []
+    if value not in values:
+        values.append(value)
+        metadata[name] = '; '.join(values)
+
+
+class NearDuplicateFilter:
+    """
+    Phát hiện chunks gần trùng (Jaccard trên shingles từ >= threshold)
+    
+    Chunk đầu tiên của mỗi nhóm được giữ làm đại diện; các chunk trùng sau
+    đó bị bỏ, nguồn của chúng được ghi vào metadata 'duplicate_sources' của
+    đại diện. Quan hệ file giữ đại diện -> các file có chunk bị bỏ được ghi
+    riêng vào duplicate_files (không phụ thuộc chunk đã yield), để khi file
+    đại diện bị xóa/thay đổi các file kia được index lại (xem IndexManifest).
+    Trạng thái được giữ giữa các lần gọi nên có thể lọc theo stream.
+    """
+    
+    def __init__(self,
+                 threshold: float = 0.85,
+                 num_perm: int = 128,
+                 shingle_size: int = 5,
+                 seed: int = 42):
+        """
+        Khởi tạo filter
+        
+        Args:
+            threshold: Ngưỡng Jaccard ước lượng để coi là trùng (0-1)
+            num_perm: Số hàm hash MinHash (càng lớn càng chính xác, càng chậm)
+            shingle_size: Số từ mỗi shingle
+            seed: Seed sinh hàm hash (cố định để kết quả lặp lại được)
+        """
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands = _choose_bands(num_perm, threshold)
+        self.rows = num_perm // self.bands
+        
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+        
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(self.bands)]
+        self._signatures: List[np.ndarray] = []
+        self._representatives: List[Document] = []
+        self.duplicate_files: Dict[str, List[str]] = {}
+        self.num_seen = 0
+        self.num_duplicates = 0
+    
+    def _shingles(self, text: str) -> np.ndarray:
+        words = _WORD_PATTERN.findall(unicodedata.normalize('NFC', text).lower())
+        if len(words) < self.shingle_size:
+            grams = [' '.join(words)]
+        else:
+            grams = [
+                ' '.join(words[i:i + self.shingle_size])
+                for i in range(len(words) - self.shingle_size + 1)
+            ]
+        return np.array(sorted({zlib.crc32(g.encode('utf-8')) for g in grams}), dtype=np.uint64)
+    
+    def signature(self, text: str) -> np.ndarray:
+        """
+        Tính MinHash signature của text
+        
+        Args:
+            text: Nội dung chunk
+        
+        Returns:
+            Mảng uint64 độ dài num_perm
+        """
+        shingles = self._shingles(text)
+        # x, a, b < 2^32 nên a * x + b không tràn uint64
+        hashes = (np.outer(shingles, self._a) + self._b) % _MERSENNE_PRIME
+        return (hashes & _MAX_HASH).min(axis=0)
+    
+    def _find_duplicate(self, signature: np.ndarray) -> Optional[int]:
+        candidates = set()
+        for band in range(self.bands):
+            key = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            candidates.update(self._buckets[band].get(key, ()))
+        
+        best, best_similarity = None, self.threshold
+        for index in sorted(candidates):
+            similarity = float(np.mean(self._signatures[index] == signature))
+            if similarity >= best_similarity:
+                best, best_similarity = index, similarity
+        return best
+    
+    def _add(self, signature: np.ndarray, document: Document) -> None:
+        index = len(self._signatures)
+        self._signatures.append(signature)
+        self._representatives.append(document)
+        for band in range(self.bands):
+            key = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            self._buckets[band].setdefault(key, []).append(index)
+    
+    def iter_filter(self, documents: Iterable[Document]) -> Iterator[Document]:
+        """
+        Lọc chunks theo stream, yield ngay các chunk đại diện
+        
+        Đại diện đã được yield trước khi gặp bản trùng, nên metadata
+        'duplicate_sources' chỉ đầy đủ khi dùng filter_documents;
+        duplicate_files luôn đầy đủ sau khi duyệt hết.
+        
+        Args:
+            documents: Các chunks
+        
+        Yields:
+            Chunks không trùng với chunk nào trước đó
+        """
+        for document in documents:
+            self.num_seen += 1
+            signature = self.signature(document.page_content)
+            duplicate_of = self._find_duplicate(signature)
+            
+            if duplicate_of is None:
+                self._add(signature, document)
+                yield document
+                continue
+            
+            self.num_duplicates += 1
+            representative = self._representatives[duplicate_of]
+            _append_value(representative.metadata, 'duplicate_sources', document.metadata.get('source', ''),
+                          representative.metadata.get('source'))
+            self._record_file(representative.metadata.get('file_path'), document.metadata.get('file_path'))
+            representative.metadata['duplicate_count'] = (
+                representative.metadata.get('duplicate_count', 0) + 1
+            )
+    
+    def _record_file(self, representative_path: Optional[str], duplicate_path: Optional[str]) -> None:
+        if not representative_path or not duplicate_path or duplicate_path == representative_path:
+            return
+        paths = self.duplicate_files.setdefault(representative_path, [])
+        if duplicate_path not in paths:
+            paths.append(duplicate_path)
+    
+    def filter_documents(self, documents: List[Document]) -> List[Document]:
+        """
+        Lọc một list chunks
+        
+        Args:
+            documents: List of chunked Document objects
+        
+        Returns:
+            List các chunk đại diện
+        """
+        return list(self.iter_filter(documents))
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Thống kê số chunks đã xét và đã loại
+        """
+        return {
+            'seen': self.num_seen,
+            'duplicates': self.num_duplicates,
+            'kept': self.num_seen - self.num_duplicates,
+        }
@@ -4,25 +4,15 @@ Xử lý và chia nhỏ documents từ nhiều định dạng
 """
 
 import os
+import time
+import hashlib
+from collections import deque
+from itertools import groupby
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Iterator, Tuple
 from tqdm import tqdm
 
-try:
-    from langchain_community.document_loaders import (
-        PyPDFLoader,
-        Docx2txtLoader,
-        TextLoader,
-        UnstructuredMarkdownLoader,
-    )
-except ImportError:
-    from langchain.document_loaders import (
-        PyPDFLoader,
-        Docx2txtLoader,
-        TextLoader,
-        UnstructuredMarkdownLoader,
-    )
-
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
 try:
@@ -30,6 +20,11 @@ try:
 except ImportError:
     from langchain.schema import Document
 
+from src.loaders import DEFAULT_LOADERS, get_loader
+from src.chunking import RegulationTextSplitter, EmbeddingTokenCounter
+from src.dedup import NearDuplicateFilter
+from src.cleaning import TextCleaner
+
 
 class DocumentProcessor:
     """
@@ -47,60 +42,212 @@ class DocumentProcessor:
         self.chunk_size = config['document_processing']['chunk_size']
         self.chunk_overlap = config['document_processing']['chunk_overlap']
         self.supported_formats = config['document_processing']['supported_formats']
+        self.num_workers = config['document_processing'].get('num_workers', 1)
+        
+        # Backend load theo định dạng (xem src/loaders.py)
+        self.loader_backends = {
+            **DEFAULT_LOADERS,
+            **(config['document_processing'].get('loaders') or {}),
+        }
+        
+        # Thống kê load của lần chạy gần nhất (mỗi file một entry)
+        self.load_stats: List[Dict[str, Any]] = []
         
-        # Khởi tạo text splitter
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=self.chunk_size,
-            chunk_overlap=self.chunk_overlap,
-            separators=config['document_processing']['separators'],
-            length_function=len,
+        # Đếm token theo tokenizer của embedding model (load khi cần)
+        self.length_unit = config['document_processing'].get('length_unit', 'chars')
+        self.report_truncation = config['document_processing'].get('report_truncation', False)
+        self.token_counter = EmbeddingTokenCounter(config['embedding'])
+        self.truncated_chunks = 0
+        
+        # Làm sạch text sau khi load (header/footer lặp lại, nhiễu OCR)
+        cleaning_config = dict(config['document_processing'].get('cleaning', {}))
+        self.cleaner = TextCleaner(**cleaning_config) if cleaning_config.pop('enabled', False) else None
+        
+        # Lọc chunks gần trùng (MinHash/LSH) sau khi split, chỉ khi build toàn bộ;
+        # duplicate_files (file giữ đại diện -> file bị bỏ chunk) được ghi vào manifest
+        # sau khi chunks của lần chạy đã được duyệt hết
+        self.dedup_config = config['document_processing'].get('dedup', {})
+        self.dedup_stats: Optional[Dict[str, Any]] = None
+        self.duplicate_files: Dict[str, List[str]] = {}
+        
+        # Text splitter được khởi tạo khi cần (worker chỉ load file không cần tới)
+        self.splitter_type = config['document_processing'].get('splitter', 'recursive')
+        self._text_splitter = None
+    
+    @property
+    def text_splitter(self):
+        """
+        Text splitter theo config (khởi tạo ở lần dùng đầu tiên)
+        """
+        if self._text_splitter is None:
+            self._text_splitter = self._build_text_splitter()
+        return self._text_splitter
+        
+    def _build_text_splitter(self):
+        """
+        Khởi tạo text splitter theo config document_processing.splitter
+        
+        Với length_unit 'tokens', độ dài được đo bằng tokenizer của embedding
+        model và chunk_size không vượt quá số token tối đa của model.
+        
+        Returns:
+            Splitter có method split_documents
+        """
+        # chunk_size/chunk_overlap của processor giữ đơn vị ký tự như trong config
+        if self.length_unit == 'tokens':
+            chunk_size = min(
+                self.config['document_processing'].get('chunk_size_tokens', self.token_counter.window),
+                self.token_counter.window,
+            )
+            chunk_overlap = self.config['document_processing'].get('chunk_overlap_tokens', 32)
+            length_function = self.token_counter
+        elif self.length_unit == 'chars':
+            chunk_size, chunk_overlap = self.chunk_size, self.chunk_overlap
+            length_function = len
+        else:
+            raise ValueError(f"length_unit không được hỗ trợ: {self.length_unit}")
+        
+        recursive_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            separators=self.config['document_processing']['separators'],
+            length_function=length_function,
         )
         
+        if self.splitter_type == 'recursive':
+            return recursive_splitter
+        elif self.splitter_type == 'regulation':
+            return RegulationTextSplitter(
+                chunk_size=chunk_size,
+                fallback_splitter=recursive_splitter,
+                length_function=length_function,
+            )
+        else:
+            raise ValueError(f"Splitter không được hỗ trợ: {self.splitter_type}")
+    
     def load_document(self, file_path: str) -> List[Document]:
         """
         Load một document từ file
         
+        Lỗi không được raise mà được in ra và ghi vào load_stats (mục cuối
+        cùng là của lần gọi này), để phân biệt file lỗi với file rỗng.
+        
         Args:
             file_path: Đường dẫn đến file
             
         Returns:
             List of Document objects
         """
-        file_extension = Path(file_path).suffix.lower().replace('.', '')
+        result = self._load_file_timed(str(file_path))
+        if result['error']:
+            print(f"❌ Lỗi khi load file {file_path}: {result['error']}")
+        self.load_stats.append({k: v for k, v in result.items() if k != 'documents'})
+        return result['documents']
+    
+    def _load_and_clean(self, file_path: str) -> Tuple[List[Document], int]:
+        """
+        Load một document và làm sạch text (nếu bật cleaning)
         
-        try:
-            if file_extension == 'pdf':
-                loader = PyPDFLoader(file_path)
-            elif file_extension == 'docx':
-                loader = Docx2txtLoader(file_path)
-            elif file_extension == 'txt':
-                loader = TextLoader(file_path, encoding='utf-8')
-            elif file_extension == 'md':
-                loader = UnstructuredMarkdownLoader(file_path)
-            else:
-                print(f"⚠️  Định dạng không được hỗ trợ: {file_extension}")
-                return []
-            
-            documents = loader.load()
+        Args:
+            file_path: Đường dẫn đến file
             
-            # Thêm metadata
-            for doc in documents:
-                doc.metadata['source'] = os.path.basename(file_path)
-                doc.metadata['file_path'] = file_path
-                doc.metadata['file_type'] = file_extension
+        Returns:
+            Tuple (documents, số bytes đã bị xóa)
+        """
+        documents = self._load_document(file_path)
+        if self.cleaner is None or not documents:
+            return documents, 0
+        
+        documents, stats = self.cleaner.clean_documents(documents)
+        return documents, stats['bytes_before'] - stats['bytes_after']
+    
+    def _load_document(self, file_path: str) -> List[Document]:
+        """
+        Load một document từ file, raise exception nếu lỗi
+        
+        Args:
+            file_path: Đường dẫn đến file
             
-            return documents
+        Returns:
+            List of Document objects
+        """
+        file_extension = Path(file_path).suffix.lower().replace('.', '')
+        
+        loader = get_loader(file_extension, self.loader_backends.get(file_extension))
+        if loader is None:
+            print(f"⚠️  Định dạng không được hỗ trợ: {file_extension}")
+            return []
+        
+        documents = loader(file_path, self.config['document_processing'])
+        
+        # Thêm metadata
+        for doc in documents:
+            doc.metadata['source'] = os.path.basename(file_path)
+            doc.metadata['file_path'] = file_path
+            doc.metadata['file_type'] = file_extension
+        
+        return documents
+    
+    def _load_file_timed(self, file_path: str) -> Dict[str, Any]:
+        """
+        Load một file và đo thời gian, không raise exception
+        
+        Args:
+            file_path: Đường dẫn đến file
             
+        Returns:
+            Dictionary gồm documents, số trang, thời gian và lỗi (nếu có)
+        """
+        start = time.perf_counter()
+        try:
+            documents, bytes_removed = self._load_and_clean(file_path)
+            error = None
         except Exception as e:
-            print(f"❌ Lỗi khi load file {file_path}: {str(e)}")
-            return []
+            documents, bytes_removed = [], 0
+            error = str(e)
+        
+        return {
+            'file': file_path,
+            'documents': documents,
+            'pages': len(documents),
+            'bytes_removed': bytes_removed,
+            'seconds': time.perf_counter() - start,
+            'error': error,
+        }
+    
+    def find_files(self, directory: str) -> List[Path]:
+        """
+        Tìm tất cả files với định dạng được hỗ trợ trong thư mục
+        
+        Args:
+            directory: Đường dẫn thư mục chứa documents
+            
+        Returns:
+            List of file paths
+        """
+        directory_path = Path(directory)
+        files = []
+        for ext in self.supported_formats:
+            files.extend(directory_path.rglob(f"*.{ext}"))
+        
+        # PDF đã có bản OCR (scripts/ocr_pdfs.py ghép cả text gốc lẫn text OCR
+        # vào <tên>_ocr.txt) thì chỉ index bản OCR để tránh trùng lặp. File
+        # _ocr.txt chỉ xuất hiện khi OCR xong mọi trang (ghi vào _ocr.txt.tmp
+        # rồi đổi tên), nên bản OCR dở dang không thay thế PDF
+        return [
+            f for f in files
+            if not (f.suffix.lower() == '.pdf' and f.with_name(f"{f.stem}_ocr.txt").exists())
+        ]
     
-    def load_documents_from_directory(self, directory: str) -> List[Document]:
+    def load_documents_from_directory(self, 
+                                      directory: str,
+                                      num_workers: Optional[int] = None) -> List[Document]:
         """
         Load tất cả documents từ một thư mục
         
         Args:
             directory: Đường dẫn thư mục chứa documents
+            num_workers: Số process load song song (mặc định theo config)
             
         Returns:
             List of Document objects
@@ -113,20 +260,115 @@ class DocumentProcessor:
             return []
         
         # Tìm tất cả files với định dạng được hỗ trợ
-        files = []
-        for ext in self.supported_formats:
-            files.extend(directory_path.rglob(f"*.{ext}"))
+        files = self.find_files(directory)
         
         print(f"📚 Tìm thấy {len(files)} file(s) để xử lý...")
         
-        # Load từng file
-        for file_path in tqdm(files, desc="Loading documents"):
-            docs = self.load_document(str(file_path))
-            all_documents.extend(docs)
+        num_workers = num_workers or self.num_workers
+        start = time.perf_counter()
+        
+        # Kết quả giữ nguyên thứ tự files, giống chế độ tuần tự
+        for result in self._iter_load_results(files, num_workers):
+            all_documents.extend(result['documents'])
         
+        elapsed = time.perf_counter() - start
         print(f"✅ Đã load {len(all_documents)} document(s)")
+        self._print_load_summary(elapsed, num_workers)
         return all_documents
     
+    def _iter_load_results(self, files: List[Path], num_workers: int) -> Iterator[Dict[str, Any]]:
+        """
+        Load lần lượt các files (tuần tự hoặc song song) và ghi nhận load_stats
+        
+        Args:
+            files: List of file paths
+            num_workers: Số process
+            
+        Yields:
+            Kết quả load của từng file, theo thứ tự của files
+        """
+        if num_workers > 1 and len(files) > 1:
+            results = self._load_files_parallel(files, num_workers)
+        else:
+            results = (
+                self._load_file_timed(str(file_path))
+                for file_path in tqdm(files, desc="Loading documents")
+            )
+        
+        self.load_stats = []
+        self.split_stats: Dict[str, Dict[str, Any]] = {}
+        for result in results:
+            if result['error']:
+                print(f"❌ Lỗi khi load file {result['file']}: {result['error']}")
+            self.load_stats.append({k: v for k, v in result.items() if k != 'documents'})
+            yield result
+    
+    def _load_files_parallel(self, files: List[Path], num_workers: int) -> Iterator[Dict[str, Any]]:
+        """
+        Load files song song bằng process pool
+        
+        Chỉ giữ tối đa 2 * num_workers file đang xử lý, nên bộ nhớ không
+        tăng theo số file khi bên tiêu thụ chậm hơn (ví dụ đang embed).
+        
+        Args:
+            files: List of file paths
+            num_workers: Số process
+            
+        Yields:
+            Kết quả load của từng file, theo thứ tự của files
+        """
+        max_in_flight = 2 * num_workers
+        pending = deque()
+        file_iter = iter(files)
+        
+        with ProcessPoolExecutor(
+            max_workers=num_workers,
+            initializer=_init_load_worker,
+            initargs=(self.config,),
+        ) as executor:
+            with tqdm(total=len(files), desc=f"Loading documents ({num_workers} workers)") as pbar:
+                for file_path in file_iter:
+                    pending.append(executor.submit(_load_file_in_worker, str(file_path)))
+                    if len(pending) >= max_in_flight:
+                        break
+                
+                while pending:
+                    result = pending.popleft().result()
+                    next_file = next(file_iter, None)
+                    if next_file is not None:
+                        pending.append(executor.submit(_load_file_in_worker, str(next_file)))
+                    pbar.update(1)
+                    yield result
+    
+    def _print_load_summary(self, elapsed: float, num_workers: int) -> None:
+        """
+        In thống kê throughput của lần load gần nhất
+        
+        Args:
+            elapsed: Tổng thời gian load (giây)
+            num_workers: Số process đã dùng
+        """
+        n_files = len(self.load_stats)
+        n_pages = sum(s['pages'] for s in self.load_stats)
+        failed = [s['file'] for s in self.load_stats if s['error']]
+        elapsed = max(elapsed, 1e-9)
+        
+        print(f"⏱️  {n_files} file(s), {n_pages} trang trong {elapsed:.1f}s "
+              f"({n_files / elapsed:.2f} files/s, {n_pages / elapsed:.2f} pages/s, "
+              f"{num_workers} worker(s))")
+        
+        if self.cleaner is not None:
+            cleaned = [s for s in self.load_stats if s['bytes_removed']]
+            total = sum(s['bytes_removed'] for s in cleaned)
+            print(f"🧽 Cleaning: xóa {total:,} bytes header/footer, số trang và nhiễu OCR")
+            for file_stats in cleaned:
+                print(f"   - {os.path.basename(file_stats['file'])}: {file_stats['bytes_removed']:,} bytes")
+        
+        if failed:
+            print(f"⚠️  {len(failed)} file(s) load thất bại:")
+            for file_path in failed:
+                print(f"   - {file_path}")
+    
     def split_documents(self, documents: List[Document]) -> List[Document]:
         """
         Chia documents thành các chunks nhỏ hơn
@@ -138,10 +380,183 @@ class DocumentProcessor:
             List of chunked Document objects
         """
         print(f"✂️  Đang chia documents thành chunks...")
-        chunks = self.text_splitter.split_documents(documents)
+        self.truncated_chunks = 0
+        self.split_stats = {}
+        
+        # Chia theo từng file để đo thời gian split của mỗi file
+        chunks = []
+        for _, file_documents in groupby(documents, key=lambda doc: doc.metadata.get('file_path')):
+            chunks.extend(self._split(list(file_documents)))
         print(f"✅ Đã tạo {len(chunks)} chunk(s)")
+        self._print_truncation_report(len(chunks))
         return chunks
     
+    def _split(self, documents: List[Document]) -> List[Document]:
+        """
+        Chia documents thành chunks và gán chunk ID (không in log)
+        
+        Thời gian và số chunks được cộng vào split_stats theo file nguồn.
+        
+        Args:
+            documents: List of Document objects (thường của cùng một file)
+            
+        Returns:
+            List of chunked Document objects
+        """
+        start = time.perf_counter()
+        chunks = self.text_splitter.split_documents(documents)
+        
+        if self.length_unit == 'tokens':
+            chunks = self._enforce_token_window(chunks)
+        elif self.report_truncation:
+            try:
+                window = self.token_counter.window
+                self.truncated_chunks += sum(
+                    1 for chunk in chunks if self.token_counter(chunk.page_content) > window
+                )
+            except Exception as e:
+                print(f"⚠️  Không load được tokenizer của embedding model, bỏ qua báo cáo truncation: {e}")
+                self.report_truncation = False
+        
+        chunks = assign_chunk_ids(chunks)
+        
+        if documents:
+            file_stats = self.split_stats.setdefault(
+                documents[0].metadata.get('file_path'), {'seconds': 0.0, 'chunks': 0}
+            )
+            file_stats['seconds'] += time.perf_counter() - start
+            file_stats['chunks'] += len(chunks)
+        
+        return chunks
+    
+    def _enforce_token_window(self, chunks: List[Document]) -> List[Document]:
+        """
+        Đảm bảo mọi chunk vừa cửa sổ token của embedding model
+        
+        Splitter đã đo theo token nên thường không có chunk nào vượt; chunk
+        vượt (do token ghép qua ranh giới khi nối các đoạn) được cắt tiếp.
+        
+        Args:
+            chunks: List of chunked Document objects
+            
+        Returns:
+            List of chunked Document objects
+        """
+        window = self.token_counter.window
+        result = []
+        
+        for chunk in chunks:
+            if self.token_counter(chunk.page_content) <= window:
+                result.append(chunk)
+                continue
+            for piece in self.token_counter.fit_to_window(chunk.page_content, window):
+                result.append(Document(page_content=piece, metadata=dict(chunk.metadata)))
+        
+        return result
+    
+    def _print_truncation_report(self, total_chunks: int) -> None:
+        """
+        In số chunks sẽ bị embedding model cắt bớt (length_unit 'chars')
+        
+        Args:
+            total_chunks: Tổng số chunks
+        """
+        if self.length_unit != 'chars' or not self.report_truncation:
+            return
+        
+        if self.truncated_chunks:
+            print(f"⚠️  {self.truncated_chunks}/{total_chunks} chunk(s) dài hơn "
+                  f"{self.token_counter.window} tokens của embedding model: phần cuối sẽ bị "
+                  f"cắt khi embed (dùng length_unit: tokens để tránh)")
+        else:
+            print(f"✅ Không có chunk nào vượt {self.token_counter.window} tokens của embedding model")
+    
+    def iter_chunks(self, 
+                    directory: str,
+                    num_workers: Optional[int] = None) -> Iterator[Document]:
+        """
+        Pipeline dạng generator: load từng file, chia chunks và yield ngay
+        
+        Chỉ giữ chunks của các file đang xử lý trong bộ nhớ, thay vì toàn bộ
+        corpus như process_documents.
+        
+        Args:
+            directory: Đường dẫn thư mục chứa documents
+            num_workers: Số process load song song (mặc định theo config)
+            
+        Yields:
+            Document chunks, theo thứ tự file
+        """
+        if not Path(directory).exists():
+            print(f"❌ Thư mục không tồn tại: {directory}")
+            return
+        
+        files = self.find_files(directory)
+        print(f"📚 Tìm thấy {len(files)} file(s) để xử lý...")
+        
+        num_workers = num_workers or self.num_workers
+        start = time.perf_counter()
+        self.truncated_chunks = 0
+        self.split_stats = {}
+        total_chunks = 0
+        dedup = self._new_dedup_filter()
+        
+        for result in self._iter_load_results(files, num_workers):
+            if result['documents']:
+                chunks = self._split(result['documents'])
+                total_chunks += len(chunks)
+                yield from (dedup.iter_filter(chunks) if dedup else chunks)
+        
+        self._print_load_summary(time.perf_counter() - start, num_workers)
+        self._print_truncation_report(total_chunks)
+        if dedup:
+            self._finish_dedup(dedup)
+    
+    def _new_dedup_filter(self) -> Optional[NearDuplicateFilter]:
+        """
+        Tạo near-duplicate filter theo config document_processing.dedup
+        
+        Returns:
+            NearDuplicateFilter, hoặc None nếu không bật
+        """
+        self.duplicate_files.clear()
+        if not self.dedup_config.get('enabled', False):
+            return None
+        return NearDuplicateFilter(
+            threshold=self.dedup_config.get('threshold', 0.85),
+            num_perm=self.dedup_config.get('num_perm', 128),
+            shingle_size=self.dedup_config.get('shingle_size', 5),
+        )
+    
+    def deduplicate(self, chunks: List[Document]) -> List[Document]:
+        """
+        Loại các chunks gần trùng, giữ chunk đầu tiên làm đại diện
+        
+        Nguồn của các bản trùng được ghi vào metadata 'duplicate_sources'
+        (chuỗi, ngăn cách bằng '; ') và 'duplicate_count' của đại diện, các
+        file có chunk bị bỏ vào duplicate_files.
+        
+        Args:
+            chunks: List of chunked Document objects
+            
+        Returns:
+            List of chunked Document objects đã lọc
+        """
+        dedup = self._new_dedup_filter()
+        if dedup is None:
+            return chunks
+        
+        kept = dedup.filter_documents(chunks)
+        self._finish_dedup(dedup)
+        return kept
+    
+    def _finish_dedup(self, dedup: NearDuplicateFilter) -> None:
+        # Cập nhật tại chỗ: ChunkStore.write giữ cùng dict và đọc khi stream kết thúc
+        self.duplicate_files.update(dedup.duplicate_files)
+        stats = self.dedup_stats = dedup.stats()
+        print(f"🧹 Near-duplicate: loại {stats['duplicates']}/{stats['seen']} chunk(s) "
+              f"(Jaccard >= {dedup.threshold}), còn {stats['kept']}")
+    
     def process_documents(self, directory: str) -> List[Document]:
         """
         Process pipeline hoàn chỉnh: load + split
@@ -162,6 +577,9 @@ class DocumentProcessor:
         # Split into chunks
         chunks = self.split_documents(documents)
         
+        # Loại chunks gần trùng
+        chunks = self.deduplicate(chunks)
+        
         return chunks
     
     def get_document_stats(self, documents: List[Document]) -> Dict[str, Any]:
@@ -194,6 +612,68 @@ class DocumentProcessor:
         }
 
 
+# Processor riêng cho mỗi worker process, khởi tạo một lần bởi initializer
+_worker_processor: Optional[DocumentProcessor] = None
+
+
+def _init_load_worker(config: Dict[str, Any]) -> None:
+    """
+    Khởi tạo DocumentProcessor trong worker process
+    
+    Args:
+        config: Configuration dictionary
+    """
+    global _worker_processor
+    _worker_processor = DocumentProcessor(config)
+
+
+def _load_file_in_worker(file_path: str) -> Dict[str, Any]:
+    """
+    Load một file trong worker process
+    
+    Args:
+        file_path: Đường dẫn đến file
+        
+    Returns:
+        Kết quả load (xem DocumentProcessor._load_file_timed)
+    """
+    return _worker_processor._load_file_timed(file_path)
+
+
+def assign_chunk_ids(chunks: List[Document]) -> List[Document]:
+    """
+    Gán ID ổn định cho từng chunk, suy ra từ đường dẫn file và hash nội dung
+    
+    Cùng một file với cùng nội dung luôn cho ra cùng các ID, nên vectorstore
+    có thể upsert/xóa theo ID thay vì thêm bản sao mỗi lần index lại.
+    
+    Args:
+        chunks: List of chunked Document objects
+        
+    Returns:
+        Chính list chunks, với metadata 'chunk_id' và 'content_hash'
+    """
+    occurrences = {}
+    
+    for chunk in chunks:
+        source_path = chunk.metadata.get('file_path', chunk.metadata.get('source', ''))
+        content_hash = hashlib.sha256(chunk.page_content.encode('utf-8')).hexdigest()
+        
+        # Chunk trùng nội dung trong cùng một file được phân biệt bằng số thứ tự
+        key = (source_path, content_hash)
+        occurrence = occurrences.get(key, 0)
+        occurrences[key] = occurrence + 1
+        
+        chunk_id = hashlib.sha256(
+            f"{source_path}\x00{content_hash}\x00{occurrence}".encode('utf-8')
+        ).hexdigest()[:32]
+        
+        chunk.metadata['content_hash'] = content_hash
+        chunk.metadata['chunk_id'] = chunk_id
+    
+    return chunks
+
+
 def add_custom_metadata(documents: List[Document], 
                         metadata: Dict[str, Any]) -> List[Document]:
     """
@@ -213,8 +693,8 @@ def add_custom_metadata(documents: List[Document],
 
 
 if __name__ == "__main__":
-    # Test document processor
-    from utils import load_config
+    # Test document processor (chạy từ thư mục gốc: python -m src.document_processor)
+    from src.utils import load_config
     
     config = load_config()
     processor = DocumentProcessor(config)
@@ -0,0 +1,525 @@
+"""
+Embedding Cache Module
+Cache embedding trên đĩa theo nội dung (vector float16 trong file memmap, index trong SQLite)
+và cache vector của query trong bộ nhớ
+"""
+
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Set, Tuple, Union, Iterable, Iterator
+
+import numpy as np
+
+try:
+    from langchain_core.embeddings import Embeddings
+except ImportError:
+    from langchain.embeddings.base import Embeddings
+
+from src.utils import embed_queries
+
+
+_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, slot INTEGER NOT NULL, last_used REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)",
+    "CREATE TABLE IF NOT EXISTS free_slots (slot INTEGER PRIMARY KEY)",
+    "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)",
+]
+
+_INITIAL_CAPACITY = 1024
+
+# Số key đã đọc được gom lại trước khi ghi last_used (LRU xấp xỉ)
+_TOUCH_BATCH = 1000
+
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def _model_dirname(model_name: str) -> str:
+    return re.sub(r'[^\w.-]+', '_', model_name)
+
+
+class DiskEmbeddingCache:
+    """
+    Cache vector theo key (model, loại, hash của text đã chuẩn hóa)
+    
+    Vector được lưu dạng float16 trong vectors.f16 (memmap, mỗi slot một
+    hàng), SQLite giữ key -> slot và thời điểm dùng gần nhất. Khi đầy,
+    các entry lâu không dùng nhất bị xóa và slot của chúng vào free list
+    để tái sử dụng. Mỗi model có một thư mục riêng.
+    
+    Nhiều process có thể dùng chung thư mục (app và job ingest): mỗi lần
+    ghi chạy trong một transaction BEGIN IMMEDIATE, đọc lại meta
+    (dim, capacity, next_slot) từ SQLite nên không có hai process cùng
+    cấp một slot. Đọc không giữ khóa ghi: slot bị evict chỉ được ghi đè
+    sau khi việc xóa entry đã commit, nên get_many kiểm tra lại entry sau
+    khi copy vector. last_used được cập nhật theo lô (LRU xấp xỉ).
+    """
+    
+    def __init__(self,
+                 directory: Union[str, Path],
+                 model_name: str,
+                 max_entries: int = 200_000,
+                 evict_fraction: float = 0.1):
+        """
+        Khởi tạo cache
+        
+        Args:
+            directory: Thư mục gốc của cache
+            model_name: Tên embedding model
+            max_entries: Số vector tối đa
+            evict_fraction: Tỉ lệ entry bị xóa mỗi lần cache đầy
+        """
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.evict_fraction = evict_fraction
+        self.directory = Path(directory) / _model_dirname(model_name)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = self.directory / 'vectors.f16'
+        
+        self._lock = threading.Lock()
+        # isolation_level=None: transaction được mở/đóng tường minh (xem _transaction)
+        self._conn = sqlite3.connect(
+            self.directory / 'index.sqlite3', check_same_thread=False, timeout=30, isolation_level=None
+        )
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+        
+        self.dim: Optional[int] = None
+        self.capacity = 0
+        self.next_slot = 0
+        self._vectors: Optional[np.memmap] = None
+        self._refresh_meta()
+        self._touched: Dict[str, float] = {}
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    @staticmethod
+    def normalize(text: str) -> str:
+        """
+        Chuẩn hóa text trước khi hash (NFC, bỏ khoảng trắng đầu/cuối)
+        """
+        return unicodedata.normalize('NFC', text).strip()
+    
+    def make_key(self, text: str, kind: str = 'document') -> str:
+        """
+        Key của một text
+        
+        Args:
+            text: Text được embed
+            kind: 'document' hoặc 'query' (một số model embed hai loại khác nhau)
+        """
+        payload = f"{self.model_name}\x00{kind}\x00{self.normalize(text)}"
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        """
+        Transaction giữ khóa ghi của database (loại trừ cả các process khác)
+        
+        Meta được đọc lại ngay sau khi có khóa, vì process khác có thể đã
+        cấp thêm slot hoặc tăng kích thước file vector.
+        """
+        self._conn.execute('BEGIN IMMEDIATE')
+        try:
+            self._refresh_meta()
+            yield
+        except BaseException:
+            self._conn.execute('ROLLBACK')
+            raise
+        self._conn.execute('COMMIT')
+    
+    @contextmanager
+    def _read_transaction(self) -> Iterator[None]:
+        """
+        Transaction chỉ đọc (không chặn process khác ghi), các lệnh SELECT
+        bên trong thấy cùng một snapshot
+        """
+        self._conn.execute('BEGIN')
+        try:
+            self._refresh_meta()
+            yield
+        finally:
+            self._conn.execute('COMMIT')
+    
+    def _refresh_meta(self) -> None:
+        meta = dict(self._conn.execute('SELECT name, value FROM meta').fetchall())
+        self.dim = int(meta['dim']) if 'dim' in meta else None
+        self.next_slot = int(meta.get('next_slot', 0))
+        capacity = int(meta.get('capacity', 0))
+        if capacity != self.capacity or (self._vectors is None and capacity):
+            self.capacity = capacity
+            self._vectors = None
+            if self.dim is not None and capacity:
+                self._open_vectors()
+    
+    def _open_vectors(self) -> None:
+        self._vectors = np.memmap(
+            self.vectors_path, dtype=np.float16, mode='r+', shape=(self.capacity, self.dim)
+        )
+    
+    def _set_meta(self, name: str, value: Any) -> None:
+        self._conn.execute(
+            'INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)', (name, str(value))
+        )
+    
+    def _grow(self, min_capacity: int) -> None:
+        """
+        Tăng kích thước file vector (gấp đôi, tối đa max_entries)
+        """
+        new_capacity = max(self.capacity, _INITIAL_CAPACITY)
+        while new_capacity < min_capacity:
+            new_capacity *= 2
+        new_capacity = min(new_capacity, self.max_entries)
+        if new_capacity <= self.capacity:
+            return
+        
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        with open(self.vectors_path, 'ab') as f:
+            f.truncate(new_capacity * self.dim * 2)
+        
+        self.capacity = new_capacity
+        self._set_meta('capacity', new_capacity)
+        self._open_vectors()
+    
+    def _lookup(self, keys: List[str]) -> Dict[str, int]:
+        """
+        Key -> slot của các key đã có trong cache
+        """
+        found = {}
+        unique_keys = list(set(keys))
+        for start in range(0, len(unique_keys), 500):
+            chunk = unique_keys[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            found.update(self._conn.execute(
+                f'SELECT key, slot FROM entries WHERE key IN ({placeholders})', chunk
+            ).fetchall())
+        return found
+    
+    def _evict(self, protected: Set[str]) -> None:
+        """
+        Xóa các entry lâu không dùng nhất, đưa slot vào free list
+        
+        Args:
+            protected: Các key đang được ghi, không được xóa
+        """
+        count = max(1, int(self.max_entries * self.evict_fraction))
+        rows = self._conn.execute(
+            'SELECT key, slot FROM entries ORDER BY last_used LIMIT ?', (count + len(protected),)
+        ).fetchall()
+        rows = [(key, slot) for key, slot in rows if key not in protected][:count]
+        self._conn.executemany('DELETE FROM entries WHERE key = ?', [(key,) for key, _ in rows])
+        self._conn.executemany('INSERT OR IGNORE INTO free_slots (slot) VALUES (?)', [(slot,) for _, slot in rows])
+        self.evictions += len(rows)
+    
+    def _allocate_slots(self, n: int, protected: Set[str]) -> List[int]:
+        """
+        Cấp n slot: lấy từ free list trước, sau đó các slot chưa dùng, cuối cùng evict
+        """
+        slots: List[int] = []
+        while len(slots) < n:
+            needed = n - len(slots)
+            free = [row[0] for row in self._conn.execute('SELECT slot FROM free_slots LIMIT ?', (needed,))]
+            self._conn.executemany('DELETE FROM free_slots WHERE slot = ?', [(slot,) for slot in free])
+            slots.extend(free)
+            needed -= len(free)
+            
+            fresh = min(needed, self.max_entries - self.next_slot)
+            if fresh > 0:
+                self._grow(self.next_slot + fresh)
+                slots.extend(range(self.next_slot, self.next_slot + fresh))
+                self.next_slot += fresh
+                self._set_meta('next_slot', self.next_slot)
+                needed -= fresh
+            
+            if needed > 0:
+                evictions = self.evictions
+                self._evict(protected)
+                if self.evictions == evictions:
+                    raise ValueError(f"Cache chỉ chứa được {self.max_entries} vector")
+                # Commit việc xóa entry trước khi slot bị ghi đè (get_many đọc không khóa)
+                self._conn.execute('COMMIT')
+                self._conn.execute('BEGIN IMMEDIATE')
+                self._refresh_meta()
+        
+        return slots
+    
+    def get_many(self, keys: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Tra cứu nhiều key
+        
+        Args:
+            keys: Các key (xem make_key)
+        
+        Returns:
+            Vector float32 cho mỗi key, hoặc None nếu chưa có
+        """
+        with self._lock:
+            with self._read_transaction():
+                found = self._lookup(keys) if self._vectors is not None else {}
+                vectors = {key: np.array(self._vectors[slot], dtype=np.float32) for key, slot in found.items()}
+            
+            # Entry vẫn trỏ vào slot cũ sau khi copy: slot chưa bị evict nên
+            # chưa bị ghi đè (xem _allocate_slots)
+            if found:
+                current = self._lookup(list(found))
+                vectors = {key: vector for key, vector in vectors.items() if current.get(key) == found[key]}
+            self._touch(vectors)
+            
+            result = [vectors.get(key) for key in keys]
+            hits = sum(1 for vector in result if vector is not None)
+            self.hits += hits
+            self.misses += len(keys) - hits
+        
+        return result
+    
+    def _touch(self, keys: Iterable[str]) -> None:
+        """
+        Ghi nhận key vừa được đọc; last_used được ghi theo lô (trong put_many
+        hoặc khi đủ _TOUCH_BATCH key) thay vì mỗi lần tra cứu
+        """
+        self._touched.update(dict.fromkeys(keys, time.time()))
+        if len(self._touched) >= _TOUCH_BATCH:
+            with self._transaction():
+                self._flush_touched()
+    
+    def _flush_touched(self) -> None:
+        """
+        Ghi last_used của các key đã đọc (gọi trong _transaction)
+        """
+        if self._touched:
+            self._conn.executemany(
+                'UPDATE entries SET last_used = ? WHERE key = ?',
+                [(last_used, key) for key, last_used in self._touched.items()],
+            )
+            self._touched.clear()
+    
+    def put_many(self, keys: List[str], vectors: List[List[float]]) -> None:
+        """
+        Lưu nhiều vector
+        
+        Args:
+            keys: Các key (không trùng nhau)
+            vectors: Vector tương ứng
+        """
+        if not keys:
+            return
+        
+        array = np.asarray(vectors, dtype=np.float32)
+        with self._lock, self._transaction():
+            if self.dim is None:
+                self.dim = array.shape[1]
+                self._set_meta('dim', self.dim)
+            elif array.shape[1] != self.dim:
+                raise ValueError(f"Vector dim {array.shape[1]} khác dim của cache ({self.dim})")
+            
+            # Trước khi evict, để các key vừa đọc không bị coi là lâu không dùng
+            self._flush_touched()
+            slots = self._lookup(keys)
+            new_keys = [key for key in keys if key not in slots]
+            slots.update(zip(new_keys, self._allocate_slots(len(new_keys), set(keys))))
+            
+            for key, vector in zip(keys, array):
+                self._vectors[slots[key]] = vector.astype(np.float16)
+            self._vectors.flush()
+            
+            now = time.time()
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO entries (key, slot, last_used) VALUES (?, ?, ?)',
+                [(key, slots[key], now) for key in keys],
+            )
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Thống kê cache
+        """
+        with self._lock:
+            entries = self._conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            'model': self.model_name,
+            'entries': entries,
+            'capacity': self.capacity,
+            'max_entries': self.max_entries,
+            'dim': self.dim,
+            'disk_bytes': self.vectors_path.stat().st_size if self.vectors_path.exists() else 0,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+        }
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Bọc một embedding model bằng DiskEmbeddingCache
+    
+    Chỉ các text chưa có trong cache mới được đưa vào model; text trùng
+    nhau trong cùng một lần gọi chỉ được embed một lần. Query không đi qua
+    cache trên đĩa (mỗi câu hỏi là một lần tra cứu SQLite trên đường trả
+    lời); vector query được cache trong bộ nhớ bởi QueryCachedEmbeddings.
+    """
+    
+    def __init__(self, embeddings: Embeddings, cache: DiskEmbeddingCache):
+        self.embeddings = embeddings
+        self.cache = cache
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self.cache.make_key(text) for text in texts]
+        cached = self.cache.get_many(keys)
+        
+        missing = {}
+        for key, text, vector in zip(keys, texts, cached):
+            if vector is None and key not in missing:
+                missing[key] = text
+        
+        computed = {}
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            computed = dict(zip(missing, vectors))
+            self.cache.put_many(list(computed), list(computed.values()))
+        
+        return [
+            vector.tolist() if vector is not None else list(computed[key])
+            for key, vector in zip(keys, cached)
+        ]
+    
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+    
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        return embed_queries(self.embeddings, texts)
+    
+    def __getattr__(self, name):
+        return getattr(self.embeddings, name)
+
+
+class QueryCachedEmbeddings(Embeddings):
+    """
+    Cache LRU + TTL trong bộ nhớ cho vector của query
+    
+    Câu hỏi lặp lại (kể cả các câu hỏi mẫu trong app) không phải chạy lại
+    model. Key gồm tên model và query đã chuẩn hóa (NFC, gộp khoảng trắng).
+    embed_documents được chuyển thẳng cho model.
+    """
+    
+    def __init__(self,
+                 embeddings: Embeddings,
+                 model_name: str,
+                 max_entries: int = 1024,
+                 ttl_seconds: Optional[float] = 3600):
+        """
+        Khởi tạo cache
+        
+        Args:
+            embeddings: Embedding model
+            model_name: Tên embedding model
+            max_entries: Số query tối đa được giữ
+            ttl_seconds: Thời gian sống của một entry (None = không hết hạn)
+        """
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, List[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def _key(self, text: str) -> Tuple[str, str]:
+        query = _WHITESPACE_PATTERN.sub(' ', unicodedata.normalize('NFC', text)).strip()
+        return self.model_name, query
+    
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        now = time.monotonic()
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (self.ttl_seconds is None or now - entry[0] < self.ttl_seconds):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return list(entry[1])
+            self.misses += 1
+        
+        vector = self.embeddings.embed_query(text)
+        
+        with self._lock:
+            self._entries[key] = (now, vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        
+        return list(vector)
+    
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed nhiều query, các query chưa có trong cache được encode trong một batch
+        """
+        keys = [self._key(text) for text in texts]
+        now = time.monotonic()
+        vectors: List[Optional[List[float]]] = []
+        
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and (self.ttl_seconds is None or now - entry[0] < self.ttl_seconds):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    vectors.append(list(entry[1]))
+                else:
+                    self.misses += 1
+                    vectors.append(None)
+        
+        missing = {}
+        for key, text, vector in zip(keys, texts, vectors):
+            if vector is None and key not in missing:
+                missing[key] = text
+        if not missing:
+            return vectors
+        
+        computed = dict(zip(missing, embed_queries(self.embeddings, list(missing.values()))))
+        with self._lock:
+            for key, vector in computed.items():
+                self._entries[key] = (now, vector)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        
+        return [vector if vector is not None else list(computed[key]) for key, vector in zip(keys, vectors)]
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+    
+    def clear(self) -> None:
+        """
+        Xóa toàn bộ cache
+        """
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Thống kê cache
+        """
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+        }
+    
+    def __getattr__(self, name):
+        return getattr(self.embeddings, name)
@@ -3,21 +3,92 @@ Embeddings Module
 Quản lý các embedding models và vector database
 """
 
-from typing import List, Dict, Any, Optional
+import os
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import threading
+from itertools import chain, islice
+from contextlib import contextmanager, nullcontext
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Callable, Tuple
 from pathlib import Path
+from tqdm import tqdm
+import numpy as np
 
 try:
     from langchain_core.documents import Document
 except ImportError:
     from langchain.schema import Document
 
+try:
+    from langchain_core.embeddings import Embeddings
+except ImportError:
+    from langchain.embeddings.base import Embeddings
+
 try:
     from langchain_community.vectorstores import Chroma, FAISS
+    from langchain_community.docstore.in_memory import InMemoryDocstore
 except ImportError:
     from langchain.vectorstores import Chroma, FAISS
+    from langchain.docstore.in_memory import InMemoryDocstore
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_openai import OpenAIEmbeddings
 
+from src.utils import batched, prefetch_iterator, embed_queries
+from src.chunk_store import ChunkStore
+from src.batch_encoder import BatchEncoder
+from src.embedding_cache import DiskEmbeddingCache, CachedEmbeddings, QueryCachedEmbeddings
+from src.onnx_embeddings import OnnxEmbeddings
+from src.numpy_store import NumpyVectorStore
+from src.ann_index import (
+    FAISS_SEARCH_PARAMS, faiss_index_settings, build_faiss_index, apply_faiss_search_params,
+    faiss_reconstructable, faiss_supports_ids, with_faiss_ids, chroma_collection_metadata, save_index_config, load_index_config,
+)
+from src.projection import EmbeddingProjection, ProjectedEmbeddings, recall_at_k
+
+
+DELETE_UNSUPPORTED_MESSAGE = (
+    "Index FAISS HNSW không hỗ trợ xóa vector nên không cập nhật incremental được; "
+    "chạy python scripts/process_documents.py để build lại vectorstore "
+    "(hoặc đổi vectorstore.faiss.index_type sang flat/ivf_flat/ivf_pq)"
+)
+
+
+def _chunk_key(doc: Document) -> bytes:
+    """
+    Key của một document trong hash tiến độ build
+    """
+    return doc.metadata.get('chunk_id', doc.page_content).encode('utf-8') + b'\n'
+
+
+class TimedEmbeddings(Embeddings):
+    """
+    Bọc một embedding model và cộng dồn thời gian embed documents
+    
+    Vectorstore gọi embed_documents bên trong add_documents, nên thời gian
+    ghi vào store = thời gian của batch trừ thời gian embed.
+    """
+    
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+        self.seconds = 0.0
+        self.num_texts = 0
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        start = time.perf_counter()
+        vectors = self.embeddings.embed_documents(texts)
+        self.seconds += time.perf_counter() - start
+        self.num_texts += len(texts)
+        return vectors
+    
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+    
+    def __getattr__(self, name):
+        return getattr(self.embeddings, name)
+
 
 class EmbeddingManager:
     """
@@ -34,16 +105,55 @@ class EmbeddingManager:
         """
         self.config = config
         self.env = env
+        self.model_id = self._model_id()
         
-        # Khởi tạo embedding model
-        self.embeddings = self._initialize_embeddings()
+        # Khởi tạo embedding model (đo thời gian embed cho báo cáo ingest),
+        # qua cache trên đĩa để không embed lại text đã gặp và cache query trong bộ nhớ
+        self.embedding_cache: Optional[DiskEmbeddingCache] = None
+        self.query_cache: Optional[QueryCachedEmbeddings] = None
+        self.encoder = BatchEncoder(
+            self._initialize_embeddings(),
+            batch_size=config['embedding'].get('batch_size', 32),
+            num_processes=config['embedding'].get('encode_processes', 1),
+            length_bucketing=config['embedding'].get('length_bucketing', True),
+        )
+        # Phép chiếu giảm số chiều (nếu index có) nằm sau cache, cache giữ vector đầy đủ
+        self.projected = ProjectedEmbeddings(self._with_cache(self.encoder))
+        self.embeddings = TimedEmbeddings(self._with_query_cache(self.projected))
+        self.build_stats: Dict[str, Any] = {}
         
-        # Cấu hình vector database
+        # Cấu hình vector database (mỗi batch ghi vào store được encoder chia tiếp theo batch_size)
         self.vectorstore_type = config['vectorstore']['type']
+        self.batch_size = config['embedding'].get('index_batch_size') or config['embedding'].get('batch_size', 32)
+        self.prefetch_batches = config['embedding'].get('prefetch_batches', 2)
         self.persist_directory = config['vectorstore']['persist_directory']
         self.collection_name = config['vectorstore']['collection_name']
+        self.numpy_dtype = config['vectorstore'].get('numpy', {}).get('dtype', 'float32')
+        
+        # Loại index ANN của FAISS (thiết lập của index đã build được lưu trong index_config.json)
+        self.faiss_settings = faiss_index_settings(config['vectorstore'].get('faiss', {}))
+        self.index_settings: Optional[Dict[str, Any]] = None
+        
+        # Manifest các file đã index (dùng cho cập nhật incremental)
+        self.manifest_path = Path(self.persist_directory) / 'manifest.json'
+        
+        # Build mới được ghi vào thư mục tạm, có checkpoint để chạy tiếp khi bị ngắt
+        self.build_directory = self.persist_directory.rstrip('/\\') + '.building'
+        self.checkpoint_every = config['vectorstore'].get('checkpoint_every', 10)
         
         self.vectorstore = None
+        self._faiss_label_cache: Optional[Tuple[Any, Dict[str, int]]] = None
+        self._faiss_next_label = 0
+        
+        # FAISS/numpy không an toàn khi vừa search vừa ghi từ nhiều thread (job queue)
+        self.lock = threading.RLock()
+    
+    def _store_lock(self):
+        """
+        Lock cho thao tác trên vectorstore: FAISS và numpy cần lock cả đọc lẫn
+        ghi, Chroma tự đồng bộ nên không cần
+        """
+        return self.lock if self.vectorstore_type in ('faiss', 'numpy') else nullcontext()
     
     def _initialize_embeddings(self):
         """
@@ -68,7 +178,10 @@ class EmbeddingManager:
         elif provider in ['sentence-transformers', 'huggingface']:
             # Sử dụng HuggingFace embeddings (local hoặc API)
             model_kwargs = {'device': 'cpu'}  # Có thể đổi thành 'cuda' nếu có GPU
-            encode_kwargs = {'normalize_embeddings': True}
+            encode_kwargs = {
+                'normalize_embeddings': True,
+                'batch_size': self.config['embedding'].get('batch_size', 32),
+            }
             
             return HuggingFaceEmbeddings(
                 model_name=model_name,
@@ -76,13 +189,81 @@ class EmbeddingManager:
                 encode_kwargs=encode_kwargs,
             )
         
+        elif provider == 'onnx':
+            onnx_config = self.config['embedding'].get('onnx', {})
+            embeddings = OnnxEmbeddings(
+                onnx_config.get('model_dir', './models/onnx'),
+                quantized=onnx_config.get('quantized', False),
+                batch_size=self.config['embedding'].get('batch_size', 32),
+                max_seq_length=self.config['embedding'].get('max_seq_length'),
+                num_threads=onnx_config.get('num_threads'),
+            )
+            if embeddings.source_model != model_name:
+                print(f"⚠️  Model ONNX được export từ {embeddings.source_model}, "
+                      f"khác embedding.model_name ({model_name}): vector có thể không khớp index")
+            return embeddings
+        
         else:
             raise ValueError(f"Embedding provider không được hỗ trợ: {provider}")
     
+    def _model_id(self) -> str:
+        """
+        Định danh vector của model cho các cache (ONNX int8 cho vector hơi khác bản gốc)
+        """
+        model_name = self.config['embedding']['model_name']
+        if self.config['embedding']['provider'] != 'onnx':
+            return model_name
+        
+        quantized = self.config['embedding'].get('onnx', {}).get('quantized', False)
+        return f"{model_name}@onnx-int8" if quantized else f"{model_name}@onnx"
+    
+    def _with_cache(self, embeddings: Embeddings) -> Embeddings:
+        """
+        Bọc embedding model bằng cache trên đĩa nếu embedding.cache.enabled
+        
+        Args:
+            embeddings: Embedding model
+        
+        Returns:
+            Embedding model (có cache hoặc không)
+        """
+        cache_config = self.config['embedding'].get('cache', {})
+        if not cache_config.get('enabled', False):
+            return embeddings
+        
+        self.embedding_cache = DiskEmbeddingCache(
+            cache_config.get('directory', './data/embedding_cache'),
+            self.model_id,
+            max_entries=cache_config.get('max_entries', 200_000),
+        )
+        stats = self.embedding_cache.stats()
+        print(f"💾 Embedding cache: {stats['entries']} vectors tại {self.embedding_cache.directory}")
+        return CachedEmbeddings(embeddings, self.embedding_cache)
+    
+    def _with_query_cache(self, embeddings: Embeddings) -> Embeddings:
+        """
+        Bọc embedding model bằng cache query trong bộ nhớ nếu embedding.query_cache.enabled
+        """
+        cache_config = self.config['embedding'].get('query_cache', {})
+        if not cache_config.get('enabled', False):
+            return embeddings
+        
+        self.query_cache = QueryCachedEmbeddings(
+            embeddings,
+            self.model_id,
+            max_entries=cache_config.get('max_entries', 1024),
+            ttl_seconds=cache_config.get('ttl_seconds', 3600),
+        )
+        return self.query_cache
+    
     def create_vectorstore(self, documents: List[Document]) -> None:
         """
         Tạo vector database từ documents
         
+        Dùng cùng các bước với build_vectorstore (projection, index FAISS
+        theo vectorstore.faiss và index_config.json) nhưng ghi thẳng vào
+        persist_directory, không checkpoint.
+        
         Args:
             documents: List of Document objects
         """
@@ -91,34 +272,552 @@ class EmbeddingManager:
             return
         
         print(f"🔨 Tạo {self.vectorstore_type} vectorstore với {len(documents)} documents...")
+        directory = Path(self.persist_directory)
         
         try:
+            self.vectorstore = None
+            documents = self._fit_projection(documents, directory)
+            if self.vectorstore_type == 'faiss':
+                documents = self._prepare_faiss_index(documents, directory)
+            self.index_documents_stream(documents)
+            
+            print(f"✅ Vectorstore đã được tạo và lưu tại {self.persist_directory}")
+            
+        except Exception as e:
+            print(f"❌ Lỗi khi tạo vectorstore: {str(e)}")
+            raise
+    
+    def create_vectorstore_from_chunk_store(self, chunk_store: ChunkStore) -> int:
+        """
+        Tạo vectorstore từ chunk store đã lưu, không cần load/split lại documents
+        
+        Args:
+            chunk_store: ChunkStore đã được ghi (xem DocumentProcessor)
+            
+        Returns:
+            Tổng số documents đã được ghi
+        """
+        if not chunk_store.exists():
+            raise FileNotFoundError(f"Chunk store chưa tồn tại tại {chunk_store.directory}")
+        
+        meta = chunk_store.read_meta()
+        print(f"📦 Đọc {meta['num_chunks']} chunks từ chunk store {chunk_store.directory} "
+              f"(tạo lúc {meta['created_at']})")
+        
+        return self.build_vectorstore(chunk_store.iter_documents())
+    
+    def build_vectorstore(self,
+                          documents: Iterable[Document],
+                          batch_size: Optional[int] = None,
+                          resume: bool = True) -> int:
+        """
+        Tạo vectorstore mới có checkpoint, thay thế vectorstore cũ khi xong
+        
+        Vectorstore được ghi vào build_directory và được persist cùng file
+        tiến độ sau mỗi checkpoint_every batch. Nếu lần build trước bị ngắt,
+        documents đã commit được bỏ qua (phải cùng thứ tự, kiểm tra bằng hash
+        chuỗi chunk ID) và build chạy tiếp từ batch chưa commit. Chỉ khi
+        build xong, thư mục build mới thay thế persist_directory, nên người
+        đọc không bao giờ thấy vectorstore dở dang.
+        
+        Args:
+            documents: Iterable of Document objects (theo thứ tự cố định)
+            batch_size: Số documents mỗi batch (mặc định embedding.batch_size)
+            resume: Chạy tiếp build dở dang nếu có (False: build lại từ đầu)
+            
+        Returns:
+            Tổng số documents trong vectorstore mới
+        """
+        build_dir = Path(self.build_directory)
+        progress_path = build_dir / 'build_progress.json'
+        progress = None
+        
+        if resume and progress_path.exists():
+            with open(progress_path, 'r', encoding='utf-8') as f:
+                progress = json.load(f)
+            if progress.get('vectorstore_type') != self.vectorstore_type:
+                progress = None
+        
+        if progress is None:
+            shutil.rmtree(build_dir, ignore_errors=True)
+            progress = {'vectorstore_type': self.vectorstore_type, 'committed': 0,
+                        'digest': hashlib.sha256().hexdigest()}
+        else:
+            print(f"♻️  Chạy tiếp build dở dang: {progress['committed']} documents đã commit")
+        
+        digest = hashlib.sha256()
+        state = {'written': 0, 'batches': 0}
+        
+        def checkpoint(batch: List[Document]) -> None:
+            # Digest được cập nhật ở đây (không phải ở thread prefetch) để
+            # luôn khớp với các documents đã thực sự được ghi
+            for doc in batch:
+                digest.update(_chunk_key(doc))
+            state['written'] += len(batch)
+            state['batches'] += 1
+            if state['batches'] % self.checkpoint_every == 0:
+                self._persist_vectorstore()
+                self._save_build_progress(progress_path, state['written'], digest)
+        
+        with self._use_directory(str(build_dir)):
+            self.vectorstore = None
+            if progress['committed']:
+                if not self.load_vectorstore():
+                    raise RuntimeError(f"Không load được build dở dang tại {build_dir}")
+            else:
+                documents = self._fit_projection(documents, build_dir)
+                if self.vectorstore_type == 'faiss':
+                    documents = self._prepare_faiss_index(documents, build_dir)
+            
+            documents = self._skip_committed(documents, progress, digest, state)
+            total = self.index_documents_stream(documents, batch_size, on_batch=checkpoint)
+            total += progress['committed']
+        
+        if total == 0:
+            shutil.rmtree(build_dir, ignore_errors=True)
+            return 0
+        
+        self._finalize_build(build_dir)
+        return total
+    
+    def _set_projection(self, projection: Optional[EmbeddingProjection]) -> None:
+        """
+        Đổi phép chiếu dùng cho documents và query (xóa cache query vì vector cũ không còn đúng)
+        """
+        self.projected.projection = projection
+        if self.query_cache is not None:
+            self.query_cache.clear()
+    
+    def _fit_projection(self, documents: Iterable[Document], directory: Path) -> Iterator[Document]:
+        """
+        Fit phép chiếu theo embedding.projection trên các documents đầu tiên của build mới
+        
+        Vector đầy đủ của mẫu được embed qua cache nên không phải embed lại
+        khi index (nếu embedding.cache.enabled). Phép chiếu được lưu vào thư
+        mục build cùng recall@k so với tìm kiếm trên vector đầy đủ.
+        
+        Args:
+            documents: Documents của build
+            directory: Thư mục build
+        
+        Returns:
+            Iterator documents (gồm cả các documents đã đọc để fit)
+        """
+        projection_config = self.config['embedding'].get('projection', {})
+        self._set_projection(None)
+        if not projection_config.get('enabled', False):
+            return iter(documents)
+        
+        iterator = iter(documents)
+        sample = list(islice(iterator, projection_config.get('fit_sample', 20000)))
+        dimension = projection_config.get('dimension', 256)
+        method = projection_config.get('method', 'pca')
+        if not sample:
+            return iterator
+        
+        print(f"📐 Fit projection {method} {dimension} chiều trên {len(sample)} chunks...")
+        full = np.asarray(self.projected.embeddings.embed_documents([doc.page_content for doc in sample]),
+                          dtype=np.float32)
+        if method == 'pca' and len(sample) < dimension:
+            print(f"⚠️  Cần ít nhất {dimension} chunks để fit PCA, bỏ qua projection")
+            return chain(sample, iterator)
+        
+        projection = EmbeddingProjection.fit(full, dimension, method=method, info={'model': self.model_id})
+        
+        # Recall@k: một phần mẫu làm query, phần còn lại làm corpus
+        k = projection_config.get('eval_k', 10)
+        num_queries = min(projection_config.get('eval_queries', 200), len(sample) // 5)
+        if num_queries and len(sample) - num_queries > k:
+            projected = projection.transform(full)
+            recall = recall_at_k(full[num_queries:], full[:num_queries],
+                                 projected[num_queries:], projected[:num_queries], k=k)
+            projection.info.update(recall_at_k=recall, k=k, eval_queries=num_queries)
+            print(f"📐 Recall@{k} so với {full.shape[1]} chiều: {recall:.3f}")
+        
+        projection.save(directory)
+        self._set_projection(projection)
+        return chain(sample, iterator)
+    
+    def _prepare_faiss_index(self, documents: Iterable[Document], directory: Path) -> Iterator[Document]:
+        """
+        Tạo index FAISS IVF rỗng theo vectorstore.faiss cho build mới
+        
+        IVF được train trên train_size chunks đầu tiên (embed qua cache nên
+        không phải embed lại khi index, nếu embedding.cache.enabled). Index
+        Flat/HNSW không cần train nên được tạo ở batch đầu tiên (_write_batch).
+        
+        Args:
+            documents: Documents của build
+            directory: Thư mục build
+        
+        Returns:
+            Iterator documents (gồm cả các documents đã đọc để train)
+        """
+        iterator = iter(documents)
+        if 'train_size' not in self.faiss_settings:
+            return iterator
+        
+        sample = list(islice(iterator, self.faiss_settings['train_size']))
+        if not sample:
+            return iterator
+        
+        vectors = np.asarray(self.embeddings.embed_documents([doc.page_content for doc in sample]), dtype=np.float32)
+        self._new_faiss_store(vectors, directory)
+        return chain(sample, iterator)
+    
+    def _new_faiss_store(self, vectors: np.ndarray, directory: Path) -> None:
+        """
+        Tạo FAISS vectorstore rỗng với index theo vectorstore.faiss (IVF được
+        train trên vectors) và lưu thiết lập vào index_config.json
+        
+        Args:
+            vectors: Vector mẫu (n, dim)
+            directory: Thư mục vectorstore
+        """
+        settings = dict(self.faiss_settings)
+        if 'nlist' in settings and len(vectors) < settings['nlist']:
+            print(f"⚠️  Chỉ có {len(vectors)} chunks để train IVF{settings['nlist']}, dùng index Flat")
+            settings = {'index_type': 'flat'}
+        
+        self.vectorstore = FAISS(
+            embedding_function=self.embeddings,
+            index=build_faiss_index(vectors, settings),
+            docstore=InMemoryDocstore(),
+            index_to_docstore_id={},
+        )
+        save_index_config(directory, settings)
+        self.index_settings = settings
+    
+    def _apply_faiss_settings(self) -> None:
+        """
+        Áp dụng thiết lập đã lưu của index FAISS vừa load
+        
+        Tham số search (nprobe, ef_search) lấy từ config nếu cùng loại index,
+        các tham số còn lại phải build lại mới đổi được.
+        """
+        settings = load_index_config(self.persist_directory) or {'index_type': 'flat'}
+        configured = self.faiss_settings
+        if configured['index_type'] == settings['index_type']:
+            for name in FAISS_SEARCH_PARAMS:
+                if name in configured:
+                    settings[name] = configured[name]
+        
+        build_params = {name: value for name, value in configured.items()
+                        if name not in FAISS_SEARCH_PARAMS and name != 'train_size'}
+        if any(settings.get(name) != value for name, value in build_params.items()):
+            print(f"⚠️  Index FAISS được build với {settings}, khác vectorstore.faiss trong config; "
+                  f"build lại vectorstore để áp dụng")
+        
+        apply_faiss_search_params(self.vectorstore.index, settings)
+        self.index_settings = settings
+    
+    def _check_chroma_settings(self) -> None:
+        """
+        Đọc thiết lập HNSW đã lưu trong metadata collection Chroma và báo nếu khác config
+        """
+        metadata = self.vectorstore._collection.metadata or {}
+        self.index_settings = {key: value for key, value in metadata.items() if key.startswith('hnsw:')}
+        configured = chroma_collection_metadata(self.config['vectorstore'])
+        persisted_space = metadata.get('hnsw:space', 'l2')
+        if persisted_space != configured['hnsw:space']:
+            print(f"⚠️  Collection Chroma dùng khoảng cách {persisted_space}, config là "
+                  f"{configured['hnsw:space']}; build lại vectorstore để áp dụng")
+    
+    def _faiss_labels(self) -> Dict[str, int]:
+        """
+        Docstore ID -> label của vector trong index FAISS
+        
+        Bảng được giữ trên manager và cập nhật khi ghi/xóa, thay vì dựng lại
+        từ index_to_docstore_id ở mỗi batch (O(N) mỗi batch, bậc hai với cả
+        build). Được dựng lại khi vectorstore là object khác (load, build mới).
+        """
+        if self._faiss_label_cache is None or self._faiss_label_cache[0] is not self.vectorstore:
+            id_map = self.vectorstore.index_to_docstore_id
+            self._faiss_label_cache = (self.vectorstore, {doc_id: label for label, doc_id in id_map.items()})
+            self._faiss_next_label = max(id_map, default=-1) + 1
+        return self._faiss_label_cache[1]
+    
+    def _faiss_add(self,
+                   texts: List[str],
+                   vectors: List[List[float]],
+                   metadatas: List[Dict[str, Any]],
+                   ids: Optional[List[str]]) -> None:
+        """
+        Ghi vector vào FAISS với label ổn định (thay FAISS.add_embeddings,
+        vốn dùng index.add nên label luôn là vị trí)
+        
+        Flat (IDMap2) và IVF nhận label riêng nên xóa bằng remove_ids không
+        làm thay đổi label của các vector còn lại. ID đã có được ghi đè.
+        
+        Args:
+            texts: Nội dung chunks
+            vectors: Vector tương ứng
+            metadatas: Metadata tương ứng
+            ids: Docstore ID (None: sinh ngẫu nhiên)
+        """
+        store = self.vectorstore
+        labels_of = self._faiss_labels()
+        ids = ids or [uuid.uuid4().hex for _ in texts]
+        stale_ids = [doc_id for doc_id in ids if doc_id in labels_of]
+        if stale_ids:
+            self._faiss_delete(stale_ids)
+        
+        matrix = np.array(vectors, dtype=np.float32)
+        if store._normalize_L2:
+            matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        
+        if faiss_supports_ids(store.index):
+            labels = np.arange(self._faiss_next_label, self._faiss_next_label + len(ids), dtype=np.int64)
+            store.index.add_with_ids(matrix, labels)
+            self._faiss_next_label += len(ids)
+        else:
+            # HNSW không nhận label riêng: label là vị trí (và không xóa được)
+            labels = np.arange(store.index.ntotal, store.index.ntotal + len(ids), dtype=np.int64)
+            store.index.add(matrix)
+        
+        store.docstore.add({
+            doc_id: Document(page_content=text, metadata=dict(metadata))
+            for doc_id, text, metadata in zip(ids, texts, metadatas)
+        })
+        store.index_to_docstore_id.update(zip(labels.tolist(), ids))
+        labels_of.update(zip(ids, labels.tolist()))
+    
+    def _faiss_delete(self, ids: List[str]) -> None:
+        """
+        Xóa các ID khỏi FAISS bằng remove_ids theo label (thay FAISS.delete,
+        vốn đánh số lại label theo vị trí: sai với IVF)
+        
+        Không đọc lại hay quantize lại các vector còn lại, nên chi phí chỉ phụ
+        thuộc số vector bị xóa (IVF-PQ giữ nguyên mã đã có).
+        """
+        self._check_faiss_delete()
+        store = self.vectorstore
+        labels_of = self._faiss_labels()
+        labels = [labels_of.pop(doc_id) for doc_id in ids]
+        
+        store.index.remove_ids(np.array(labels, dtype=np.int64))
+        store.docstore.delete(ids)
+        for label in labels:
+            del store.index_to_docstore_id[label]
+    
+    def supports_delete(self) -> bool:
+        """
+        Vectorstore đã load có xóa được chunks không
+        
+        FAISS HNSW không xóa được vector, nên không cập nhật incremental
+        (update_vectorstore.py, job ingest) được mà phải build lại toàn bộ.
+        Kiểm tra ngay sau load_vectorstore để báo lỗi trước khi xử lý file.
+        """
+        if self.vectorstore_type != 'faiss' or self.vectorstore is None:
+            return True
+        return faiss_supports_ids(self.vectorstore.index)
+    
+    def _check_faiss_delete(self) -> None:
+        if not self.supports_delete():
+            raise ValueError(DELETE_UNSUPPORTED_MESSAGE)
+    
+    @contextmanager
+    def _use_directory(self, directory: str) -> Iterator[None]:
+        """
+        Tạm thời đọc/ghi vectorstore ở một thư mục khác persist_directory
+        """
+        persist_directory = self.persist_directory
+        self.persist_directory = directory
+        try:
+            yield
+        finally:
+            self.persist_directory = persist_directory
+    
+    @staticmethod
+    def _skip_committed(documents: Iterable[Document],
+                        progress: Dict[str, Any],
+                        digest: Any,
+                        state: Dict[str, int]) -> Iterator[Document]:
+        """
+        Bỏ qua các documents đã commit ở lần build trước và kiểm tra chúng khớp
+        """
+        iterator = iter(documents)
+        for _ in range(progress['committed']):
+            doc = next(iterator, None)
+            if doc is None:
+                break
+            digest.update(_chunk_key(doc))
+        
+        if digest.hexdigest() != progress['digest']:
+            raise RuntimeError(
+                "Documents không khớp với build dở dang (corpus hoặc thiết lập đã thay đổi); "
+                "hãy build lại từ đầu (resume=False)"
+            )
+        
+        state['written'] = progress['committed']
+        yield from iterator
+    
+    def _save_build_progress(self, progress_path: Path, committed: int, digest: Any) -> None:
+        """
+        Ghi tiến độ build (file tạm rồi rename để không bao giờ hỏng)
+        """
+        tmp_path = progress_path.with_name(progress_path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'vectorstore_type': self.vectorstore_type,
+                'committed': committed,
+                'digest': digest.hexdigest(),
+            }, f)
+        os.replace(tmp_path, progress_path)
+    
+    def _finalize_build(self, build_dir: Path) -> None:
+        """
+        Thay vectorstore cũ bằng build mới và load lại từ persist_directory
+        """
+        (build_dir / 'build_progress.json').unlink(missing_ok=True)
+        
+        live_dir = Path(self.persist_directory)
+        old_dir = live_dir.with_name(live_dir.name + '.old')
+        shutil.rmtree(old_dir, ignore_errors=True)
+        
+        if live_dir.exists():
+            os.rename(live_dir, old_dir)
+        os.rename(build_dir, live_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+        
+        self.vectorstore = None
+        self.load_vectorstore()
+        print(f"✅ Build hoàn tất, vectorstore mới tại {self.persist_directory}")
+    
+    def index_documents_stream(self, 
+                               documents: Iterable[Document],
+                               batch_size: Optional[int] = None,
+                               on_batch: Optional[Callable[[List[Document]], None]] = None) -> int:
+        """
+        Embed và ghi documents vào vectorstore theo từng batch
+        
+        Documents được đọc từ một iterable (ví dụ DocumentProcessor.iter_chunks)
+        trong thread nền, nên việc parse file chạy song song với embedding và
+        chỉ có một số batch giới hạn nằm trong bộ nhớ. Nếu vectorstore đã được
+        load, các batch được upsert vào đó; nếu chưa, vectorstore mới được tạo
+        từ batch đầu tiên.
+        
+        Args:
+            documents: Iterable of Document objects
+            batch_size: Số documents mỗi batch (mặc định embedding.batch_size)
+            on_batch: Hàm được gọi sau khi ghi mỗi batch (ví dụ checkpoint)
+            
+        Returns:
+            Tổng số documents đã được ghi
+        """
+        batch_size = batch_size or self.batch_size
+        batches = prefetch_iterator(batched(documents, batch_size), self.prefetch_batches)
+        total = 0
+        num_batches = 0
+        batch_seconds = 0.0
+        embed_seconds_before = self.embeddings.seconds
+        start = time.perf_counter()
+        
+        print(f"🔨 Streaming documents vào {self.vectorstore_type} vectorstore "
+              f"(batch_size={batch_size})...")
+        
+        for batch in tqdm(batches, desc="Embedding batches", unit="batch"):
+            batch_start = time.perf_counter()
+            self._write_batch(batch)
+            if on_batch is not None:
+                on_batch(batch)
+            batch_seconds += time.perf_counter() - batch_start
+            total += len(batch)
+            num_batches += 1
+        
+        if total == 0:
+            print("⚠️  Không có documents để tạo vectorstore")
+            return 0
+        
+        persist_start = time.perf_counter()
+        self._persist_vectorstore()
+        persist_seconds = time.perf_counter() - persist_start
+        
+        self._record_build_stats(
+            batch_size=batch_size,
+            batches=num_batches,
+            vectors=total,
+            embed_seconds=self.embeddings.seconds - embed_seconds_before,
+            batch_seconds=batch_seconds,
+            persist_seconds=persist_seconds,
+            total_seconds=time.perf_counter() - start,
+        )
+        print(f"✅ Đã ghi {total} documents vào vectorstore tại {self.persist_directory}")
+        print(f"⏱️  Embed {self.build_stats['vectors_per_second']:.1f} vectors/s, "
+              f"ghi store {self.build_stats['store_write_seconds']:.1f}s")
+        return total
+    
+    def _record_build_stats(self,
+                            batch_size: int,
+                            batches: int,
+                            vectors: int,
+                            embed_seconds: float,
+                            batch_seconds: float,
+                            persist_seconds: float,
+                            total_seconds: float) -> None:
+        """
+        Lưu thống kê của lần index gần nhất vào build_stats
+        
+        Thời gian chờ input (load/split documents ở thread nền) là phần còn
+        lại của total_seconds sau khi trừ thời gian xử lý batch và persist.
+        """
+        write_seconds = batch_seconds - embed_seconds
+        self.build_stats = {
+            'vectorstore_type': self.vectorstore_type,
+            'batch_size': batch_size,
+            'batches': batches,
+            'vectors': vectors,
+            'embed_seconds': embed_seconds,
+            'store_write_seconds': write_seconds + persist_seconds,
+            'persist_seconds': persist_seconds,
+            'input_wait_seconds': max(total_seconds - batch_seconds - persist_seconds, 0.0),
+            'total_seconds': total_seconds,
+            'batches_per_second': batches / embed_seconds if embed_seconds else 0.0,
+            'vectors_per_second': vectors / embed_seconds if embed_seconds else 0.0,
+        }
+    
+    def _write_batch(self, documents: List[Document]) -> None:
+        """
+        Embed và ghi một batch documents (không persist)
+        
+        Args:
+            documents: List of Document objects
+        """
+        ids = self._get_chunk_ids(documents)
+        
+        if self.vectorstore is None:
             if self.vectorstore_type == 'chromadb':
                 self.vectorstore = Chroma.from_documents(
                     documents=documents,
                     embedding=self.embeddings,
+                    ids=ids,
                     persist_directory=self.persist_directory,
                     collection_name=self.collection_name,
+                    collection_metadata=chroma_collection_metadata(self.config['vectorstore']),
                 )
-                self.vectorstore.persist()
-                
             elif self.vectorstore_type == 'faiss':
-                self.vectorstore = FAISS.from_documents(
+                # Index theo vectorstore.faiss (IVF đã được train ở _prepare_faiss_index
+                # khi build; ở đây chỉ còn batch này để train)
+                texts = [doc.page_content for doc in documents]
+                vectors = self.embeddings.embed_documents(texts)
+                self._new_faiss_store(np.asarray(vectors, dtype=np.float32), Path(self.persist_directory))
+                self._faiss_add(texts, vectors, [doc.metadata for doc in documents], ids)
+            elif self.vectorstore_type == 'numpy':
+                self.vectorstore = NumpyVectorStore.from_documents(
                     documents=documents,
                     embedding=self.embeddings,
+                    ids=ids,
+                    dtype=self.numpy_dtype,
                 )
-                # Lưu FAISS index
-                Path(self.persist_directory).mkdir(parents=True, exist_ok=True)
-                self.vectorstore.save_local(self.persist_directory)
-            
             else:
                 raise ValueError(f"Vector store type không được hỗ trợ: {self.vectorstore_type}")
-            
-            print(f"✅ Vectorstore đã được tạo và lưu tại {self.persist_directory}")
-            
-        except Exception as e:
-            print(f"❌ Lỗi khi tạo vectorstore: {str(e)}")
-            raise
+        
+        elif self.vectorstore_type == 'faiss':
+            texts = [doc.page_content for doc in documents]
+            self._faiss_add(texts, self.embeddings.embed_documents(texts), [doc.metadata for doc in documents], ids)
+        
+        else:
+            self.vectorstore.add_documents(documents, ids=ids)
     
     def load_vectorstore(self) -> bool:
         """
@@ -134,12 +833,19 @@ class EmbeddingManager:
         try:
             print(f"📂 Loading {self.vectorstore_type} vectorstore...")
             
+            # Phép chiếu lưu cạnh index phải được dùng cho mọi query/chunk mới
+            projection = EmbeddingProjection.load(self.persist_directory)
+            self._set_projection(projection)
+            if projection is not None:
+                print(f"📐 Dùng projection {projection.method} {projection.input_dim} -> {projection.output_dim} chiều")
+            
             if self.vectorstore_type == 'chromadb':
                 self.vectorstore = Chroma(
                     persist_directory=self.persist_directory,
                     embedding_function=self.embeddings,
                     collection_name=self.collection_name,
                 )
+                self._check_chroma_settings()
             
             elif self.vectorstore_type == 'faiss':
                 self.vectorstore = FAISS.load_local(
@@ -147,13 +853,112 @@ class EmbeddingManager:
                     self.embeddings,
                     allow_dangerous_deserialization=True  # Cần thiết cho FAISS
                 )
+                # Index Flat build trước đây không có label riêng
+                self.vectorstore.index = with_faiss_ids(self.vectorstore.index)
+                self._apply_faiss_settings()
+            
+            elif self.vectorstore_type == 'numpy':
+                self.vectorstore = NumpyVectorStore.load_local(self.persist_directory, self.embeddings)
             
             print("✅ Vectorstore đã được load thành công")
-            return True
             
         except Exception as e:
             print(f"❌ Lỗi khi load vectorstore: {str(e)}")
             return False
+        
+        # Kiểm tra chỉ để cảnh báo: lỗi ở đây không làm hỏng lần load đã thành công
+        if (self.config['embedding']['provider'] == 'onnx'
+                and self.config['embedding'].get('onnx', {}).get('verify_on_load', True)):
+            try:
+                self.check_embedding_compatibility()
+            except Exception as e:
+                print(f"⚠️  Không kiểm tra được vector của model với index: {str(e)}")
+        return True
+    
+    def _sample_stored_vectors(self, sample_size: int) -> List[Tuple[str, List[float]]]:
+        """
+        Lấy một số (text, vector) đang lưu trong vectorstore
+        """
+        if self.vectorstore_type == 'faiss':
+            index = self.vectorstore.index
+            labels = sorted(self.vectorstore.index_to_docstore_id)
+            labels = labels[::max(len(labels) // sample_size, 1)][:sample_size]
+            with faiss_reconstructable(index):
+                samples = []
+                for label in labels:
+                    doc = self.vectorstore.docstore.search(self.vectorstore.index_to_docstore_id[label])
+                    samples.append((doc.page_content, index.reconstruct(label).tolist()))
+            return samples
+        
+        if self.vectorstore_type == 'numpy':
+            return self.vectorstore.sample(sample_size)
+        
+        result = self.vectorstore._collection.get(limit=sample_size, include=['documents', 'embeddings'])
+        return list(zip(result['documents'], [list(vector) for vector in result['embeddings']]))
+    
+    def check_embedding_compatibility(self,
+                                      sample_size: int = 16,
+                                      min_cosine: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Kiểm tra model hiện tại có cho vector khớp với index đã build không
+        
+        Embed lại một số chunks trong index (không qua cache) và so sánh với
+        vector đang lưu bằng cosine similarity.
+        
+        Args:
+            sample_size: Số chunks được kiểm tra
+            min_cosine: Ngưỡng cosine nhỏ nhất (mặc định embedding.onnx.min_cosine hoặc 0.98)
+        
+        Returns:
+            Dictionary: checked, index_dimension, model_dimension, mean_cosine, min_cosine, compatible
+        """
+        if min_cosine is None:
+            min_cosine = self.config['embedding'].get('onnx', {}).get('min_cosine', 0.98)
+        
+        index_type = (self.index_settings or {}).get('index_type')
+        if self.vectorstore_type == 'faiss' and index_type == 'ivf_pq':
+            # PQ chỉ lưu vector đã nén: vector khôi phục lệch nhiều so với ngưỡng cosine
+            print("ℹ️  Index FAISS IVF-PQ không lưu vector gốc, bỏ qua kiểm tra vector của model")
+            return {'checked': 0, 'compatible': True, 'skipped': 'ivf_pq'}
+        
+        with self._store_lock():
+            samples = self._sample_stored_vectors(sample_size)
+        if not samples:
+            return {'checked': 0, 'compatible': True}
+        
+        texts, stored = zip(*samples)
+        stored = np.asarray(stored, dtype=np.float32)
+        current = np.asarray(self.encoder.embed_documents(list(texts)), dtype=np.float32)
+        if self.projected.projection is not None:
+            current = self.projected.projection.transform(current)
+        
+        report = {
+            'checked': len(samples),
+            'index_dimension': stored.shape[1],
+            'model_dimension': current.shape[1],
+        }
+        if stored.shape[1] != current.shape[1]:
+            report.update(mean_cosine=None, min_cosine=None, compatible=False)
+            print(f"❌ Model {self.model_id} cho vector {current.shape[1]} chiều, "
+                  f"index có {stored.shape[1]} chiều: cần build lại vectorstore")
+            return report
+        
+        stored /= np.clip(np.linalg.norm(stored, axis=1, keepdims=True), 1e-12, None)
+        current /= np.clip(np.linalg.norm(current, axis=1, keepdims=True), 1e-12, None)
+        cosines = (stored * current).sum(axis=1)
+        report.update(
+            mean_cosine=float(cosines.mean()),
+            min_cosine=float(cosines.min()),
+            compatible=bool(cosines.min() >= min_cosine),
+        )
+        
+        if report['compatible']:
+            print(f"✅ Vector của {self.model_id} khớp index (cosine nhỏ nhất {report['min_cosine']:.4f})")
+        else:
+            print(f"⚠️  Vector của {self.model_id} không khớp index: cosine nhỏ nhất "
+                  f"{report['min_cosine']:.4f} < {min_cosine} (trung bình {report['mean_cosine']:.4f}). "
+                  f"Kết quả tìm kiếm có thể sai, nên build lại vectorstore")
+        return report
     
     def add_documents(self, documents: List[Document]) -> None:
         """
@@ -170,19 +975,191 @@ class EmbeddingManager:
         print(f"➕ Thêm {len(documents)} documents vào vectorstore...")
         
         try:
-            self.vectorstore.add_documents(documents)
-            
-            # Persist changes
-            if self.vectorstore_type == 'chromadb':
-                self.vectorstore.persist()
-            elif self.vectorstore_type == 'faiss':
-                self.vectorstore.save_local(self.persist_directory)
+            with self._store_lock():
+                if self.vectorstore_type == 'faiss':
+                    texts = [doc.page_content for doc in documents]
+                    self._faiss_add(texts, self.embeddings.embed_documents(texts),
+                                    [doc.metadata for doc in documents], None)
+                else:
+                    self.vectorstore.add_documents(documents)
+                self._persist_vectorstore()
             
             print("✅ Documents đã được thêm thành công")
             
         except Exception as e:
             print(f"❌ Lỗi khi thêm documents: {str(e)}")
     
+    def upsert_documents(self, documents: List[Document], persist: bool = True) -> None:
+        """
+        Thêm hoặc cập nhật documents theo chunk ID ổn định
+        
+        Chunk đã tồn tại (cùng 'chunk_id') được ghi đè thay vì nhân bản.
+        
+        Args:
+            documents: List of Document objects có metadata 'chunk_id'
+            persist: Lưu vectorstore xuống đĩa sau khi ghi (False: người gọi tự lưu)
+        """
+        if not documents:
+            return
+        
+        ids = self._get_chunk_ids(documents)
+        if ids is None:
+            raise ValueError("Documents thiếu metadata 'chunk_id', không thể upsert")
+        
+        with self.lock:
+            # Kiểm tra trong lock để các job song song không cùng tạo vectorstore
+            if self.vectorstore is None:
+                print("⚠️  Vectorstore chưa được khởi tạo. Tạo mới...")
+                self.create_vectorstore(documents)
+                return
+        
+        print(f"🔁 Upsert {len(documents)} documents vào vectorstore...")
+        
+        if self.vectorstore_type in ('faiss', 'numpy'):
+            # Embed ngoài lock để query vẫn được phục vụ trong lúc embed
+            texts = [doc.page_content for doc in documents]
+            vectors = self.embeddings.embed_documents(texts)
+            with self.lock:
+                # Numpy store tự ghi đè ID trùng, _faiss_add xóa ID cũ trước
+                if self.vectorstore_type == 'faiss':
+                    self._faiss_add(texts, vectors, [doc.metadata for doc in documents], ids)
+                else:
+                    self.vectorstore.add_embeddings(
+                        text_embeddings=list(zip(texts, vectors)),
+                        metadatas=[doc.metadata for doc in documents],
+                        ids=ids,
+                    )
+                if persist:
+                    self._persist_vectorstore()
+        else:
+            # Chroma ghi bằng upsert nên ID trùng được thay thế
+            self._write_batch(documents)
+            if persist:
+                self._persist_vectorstore()
+        print("✅ Upsert hoàn tất")
+    
+    def replace_source(self,
+                       file_path: str,
+                       documents: List[Document],
+                       on_batch: Optional[Callable[[int], None]] = None) -> int:
+        """
+        Thay các chunks của một file bằng documents
+        
+        Chunks mới được ghi trước, chunks cũ không còn trong documents bị xóa
+        sau, và vectorstore chỉ được persist một lần: query chạy song song
+        luôn tìm thấy nội dung của file, lỗi giữa chừng không làm file mất
+        khỏi index đã lưu.
+        
+        Args:
+            file_path: Đường dẫn file nguồn (metadata 'file_path')
+            documents: Chunks mới của file (có metadata 'chunk_id')
+            on_batch: Được gọi với số chunks đã ghi sau mỗi batch
+        
+        Returns:
+            Số chunks cũ đã xóa
+        """
+        if not self.supports_delete():
+            raise ValueError(DELETE_UNSUPPORTED_MESSAGE)
+        
+        done = 0
+        for batch in batched(documents, self.batch_size):
+            self.upsert_documents(batch, persist=False)
+            done += len(batch)
+            if on_batch is not None:
+                on_batch(done)
+        
+        if self.vectorstore is None:
+            return 0
+        
+        keep_ids = set(self._get_chunk_ids(documents) or ())
+        with self._store_lock():
+            stale_ids = [doc_id for doc_id, _ in self._source_chunks(file_path) if doc_id not in keep_ids]
+            if stale_ids:
+                self._delete_ids(stale_ids)
+            self._persist_vectorstore()
+        return len(stale_ids)
+    
+    def _source_chunks(self, file_path: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        (ID, metadata) của các chunks có nguồn là một file (gọi trong _store_lock)
+        """
+        if self.vectorstore_type == 'chromadb':
+            result = self.vectorstore.get(where={'file_path': file_path}, include=['metadatas'])
+            return list(zip(result['ids'], result['metadatas']))
+        
+        elif self.vectorstore_type == 'faiss':
+            chunks = []
+            for doc_id in self.vectorstore.index_to_docstore_id.values():
+                metadata = self.vectorstore.docstore.search(doc_id).metadata
+                if metadata.get('file_path') == file_path:
+                    chunks.append((doc_id, metadata))
+            return chunks
+        
+        elif self.vectorstore_type == 'numpy':
+            return [
+                (doc_id, self.vectorstore.metadatas[self.vectorstore._row_of[doc_id]])
+                for doc_id in self.vectorstore.get_ids(where={'file_path': file_path})
+            ]
+        
+        else:
+            raise ValueError(f"Vector store type không được hỗ trợ: {self.vectorstore_type}")
+    
+    def delete_by_source(self, file_path: str) -> int:
+        """
+        Xóa tất cả chunks có nguồn là một file
+        
+        Args:
+            file_path: Đường dẫn file nguồn (metadata 'file_path')
+            
+        Returns:
+            Số chunks đã xóa
+        """
+        if self.vectorstore is None:
+            raise ValueError("Vectorstore chưa được khởi tạo hoặc load")
+        
+        with self._store_lock():
+            if self.vectorstore_type == 'faiss':
+                self._check_faiss_delete()
+            ids = [doc_id for doc_id, _ in self._source_chunks(file_path)]
+            
+            if ids:
+                self._delete_ids(ids)
+                self._persist_vectorstore()
+        
+        return len(ids)
+    
+    def _delete_ids(self, ids: List[str]) -> None:
+        """
+        Xóa chunks theo ID (gọi trong _store_lock, không persist)
+        """
+        if self.vectorstore_type == 'faiss':
+            self._faiss_delete(ids)
+        else:
+            self.vectorstore.delete(ids)
+    
+    def _persist_vectorstore(self) -> None:
+        """
+        Lưu các thay đổi của vectorstore xuống đĩa
+        """
+        if self.vectorstore_type == 'chromadb':
+            self.vectorstore.persist()
+        elif self.vectorstore_type in ('faiss', 'numpy'):
+            self.vectorstore.save_local(self.persist_directory)
+    
+    @staticmethod
+    def _get_chunk_ids(documents: List[Document]) -> Optional[List[str]]:
+        """
+        Lấy chunk ID của documents (None nếu có document thiếu ID)
+        
+        Args:
+            documents: List of Document objects
+            
+        Returns:
+            List of chunk IDs hoặc None
+        """
+        ids = [doc.metadata.get('chunk_id') for doc in documents]
+        return ids if all(ids) else None
+    
     def similarity_search(self, 
                          query: str, 
                          k: int = 5,
@@ -202,15 +1179,16 @@ class EmbeddingManager:
             raise ValueError("Vectorstore chưa được khởi tạo hoặc load")
         
         try:
-            if score_threshold is not None:
-                # Search với score threshold
-                results = self.vectorstore.similarity_search_with_score(query, k=k)
-                # Filter theo threshold
-                results = [(doc, score) for doc, score in results if score >= score_threshold]
-                return [doc for doc, _ in results]
-            else:
-                # Search thông thường
-                return self.vectorstore.similarity_search(query, k=k)
+            with self._store_lock():
+                if score_threshold is not None:
+                    # Search với score threshold
+                    results = self.vectorstore.similarity_search_with_score(query, k=k)
+                    # Filter theo threshold
+                    results = [(doc, score) for doc, score in results if score >= score_threshold]
+                    return [doc for doc, _ in results]
+                else:
+                    # Search thông thường
+                    return self.vectorstore.similarity_search(query, k=k)
                 
         except Exception as e:
             print(f"❌ Lỗi khi tìm kiếm: {str(e)}")
@@ -233,11 +1211,79 @@ class EmbeddingManager:
             raise ValueError("Vectorstore chưa được khởi tạo hoặc load")
         
         try:
-            return self.vectorstore.similarity_search_with_score(query, k=k)
+            with self._store_lock():
+                return self.vectorstore.similarity_search_with_score(query, k=k)
         except Exception as e:
             print(f"❌ Lỗi khi tìm kiếm: {str(e)}")
             return []
     
+    def similarity_search_batch(self,
+                                queries: List[str],
+                                k: int = 5) -> List[List[Tuple[Document, float]]]:
+        """
+        Tìm kiếm nhiều query cùng lúc
+        
+        Các query được encode trong một batch của model, sau đó vectorstore
+        được tìm kiếm một lần cho cả ma trận query (FAISS index.search, Chroma
+        collection.query, numpy nhân ma trận). Score giống similarity_search_with_score.
+        
+        Args:
+            queries: Các câu truy vấn
+            k: Số lượng results mỗi query
+            
+        Returns:
+            List (Document, score) của từng query, theo thứ tự queries
+        """
+        if self.vectorstore is None:
+            raise ValueError("Vectorstore chưa được khởi tạo hoặc load")
+        
+        queries = list(queries)
+        if not queries:
+            return []
+        
+        try:
+            # Encode ngoài lock: không chặn các thao tác khác trên vectorstore
+            vectors = embed_queries(self.embeddings, queries)
+            with self._store_lock():
+                return self._search_vectors(vectors, k)
+        except Exception as e:
+            print(f"❌ Lỗi khi tìm kiếm: {str(e)}")
+            return [[] for _ in queries]
+    
+    def _search_vectors(self, vectors: List[List[float]], k: int) -> List[List[Tuple[Document, float]]]:
+        """
+        Một lần tìm kiếm trên vectorstore cho nhiều vector query
+        """
+        if self.vectorstore_type == 'chromadb':
+            result = self.vectorstore._collection.query(
+                query_embeddings=vectors,
+                n_results=k,
+                include=['documents', 'metadatas', 'distances'],
+            )
+            return [
+                [(Document(page_content=text, metadata=metadata or {}), distance)
+                 for text, metadata, distance in zip(texts, metadatas, distances)]
+                for texts, metadatas, distances in zip(
+                    result['documents'], result['metadatas'], result['distances'])
+            ]
+        
+        elif self.vectorstore_type == 'faiss':
+            matrix = np.asarray(vectors, dtype=np.float32)
+            if self.vectorstore._normalize_L2:
+                matrix /= np.clip(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12, None)
+            scores, indices = self.vectorstore.index.search(matrix, k)
+            return [
+                [(self.vectorstore.docstore.search(self.vectorstore.index_to_docstore_id[i]), float(score))
+                 for score, i in zip(row_scores, row_indices) if i != -1]
+                for row_scores, row_indices in zip(scores, indices)
+            ]
+        
+        elif self.vectorstore_type == 'numpy':
+            return self.vectorstore.similarity_search_with_score_by_vectors(vectors, k=k)
+        
+        else:
+            raise ValueError(f"Vector store type không được hỗ trợ: {self.vectorstore_type}")
+    
     def get_retriever(self, search_kwargs: Optional[Dict[str, Any]] = None):
         """
         Lấy retriever object cho RAG pipeline
@@ -260,9 +1306,8 @@ class EmbeddingManager:
 
 
 if __name__ == "__main__":
-    # Test embedding manager
-    from utils import load_config, load_environment
-    from document_processor import DocumentProcessor
+    # Test embedding manager (chạy từ thư mục gốc: python -m src.embeddings)
+    from src.utils import load_config, load_environment
     
     config = load_config()
     env = load_environment()
@@ -0,0 +1,148 @@
+"""
+Ingestion Report Module
+Báo cáo JSON cho mỗi lần ingest: thời gian từng bước, throughput và các file chậm nhất
+"""
+
+import json
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Union
+
+
+def build_ingest_report(config: Dict[str, Any],
+                        processor,
+                        embedding_manager=None,
+                        chunk_counts: Optional[Dict[str, int]] = None,
+                        stage_seconds: Optional[Dict[str, float]] = None,
+                        mode: str = 'batch',
+                        slowest_files: int = 5) -> Dict[str, Any]:
+    """
+    Tổng hợp báo cáo ingest từ thống kê của DocumentProcessor và EmbeddingManager
+    
+    Args:
+        config: Configuration dictionary
+        processor: DocumentProcessor đã chạy (load_stats, split_stats, dedup_stats)
+        embedding_manager: EmbeddingManager đã index (build_stats), nếu có
+        chunk_counts: Số chunks đã index theo file (sau khi lọc trùng)
+        stage_seconds: Thời gian của từng bước do script đo
+        mode: Chế độ chạy ('batch', 'stream', 'from-chunks')
+        slowest_files: Số file chậm nhất được liệt kê
+    
+    Returns:
+        Dictionary có thể ghi ra JSON
+    """
+    chunk_counts = chunk_counts or {}
+    files = []
+    
+    for load_stats in processor.load_stats:
+        split_stats = processor.split_stats.get(load_stats['file'], {})
+        files.append({
+            'file': load_stats['file'],
+            'pages': load_stats['pages'],
+            'load_seconds': round(load_stats['seconds'], 4),
+            'split_seconds': round(split_stats.get('seconds', 0.0), 4),
+            'chunks': split_stats.get('chunks', 0),
+            'indexed_chunks': chunk_counts.get(load_stats['file'], 0),
+            'bytes_removed': load_stats.get('bytes_removed', 0),
+            'error': load_stats['error'],
+        })
+    
+    load_seconds = sum(f['load_seconds'] for f in files)
+    pages = sum(f['pages'] for f in files)
+    for entry in files:
+        entry['total_seconds'] = round(entry['load_seconds'] + entry['split_seconds'], 4)
+    
+    slowest = sorted(files, key=lambda f: f['total_seconds'], reverse=True)[:slowest_files]
+    
+    return {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'mode': mode,
+        'settings': {
+            'splitter': config['document_processing'].get('splitter', 'recursive'),
+            'chunk_size': config['document_processing']['chunk_size'],
+            'chunk_overlap': config['document_processing']['chunk_overlap'],
+            'num_workers': config['document_processing'].get('num_workers', 1),
+            'embedding_model': config['embedding']['model_name'],
+            'vectorstore_type': config['vectorstore']['type'],
+        },
+        'stages': {name: round(seconds, 4) for name, seconds in (stage_seconds or {}).items()},
+        'totals': {
+            'files': len(files),
+            'failed_files': sum(1 for f in files if f['error']),
+            'pages': pages,
+            'chunks': sum(f['chunks'] for f in files),
+            'indexed_chunks': sum(chunk_counts.values()),
+            'load_seconds': round(load_seconds, 4),
+            'split_seconds': round(sum(f['split_seconds'] for f in files), 4),
+            'pages_per_second': round(pages / load_seconds, 2) if load_seconds else 0.0,
+            'bytes_removed': sum(f['bytes_removed'] for f in files),
+            'truncated_chunks': processor.truncated_chunks,
+        },
+        'dedup': processor.dedup_stats,
+        'embedding': embedding_manager.build_stats if embedding_manager is not None else {},
+        'embedding_encoder': embedding_manager.encoder.stats() if embedding_manager is not None else {},
+        'embedding_cache': (
+            embedding_manager.embedding_cache.stats()
+            if embedding_manager is not None and embedding_manager.embedding_cache is not None else {}
+        ),
+        'slowest_files': [f['file'] for f in slowest],
+        'files': files,
+    }
+
+
+def save_ingest_report(report: Dict[str, Any], report_dir: Union[str, Path]) -> Path:
+    """
+    Ghi báo cáo ra report_dir/ingest_<thời gian>.json
+    
+    Args:
+        report: Báo cáo từ build_ingest_report
+        report_dir: Thư mục lưu báo cáo
+    
+    Returns:
+        Đường dẫn file báo cáo
+    """
+    report_dir = Path(report_dir)
+    report_dir.mkdir(parents=True, exist_ok=True)
+    path = report_dir / f"ingest_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def print_ingest_summary(report: Dict[str, Any]) -> None:
+    """
+    In tóm tắt báo cáo: thời gian từng bước và các file chậm nhất
+    
+    Args:
+        report: Báo cáo từ build_ingest_report
+    """
+    stages = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in report['stages'].items())
+    if stages:
+        print(f"⏱️  Thời gian: {stages}")
+    
+    embedding = report['embedding']
+    if embedding:
+        print(f"⏱️  Embedding: {embedding['batches_per_second']:.2f} batches/s, "
+              f"{embedding['vectors_per_second']:.1f} vectors/s, "
+              f"ghi store {embedding['store_write_seconds']:.1f}s")
+    
+    encoder = report.get('embedding_encoder')
+    if encoder and encoder['texts']:
+        print(f"⏱️  Model encode: {encoder['vectors_per_second']:.1f} vectors/s "
+              f"({encoder['texts']} texts, batch_size={encoder['batch_size']}, "
+              f"{encoder['num_processes']} process)")
+    
+    cache = report.get('embedding_cache')
+    if cache:
+        print(f"💾 Embedding cache: {cache['hits']} hit, {cache['misses']} miss "
+              f"({cache['hit_ratio'] * 100:.1f}%), {cache['entries']} vectors, "
+              f"{cache['evictions']} bị xóa")
+    
+    files_by_name = {f['file']: f for f in report['files']}
+    slowest: List[Dict[str, Any]] = [files_by_name[name] for name in report['slowest_files']]
+    if slowest:
+        print("🐢 File chậm nhất:")
+        for entry in slowest:
+            print(f"   - {entry['file']}: {entry['total_seconds']:.2f}s "
+                  f"(load {entry['load_seconds']:.2f}s, split {entry['split_seconds']:.2f}s, "
+                  f"{entry['pages']} trang, {entry['chunks']} chunks)")
@@ -0,0 +1,428 @@
+"""
+Ingestion Jobs Module
+Hàng đợi job ingest lưu trong SQLite và worker xử lý nền (không cần broker ngoài)
+"""
+
+import os
+import re
+import time
+import socket
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterator, Union
+
+from src.document_processor import DocumentProcessor
+from src.embeddings import EmbeddingManager
+from src.manifest import IndexManifest
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    file_path TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    num_chunks INTEGER,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    owner TEXT,
+    updated_at REAL
+)
+"""
+
+# Cột được thêm sau: thêm vào database cũ khi mở
+_ADDED_COLUMNS = {'owner': 'TEXT', 'updated_at': 'REAL'}
+
+_UNSAFE_FILENAME_CHARS = re.compile(r'[^\w.\- ]+', re.UNICODE)
+
+# Manifest được ghi bởi nhiều worker thread
+_manifest_lock = threading.Lock()
+
+
+class JobQueue:
+    """
+    Hàng đợi job ingest trong một file SQLite
+    
+    Trạng thái job: queued -> running -> done | failed. Mỗi thao tác mở
+    connection riêng nên dùng được từ nhiều thread và nhiều process.
+    
+    Job running ghi owner ("host:pid") và heartbeat updated_at; worker
+    chỉ đưa lại hàng đợi các job có heartbeat quá stale_after giây hoặc
+    có owner là process đã chết trên cùng máy, không động vào job của
+    worker khác đang chạy.
+    """
+    
+    def __init__(self, db_path: Union[str, Path], stale_after: float = 600.0):
+        """
+        Khởi tạo hàng đợi
+        
+        Args:
+            db_path: Đường dẫn file SQLite
+            stale_after: Số giây không có heartbeat thì job running bị coi là dở dang
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.stale_after = stale_after
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(_SCHEMA)
+            columns = {row['name'] for row in conn.execute('PRAGMA table_info(jobs)')}
+            for name, column_type in _ADDED_COLUMNS.items():
+                if name not in columns:
+                    conn.execute(f'ALTER TABLE jobs ADD COLUMN {name} {column_type}')
+    
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # isolation_level=None: autocommit, transaction do BEGIN tự quản lý
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+    
+    def enqueue(self, file_path: Union[str, Path]) -> int:
+        """
+        Thêm job ingest một file
+        
+        Args:
+            file_path: Đường dẫn file cần index
+        
+        Returns:
+            ID của job
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                'INSERT INTO jobs (file_path, message, created_at) VALUES (?, ?, ?)',
+                (str(file_path), 'Đang chờ', time.time()),
+            )
+            return cursor.lastrowid
+    
+    def claim_next(self) -> Optional[Dict[str, Any]]:
+        """
+        Lấy job queued cũ nhất và chuyển sang running (atomic)
+        
+        Returns:
+            Job, hoặc None nếu hàng đợi trống
+        """
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    now = time.time()
+                    conn.execute(
+                        "UPDATE jobs SET status = 'running', message = ?, started_at = ?, owner = ?, "
+                        "updated_at = ? WHERE id = ?",
+                        ('Đang xử lý', now, self.owner, now, row['id']),
+                    )
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        
+        return dict(row, status='running') if row is not None else None
+    
+    def update_progress(self, job_id: int, progress: float, message: str) -> None:
+        """
+        Cập nhật tiến độ job (0-1), đồng thời là heartbeat
+        """
+        with self._connect() as conn:
+            conn.execute(
+                'UPDATE jobs SET progress = ?, message = ?, updated_at = ? WHERE id = ?',
+                (progress, message, time.time(), job_id),
+            )
+    
+    def heartbeat(self, job_id: int) -> None:
+        """
+        Báo job running vẫn đang được xử lý
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET updated_at = ? WHERE id = ? AND status = 'running'",
+                (time.time(), job_id),
+            )
+    
+    def finish(self, job_id: int, num_chunks: int) -> None:
+        """
+        Đánh dấu job hoàn tất
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'done', progress = 1, message = ?, num_chunks = ?, "
+                "finished_at = ? WHERE id = ?",
+                (f'Đã index {num_chunks} chunks', num_chunks, time.time(), job_id),
+            )
+    
+    def fail(self, job_id: int, error: str) -> None:
+        """
+        Đánh dấu job thất bại
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', message = 'Lỗi', error = ?, finished_at = ? "
+                "WHERE id = ?",
+                (error, time.time(), job_id),
+            )
+    
+    @staticmethod
+    def _owner_is_dead(owner: Optional[str]) -> bool:
+        """
+        Owner là process trên máy này và process đó không còn chạy
+        """
+        host, _, pid = (owner or '').rpartition(':')
+        if host != socket.gethostname() or not pid.isdigit():
+            return False
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            return False
+        return False
+    
+    def requeue_stale(self) -> int:
+        """
+        Đưa các job running của worker đã chết giữa chừng về queued
+        
+        Job bị coi là dở dang khi heartbeat cũ hơn stale_after giây, hoặc
+        owner là process đã kết thúc trên cùng máy.
+        
+        Returns:
+            Số job được đưa lại hàng đợi
+        """
+        deadline = time.time() - self.stale_after
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                rows = conn.execute(
+                    "SELECT id, owner, COALESCE(updated_at, started_at, created_at) AS heartbeat "
+                    "FROM jobs WHERE status = 'running'"
+                ).fetchall()
+                stale_ids = [
+                    row['id'] for row in rows
+                    if row['heartbeat'] < deadline or self._owner_is_dead(row['owner'])
+                ]
+                conn.executemany(
+                    "UPDATE jobs SET status = 'queued', progress = 0, message = 'Đang chờ (chạy lại)', "
+                    "owner = NULL WHERE id = ? AND status = 'running'",
+                    [(job_id,) for job_id in stale_ids],
+                )
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        return len(stale_ids)
+    
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Lấy thông tin một job
+        """
+        with self._connect() as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            return dict(row) if row else None
+    
+    def list_jobs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Các job gần nhất (mới nhất trước)
+        """
+        with self._connect() as conn:
+            rows = conn.execute('SELECT * FROM jobs ORDER BY id DESC LIMIT ?', (limit,)).fetchall()
+            return [dict(row) for row in rows]
+
+
+def save_upload(filename: str, data: bytes, upload_dir: Union[str, Path]) -> Path:
+    """
+    Lưu file upload vào thư mục documents
+    
+    File cùng tên được ghi đè, job ingest sẽ thay chunks cũ của file đó.
+    
+    Args:
+        filename: Tên file do người dùng gửi lên
+        data: Nội dung file
+        upload_dir: Thư mục lưu
+    
+    Returns:
+        Đường dẫn file đã lưu
+    """
+    name = _UNSAFE_FILENAME_CHARS.sub('_', Path(filename).name).strip(' .')
+    if not name:
+        raise ValueError(f"Tên file không hợp lệ: {filename}")
+    
+    upload_dir = Path(upload_dir)
+    upload_dir.mkdir(parents=True, exist_ok=True)
+    path = upload_dir / name
+    tmp_path = path.with_name(path.name + '.uploading')
+    tmp_path.write_bytes(data)
+    tmp_path.replace(path)
+    return path
+
+
+class IngestionWorker:
+    """
+    Worker thread xử lý các job trong JobQueue
+    
+    Mỗi job load, làm sạch và chia chunks một file rồi thay chunks cũ của
+    file đó trong vectorstore (giống update_vectorstore.py, không lọc
+    near-duplicate). Số job chạy đồng thời bị giới hạn bởi max_workers;
+    query vẫn được phục vụ trong lúc ingest nếu worker dùng chung
+    EmbeddingManager với chatbot.
+    """
+    
+    def __init__(self,
+                 config: Dict[str, Any],
+                 job_queue: JobQueue,
+                 embedding_manager: EmbeddingManager,
+                 max_workers: int = 1,
+                 poll_interval: float = 2.0):
+        """
+        Khởi tạo worker
+        
+        Args:
+            config: Configuration dictionary
+            job_queue: Hàng đợi job
+            embedding_manager: EmbeddingManager (đã load vectorstore nếu có)
+            max_workers: Số job xử lý đồng thời
+            poll_interval: Thời gian chờ giữa các lần kiểm tra hàng đợi (giây)
+        """
+        self.config = config
+        self.job_queue = job_queue
+        self.embedding_manager = embedding_manager
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+    
+    def start(self) -> None:
+        """
+        Chạy các worker thread nền (daemon)
+        """
+        requeued = self.job_queue.requeue_stale()
+        if requeued:
+            print(f"♻️  Đưa lại {requeued} job dở dang vào hàng đợi")
+        
+        for i in range(self.max_workers):
+            thread = threading.Thread(target=self._run, name=f"ingest-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+    
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Dừng worker sau khi xong job hiện tại
+        """
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+    
+    def run_pending(self) -> int:
+        """
+        Xử lý hết các job đang chờ trong thread hiện tại (dùng cho CLI)
+        
+        Returns:
+            Số job đã xử lý
+        """
+        processed = 0
+        while True:
+            job = self.job_queue.claim_next()
+            if job is None:
+                return processed
+            self.process(job)
+            processed += 1
+    
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            job = self.job_queue.claim_next()
+            if job is None:
+                self._stop.wait(self.poll_interval)
+                continue
+            self.process(job)
+    
+    @contextmanager
+    def _heartbeat(self, job_id: int) -> Iterator[None]:
+        """
+        Thread nền cập nhật heartbeat của job trong lúc xử lý (kể cả khi
+        một batch embed chạy lâu, không có cập nhật tiến độ)
+        """
+        done = threading.Event()
+        interval = max(self.job_queue.stale_after / 4, 1.0)
+        
+        def beat():
+            while not done.wait(interval):
+                try:
+                    self.job_queue.heartbeat(job_id)
+                except sqlite3.Error as e:
+                    print(f"⚠️  Không cập nhật được heartbeat job {job_id}: {e}")
+        
+        thread = threading.Thread(target=beat, name=f"ingest-heartbeat-{job_id}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            done.set()
+            thread.join()
+    
+    def process(self, job: Dict[str, Any]) -> None:
+        """
+        Xử lý một job, ghi lỗi vào job thay vì raise
+        
+        Args:
+            job: Job đã được claim
+        """
+        with self._heartbeat(job['id']):
+            self._process(job)
+    
+    def _process(self, job: Dict[str, Any]) -> None:
+        job_id, file_path = job['id'], job['file_path']
+        
+        try:
+            processor = DocumentProcessor(self.config)
+            
+            self.job_queue.update_progress(job_id, 0.05, 'Đang load document')
+            documents = processor.load_document(file_path)
+            if processor.load_stats[-1]['error']:
+                raise ValueError(f"Không load được {file_path}: {processor.load_stats[-1]['error']}")
+            if not documents:
+                raise ValueError(f"Không load được nội dung từ {file_path}")
+            
+            # Giống update_vectorstore.py: index nguyên file, không lọc near-duplicate
+            self.job_queue.update_progress(job_id, 0.3, 'Đang chia chunks')
+            chunks = processor.split_documents(documents)
+            
+            manager = self.embedding_manager
+            with _manifest_lock:
+                holders = IndexManifest(manager.manifest_path).duplicate_holders(file_path)
+            
+            # Ghi chunks mới trước, xóa chunks cũ sau và persist một lần cho cả job
+            self.job_queue.update_progress(job_id, 0.4, f'Đang embed 0/{len(chunks)} chunks')
+            manager.replace_source(
+                file_path,
+                chunks,
+                on_batch=lambda done: self.job_queue.update_progress(
+                    job_id, 0.4 + 0.55 * done / len(chunks), f'Đang embed {done}/{len(chunks)} chunks',
+                ),
+            )
+            
+            with _manifest_lock:
+                manifest = IndexManifest(manager.manifest_path)
+                manifest.update(file_path, len(chunks))
+                manifest.save()
+            
+            self.job_queue.finish(job_id, len(chunks))
+            
+            # Chunks vừa xóa có thể là đại diện near-duplicate (lúc build toàn bộ) của file khác
+            for holder in holders:
+                if Path(holder).exists():
+                    print(f"♻️  Index lại {holder} (có chunk trùng được lưu dưới {file_path})")
+                    self.job_queue.enqueue(holder)
+        
+        except Exception as e:
+            print(f"❌ Job {job_id} ({file_path}) thất bại: {e}")
+            self.job_queue.fail(job_id, str(e))
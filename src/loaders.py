@@ -0,0 +1,205 @@
+"""
+Document Loaders Module
+Registry các backend load document theo định dạng file
+"""
+
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Callable, Optional
+
+try:
+    from langchain_core.documents import Document
+except ImportError:
+    from langchain.schema import Document
+
+
+# LOADERS[extension][backend] = hàm (file_path, options) -> List[Document]
+LOADERS: Dict[str, Dict[str, Callable[[str, Dict[str, Any]], List[Document]]]] = {}
+
+# Backend mặc định, giữ nguyên hành vi trước khi có registry
+DEFAULT_LOADERS = {
+    'pdf': 'pypdf',
+    'docx': 'docx2txt',
+    'txt': 'text',
+    'md': 'unstructured',
+}
+
+
+def register_loader(extension: str, name: str):
+    """
+    Decorator đăng ký một loader backend cho một định dạng
+    
+    Args:
+        extension: Định dạng file (không có dấu chấm), ví dụ 'pdf'
+        name: Tên backend, dùng trong config document_processing.loaders
+    """
+    def decorator(func):
+        LOADERS.setdefault(extension, {})[name] = func
+        return func
+    return decorator
+
+
+def get_loader(extension: str, name: Optional[str] = None):
+    """
+    Lấy loader cho một định dạng
+    
+    Args:
+        extension: Định dạng file
+        name: Tên backend (mặc định theo DEFAULT_LOADERS)
+    
+    Returns:
+        Hàm loader, hoặc None nếu định dạng không được hỗ trợ
+    """
+    backends = LOADERS.get(extension)
+    if not backends:
+        return None
+    
+    name = name or DEFAULT_LOADERS.get(extension)
+    if name not in backends:
+        raise ValueError(
+            f"Loader '{name}' không tồn tại cho .{extension} "
+            f"(có: {', '.join(sorted(backends))})"
+        )
+    return backends[name]
+
+
+def _langchain_loaders():
+    """
+    Import các loader của LangChain khi cần (Unstructured import khá nặng)
+    """
+    try:
+        from langchain_community import document_loaders
+    except ImportError:
+        from langchain import document_loaders
+    return document_loaders
+
+
+# ---------------------------------------------------------------------------
+# PDF
+# ---------------------------------------------------------------------------
+
+@register_loader('pdf', 'pypdf')
+def load_pdf_pypdf(file_path: str, options: Dict[str, Any]) -> List[Document]:
+    return _langchain_loaders().PyPDFLoader(file_path).load()
+
+
+def _extract_pdf_pages(file_path: str, first_page: int, last_page: int) -> List[str]:
+    """
+    Extract text các trang [first_page, last_page) bằng pdfplumber
+    """
+    import pdfplumber
+    
+    with pdfplumber.open(file_path) as pdf:
+        return [
+            pdf.pages[i].extract_text() or ''
+            for i in range(first_page, min(last_page, len(pdf.pages)))
+        ]
+
+
+@register_loader('pdf', 'pdfplumber')
+def load_pdf_pdfplumber(file_path: str, options: Dict[str, Any]) -> List[Document]:
+    """
+    Load PDF bằng pdfplumber, mỗi trang một Document
+    
+    Với pdf_page_workers > 1, các khoảng trang được extract song song
+    trên process pool.
+    """
+    import pdfplumber
+    
+    with pdfplumber.open(file_path) as pdf:
+        num_pages = len(pdf.pages)
+    
+    page_workers = options.get('pdf_page_workers', 1)
+    
+    if page_workers > 1 and num_pages > 1:
+        step = -(-num_pages // page_workers)
+        ranges = [(start, start + step) for start in range(0, num_pages, step)]
+        with ProcessPoolExecutor(max_workers=len(ranges)) as executor:
+            futures = [executor.submit(_extract_pdf_pages, file_path, a, b) for a, b in ranges]
+            texts = [text for future in futures for text in future.result()]
+    else:
+        texts = _extract_pdf_pages(file_path, 0, num_pages)
+    
+    # Metadata giống PyPDFLoader: 'page' bắt đầu từ 0
+    return [
+        Document(page_content=text, metadata={'source': file_path, 'page': i})
+        for i, text in enumerate(texts)
+    ]
+
+
+# ---------------------------------------------------------------------------
+# DOCX
+# ---------------------------------------------------------------------------
+
+@register_loader('docx', 'docx2txt')
+def load_docx_docx2txt(file_path: str, options: Dict[str, Any]) -> List[Document]:
+    return _langchain_loaders().Docx2txtLoader(file_path).load()
+
+
+@register_loader('docx', 'python-docx')
+def load_docx_python_docx(file_path: str, options: Dict[str, Any]) -> List[Document]:
+    """
+    Đọc DOCX trực tiếp bằng python-docx: các đoạn văn rồi tới các bảng
+    """
+    import docx
+    
+    document = docx.Document(file_path)
+    parts = [paragraph.text for paragraph in document.paragraphs if paragraph.text.strip()]
+    
+    for table in document.tables:
+        for row in table.rows:
+            cells = [cell.text.strip() for cell in row.cells]
+            if any(cells):
+                parts.append(" | ".join(cells))
+    
+    return [Document(page_content="\n".join(parts), metadata={'source': file_path})]
+
+
+# ---------------------------------------------------------------------------
+# TXT
+# ---------------------------------------------------------------------------
+
+@register_loader('txt', 'text')
+def load_txt(file_path: str, options: Dict[str, Any]) -> List[Document]:
+    with open(file_path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    return [Document(page_content=text, metadata={'source': file_path})]
+
+
+# ---------------------------------------------------------------------------
+# Markdown
+# ---------------------------------------------------------------------------
+
+@register_loader('md', 'unstructured')
+def load_md_unstructured(file_path: str, options: Dict[str, Any]) -> List[Document]:
+    return _langchain_loaders().UnstructuredMarkdownLoader(file_path).load()
+
+
+_MD_PATTERNS = [
+    (re.compile(r'^```.*$', re.MULTILINE), ''),                 # code fence
+    (re.compile(r'!\[([^\]]*)\]\([^)]*\)'), r'\1'),             # ảnh -> alt text
+    (re.compile(r'\[([^\]]*)\]\([^)]*\)'), r'\1'),              # link -> text
+    (re.compile(r'<[^>]+>'), ''),                               # HTML tag
+    (re.compile(r'^[ \t]{0,3}#{1,6}[ \t]*', re.MULTILINE), ''),  # heading
+    (re.compile(r'^[ \t]{0,3}>[ \t]?', re.MULTILINE), ''),      # blockquote
+    (re.compile(r'^[ \t]*([-*_])([ \t]*\1){2,}[ \t]*$', re.MULTILINE), ''),  # horizontal rule
+    (re.compile(r'^([ \t]*)[-*+][ \t]+', re.MULTILINE), r'\1'),  # bullet
+    (re.compile(r'(\*\*|__)(.+?)\1'), r'\2'),                   # bold
+    (re.compile(r'(?<![\w*])([*_])(?!\s)(.+?)(?<!\s)\1(?![\w*])'), r'\2'),  # italic
+    (re.compile(r'`([^`]*)`'), r'\1'),                          # inline code
+    (re.compile(r'\n{3,}'), '\n\n'),
+]
+
+
+@register_loader('md', 'markdown')
+def load_md_plain(file_path: str, options: Dict[str, Any]) -> List[Document]:
+    """
+    Parse Markdown đơn giản bằng regex: bỏ cú pháp, giữ nội dung text
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    
+    for pattern, replacement in _MD_PATTERNS:
+        text = pattern.sub(replacement, text)
+    
+    return [Document(page_content=text.strip(), metadata={'source': file_path})]
@@ -0,0 +1,185 @@
+"""
+Index Manifest Module
+Theo dõi hash và mtime của các file đã được index để cập nhật incremental
+"""
+
+import os
+import json
+import hashlib
+from pathlib import Path
+from typing import List, Dict, Any, Union
+
+
+def file_sha256(file_path: Union[str, Path], block_size: int = 1 << 20) -> str:
+    """
+    Tính SHA-256 của nội dung file
+    
+    Args:
+        file_path: Đường dẫn đến file
+        block_size: Kích thước block đọc mỗi lần (bytes)
+    
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IndexManifest:
+    """
+    Manifest các file nguồn đã có trong vectorstore
+    
+    Mỗi entry lưu sha256, mtime, size và số chunk của một file, key là
+    đường dẫn file giống metadata 'file_path' của các chunk.
+    
+    duplicates ghi các file có chunk bị near-duplicate filter bỏ vì trùng
+    chunk của file khác (file giữ đại diện -> các file đó). Near-duplicate
+    chỉ chạy khi build toàn bộ; cập nhật incremental index nguyên file, nên
+    khi file giữ đại diện bị xóa/thay đổi, các file trùng phải được index lại.
+    """
+    
+    def __init__(self, path: Union[str, Path]):
+        """
+        Khởi tạo manifest
+        
+        Args:
+            path: Đường dẫn file manifest (JSON)
+        """
+        self.path = Path(path)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.duplicates: Dict[str, List[str]] = {}
+        
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.entries = data.get('files', {})
+            self.duplicates = data.get('duplicates', {})
+    
+    def exists(self) -> bool:
+        """
+        Manifest đã được lưu trên đĩa hay chưa
+        """
+        return self.path.exists()
+    
+    def save(self) -> None:
+        """
+        Lưu manifest xuống đĩa (ghi file tạm rồi rename để tránh file hỏng)
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'files': self.entries, 'duplicates': self.duplicates}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+    
+    def diff(self, files: List[Union[str, Path]]) -> Dict[str, List[str]]:
+        """
+        So sánh danh sách file hiện tại với manifest
+        
+        File có cùng size và mtime được coi là không đổi mà không cần hash lại.
+        
+        Args:
+            files: Danh sách file hiện có trong thư mục documents
+        
+        Returns:
+            Dictionary với các key 'new', 'changed', 'deleted', 'unchanged'
+        """
+        result = {'new': [], 'changed': [], 'deleted': [], 'unchanged': []}
+        current = set()
+        
+        for file_path in files:
+            key = str(file_path)
+            current.add(key)
+            entry = self.entries.get(key)
+            
+            if entry is None:
+                result['new'].append(key)
+                continue
+            
+            stat = os.stat(key)
+            if entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+                result['unchanged'].append(key)
+            elif entry['sha256'] == file_sha256(key):
+                # Chỉ mtime thay đổi (copy, touch...): cập nhật lại, không cần index
+                entry['mtime'] = stat.st_mtime
+                entry['size'] = stat.st_size
+                result['unchanged'].append(key)
+            else:
+                result['changed'].append(key)
+        
+        result['deleted'] = [key for key in self.entries if key not in current]
+        return result
+    
+    def update(self, file_path: Union[str, Path], num_chunks: int) -> None:
+        """
+        Ghi nhận trạng thái hiện tại của một file đã được index
+        
+        File được coi là đã index nguyên vẹn (không qua near-duplicate), nên
+        được xóa khỏi duplicates.
+        
+        Args:
+            file_path: Đường dẫn file
+            num_chunks: Số chunk đã được index từ file
+        """
+        key = str(file_path)
+        stat = os.stat(key)
+        self.entries[key] = {
+            'sha256': file_sha256(key),
+            'mtime': stat.st_mtime,
+            'size': stat.st_size,
+            'num_chunks': num_chunks,
+        }
+        self._forget_duplicates(key)
+    
+    def remove(self, file_path: Union[str, Path]) -> None:
+        """
+        Xóa một file khỏi manifest
+        
+        Args:
+            file_path: Đường dẫn file
+        """
+        self.entries.pop(str(file_path), None)
+        self._forget_duplicates(str(file_path))
+    
+    def add_duplicates(self, duplicate_files: Dict[str, List[str]]) -> None:
+        """
+        Ghi nhận kết quả near-duplicate của một lần build
+        
+        Gọi sau update() của các file trong build (update xóa file khỏi duplicates).
+        
+        Args:
+            duplicate_files: File giữ chunk đại diện -> các file có chunk bị bỏ
+                (NearDuplicateFilter.duplicate_files)
+        """
+        for file_path, duplicate_paths in duplicate_files.items():
+            paths = self.duplicates.setdefault(str(file_path), [])
+            paths.extend(str(path) for path in duplicate_paths if str(path) not in paths)
+    
+    def duplicate_holders(self, file_path: Union[str, Path]) -> List[str]:
+        """
+        Các file có chunk gần trùng chỉ được lưu dưới chunks của file này
+        
+        Khi chunks của file_path bị xóa (file bị xóa/thay đổi), các file này
+        phải được index lại để không mất nội dung.
+        
+        Args:
+            file_path: Đường dẫn file
+        
+        Returns:
+            Đường dẫn các file
+        """
+        return list(self.duplicates.get(str(file_path), []))
+    
+    def _forget_duplicates(self, key: str) -> None:
+        """
+        Xóa quan hệ near-duplicate của một file (file giữ đại diện hoặc file bị bỏ chunk)
+        """
+        self.duplicates.pop(key, None)
+        for file_path in list(self.duplicates):
+            paths = self.duplicates[file_path]
+            if key in paths:
+                paths.remove(key)
+                if not paths:
+                    del self.duplicates[file_path]
@@ -0,0 +1,495 @@
+"""
+NumPy Vector Store Module
+Vectorstore tìm kiếm chính xác trên một ma trận numpy (.npy mở bằng mmap) cho corpus vừa và nhỏ
+"""
+
+import io
+import os
+import json
+import uuid
+from itertools import islice
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterable, Tuple, Callable, Union
+
+import numpy as np
+
+try:
+    from langchain_core.documents import Document
+    from langchain_core.embeddings import Embeddings
+    from langchain_core.vectorstores import VectorStore
+except ImportError:
+    from langchain.schema import Document
+    from langchain.embeddings.base import Embeddings
+    from langchain.vectorstores.base import VectorStore
+
+
+VECTORS_FILE = 'vectors.npy'
+DOCSTORE_FILE = 'docstore.jsonl'
+STORE_META_FILE = 'store.json'
+
+# Số hàng mỗi lần nhân ma trận float16 (numpy không có BLAS cho float16) và mỗi lần ghi khi compact
+_BLOCK_ROWS = 16384
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.clip(norms, 1e-12, None)
+
+
+def _npy_header(dtype: np.dtype, shape: Tuple[int, int]) -> bytes:
+    """
+    Header .npy cho ma trận (numpy chừa chỗ để số hàng tăng mà header không đổi độ dài)
+    """
+    header = {'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': shape}
+    buffer = io.BytesIO()
+    np.lib.format.write_array_header_1_0(buffer, header)
+    return buffer.getvalue()
+
+
+def _read_npy_header(path: Path) -> Tuple[Tuple[int, ...], np.dtype, int]:
+    """
+    Đọc header .npy: (shape, dtype, offset của dữ liệu)
+    """
+    with open(path, 'rb') as f:
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, _, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, _, dtype = np.lib.format.read_array_header_2_0(f)
+        return shape, dtype, f.tell()
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    Vectorstore lưu vector đã normalize thành một ma trận liên tục
+    
+    Thư mục store gồm:
+        vectors.npy: ma trận (n, dim) float32 hoặc float16, mở bằng mmap nên
+            load gần như tức thì và nhiều process dùng chung page cache
+        docstore.jsonl: {"id", "text", "metadata"} mỗi dòng, cùng thứ tự với ma trận
+        store.json: dtype, dim, số vector và số byte của docstore đã commit
+            (ghi sau cùng: phần ghi dở phía sau bị bỏ qua khi load)
+    
+    Tìm kiếm là một phép nhân ma trận-vector (ma trận-ma trận cho nhiều
+    query) trên ma trận mmap và trên các vector chưa save (riêng, không
+    gộp thành một bản copy), rồi argpartition lấy top-k.
+    Score là bình phương khoảng cách L2 giữa các vector đã normalize
+    (= 2 - 2 * cosine), nhỏ hơn là gần hơn, giống FAISS mặc định. Vector
+    mới được giữ trong bộ nhớ và được nối vào cuối các file ở lần save_local
+    kế tiếp; vector bị xóa hoặc bị ghi đè được đánh dấu, và file chỉ được
+    ghi lại toàn bộ (compact) khi có hàng đã lưu bị xóa.
+    """
+    
+    def __init__(self,
+                 embedding: Embeddings,
+                 dtype: str = 'float32'):
+        """
+        Khởi tạo store rỗng
+        
+        Args:
+            embedding: Embedding model dùng cho query và add_texts
+            dtype: Kiểu lưu vector ('float32' hoặc 'float16')
+        """
+        if dtype not in ('float32', 'float16'):
+            raise ValueError(f"dtype không được hỗ trợ: {dtype}")
+        
+        self.embedding = embedding
+        self.dtype = np.dtype(dtype)
+        self._matrix: Optional[np.ndarray] = None
+        self._pending: List[np.ndarray] = []
+        self._directory: Optional[Path] = None
+        self._docstore_bytes = 0
+        self.ids: List[str] = []
+        self.texts: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self._row_of: Dict[str, int] = {}
+        self._deleted = np.zeros(0, dtype=bool)
+    
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+    
+    def __len__(self) -> int:
+        return len(self._row_of)
+    
+    @property
+    def _num_saved(self) -> int:
+        """
+        Số hàng nằm trong file (các hàng sau đó đang chờ save)
+        """
+        return len(self._matrix) if self._matrix is not None else 0
+    
+    def _pending_vectors(self) -> np.ndarray:
+        """
+        Các vector chưa save, gộp thành một mảng (chỉ gồm phần chưa save)
+        """
+        if len(self._pending) > 1:
+            self._pending = [np.concatenate(self._pending)]
+        return self._pending[0] if self._pending else np.zeros((0, 0), dtype=self.dtype)
+    
+    def _rows(self, rows: List[int]) -> np.ndarray:
+        """
+        Vector của các hàng (đã save hoặc chưa), rows tăng dần
+        """
+        num_saved = self._num_saved
+        saved = [row for row in rows if row < num_saved]
+        if len(saved) == len(rows):
+            return np.asarray(self._matrix[rows])
+        pending = self._pending_vectors()[[row - num_saved for row in rows if row >= num_saved]]
+        if not saved:
+            return pending
+        return np.concatenate([np.asarray(self._matrix[saved]), pending])
+    
+    def add_embeddings(self,
+                       text_embeddings: Iterable[Tuple[str, List[float]]],
+                       metadatas: Optional[List[Dict[str, Any]]] = None,
+                       ids: Optional[List[str]] = None) -> List[str]:
+        """
+        Thêm các vector đã embed; ID đã tồn tại được ghi đè
+        
+        Args:
+            text_embeddings: Các cặp (text, vector)
+            metadatas: Metadata tương ứng
+            ids: ID tương ứng (mặc định tự sinh)
+        
+        Returns:
+            Danh sách ID
+        """
+        text_embeddings = list(text_embeddings)
+        if not text_embeddings:
+            return []
+        
+        texts = [text for text, _ in text_embeddings]
+        vectors = _normalize(np.asarray([vector for _, vector in text_embeddings], dtype=np.float32))
+        metadatas = metadatas or [{} for _ in texts]
+        if ids is None:
+            ids = [uuid.uuid4().hex for _ in texts]
+        
+        first_row = len(self.ids)
+        self._deleted = np.concatenate([self._deleted, np.zeros(len(texts), dtype=bool)])
+        for offset, doc_id in enumerate(ids):
+            stale_row = self._row_of.get(doc_id)
+            if stale_row is not None:
+                self._deleted[stale_row] = True
+            self._row_of[doc_id] = first_row + offset
+        
+        self._pending.append(vectors.astype(self.dtype))
+        self.ids.extend(ids)
+        self.texts.extend(texts)
+        self.metadatas.extend(dict(metadata) for metadata in metadatas)
+        
+        return list(ids)
+    
+    def add_texts(self,
+                  texts: Iterable[str],
+                  metadatas: Optional[List[Dict[str, Any]]] = None,
+                  ids: Optional[List[str]] = None,
+                  **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        vectors = self.embedding.embed_documents(texts)
+        return self.add_embeddings(zip(texts, vectors), metadatas=metadatas, ids=ids)
+    
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        """
+        Đánh dấu xóa các ID (file chỉ thay đổi ở lần save_local kế tiếp)
+        """
+        for doc_id in ids or []:
+            row = self._row_of.pop(doc_id, None)
+            if row is not None:
+                self._deleted[row] = True
+        return True
+    
+    def get_ids(self, where: Dict[str, Any]) -> List[str]:
+        """
+        ID của các document có metadata khớp where (so sánh bằng)
+        """
+        return [
+            doc_id for doc_id, row in self._row_of.items()
+            if all(self.metadatas[row].get(key) == value for key, value in where.items())
+        ]
+    
+    def sample(self, n: int) -> List[Tuple[str, List[float]]]:
+        """
+        n cặp (text, vector) rải đều trong store
+        """
+        rows = sorted(self._row_of.values())
+        rows = rows[::max(len(rows) // max(n, 1), 1)][:n]
+        if not rows:
+            return []
+        vectors = self._rows(rows)
+        return [(self.texts[row], vector.astype(np.float32).tolist()) for row, vector in zip(rows, vectors)]
+    
+    def _scores(self, queries: np.ndarray) -> np.ndarray:
+        """
+        Cosine giữa các query (dim, q) và mọi hàng: ma trận mmap (theo block
+        với float16 để tránh copy cả ma trận) rồi tới các vector chưa save
+        """
+        parts = []
+        if self._matrix is not None:
+            if self.dtype == np.float32:
+                parts.append(self._matrix @ queries)
+            else:
+                parts.extend(
+                    self._matrix[start:start + _BLOCK_ROWS].astype(np.float32) @ queries
+                    for start in range(0, len(self._matrix), _BLOCK_ROWS)
+                )
+        if self._pending:
+            parts.append(self._pending_vectors().astype(np.float32) @ queries)
+        return np.concatenate(parts)
+    
+    def similarity_search_with_score_by_vectors(self,
+                                                embeddings: List[List[float]],
+                                                k: int = 4,
+                                                filter: Optional[Dict[str, Any]] = None) -> List[List[Tuple[Document, float]]]:
+        """
+        Tìm kiếm nhiều query bằng một phép nhân ma trận-ma trận
+        
+        Args:
+            embeddings: Vector của các query
+            k: Số kết quả mỗi query
+            filter: Điều kiện metadata (so sánh bằng)
+        
+        Returns:
+            Danh sách (Document, score) của từng query
+        """
+        if not self._row_of or not len(embeddings) or k <= 0:
+            return [[] for _ in embeddings]
+        
+        queries = _normalize(np.asarray(embeddings, dtype=np.float32))
+        scores = self._scores(queries.T)
+        excluded = self._deleted.copy()
+        if filter:
+            allowed = np.zeros(len(scores), dtype=bool)
+            allowed[[self._row_of[doc_id] for doc_id in self.get_ids(filter)]] = True
+            excluded |= ~allowed
+        scores[excluded] = -np.inf
+        
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1, axis=0)[:k]
+        
+        all_results = []
+        for column in range(scores.shape[1]):
+            column_scores = scores[:, column]
+            rows = top[:, column]
+            rows = rows[np.argsort(-column_scores[rows])]
+            
+            results = []
+            for row in rows:
+                if column_scores[row] == -np.inf:
+                    break
+                doc = Document(page_content=self.texts[row], metadata=dict(self.metadatas[row]))
+                results.append((doc, max(float(2.0 - 2.0 * column_scores[row]), 0.0)))
+            all_results.append(results)
+        return all_results
+    
+    def similarity_search_with_score_by_vector(self,
+                                               embedding: List[float],
+                                               k: int = 4,
+                                               filter: Optional[Dict[str, Any]] = None,
+                                               **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vectors([embedding], k=k, filter=filter)[0]
+    
+    def similarity_search_with_score(self,
+                                     query: str,
+                                     k: int = 4,
+                                     filter: Optional[Dict[str, Any]] = None,
+                                     **kwargs: Any) -> List[Tuple[Document, float]]:
+        embedding = self.embedding.embed_query(query)
+        return self.similarity_search_with_score_by_vector(embedding, k=k, filter=filter)
+    
+    def similarity_search_by_vector(self,
+                                    embedding: List[float],
+                                    k: int = 4,
+                                    **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k=k, **kwargs)]
+    
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, **kwargs)]
+    
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        # Vector đã normalize: score L2 bình phương trong [0, 4]
+        return lambda score: 1.0 - score / 4.0
+    
+    def save_local(self, directory: Union[str, Path]) -> None:
+        """
+        Ghi store xuống thư mục, sau đó mở lại ma trận bằng mmap
+        
+        Nếu thư mục là nơi store được load/save lần trước và không có hàng
+        đã lưu nào bị xóa, chỉ các hàng mới được nối vào cuối file (chi phí
+        theo số hàng mới, không theo kích thước store); ngược lại store được
+        ghi lại toàn bộ, bỏ các hàng đã xóa.
+        
+        Args:
+            directory: Thư mục store
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        
+        appendable = bool(
+            self._directory is not None and self._num_saved
+            and self._directory.resolve() == directory.resolve()
+            and not self._deleted[:self._num_saved].any()
+        )
+        if not (appendable and self._append_files(directory)):
+            self._write_files(directory)
+    
+    def _append_files(self, directory: Path) -> bool:
+        """
+        Nối các hàng chưa save vào cuối vectors.npy và docstore.jsonl
+        
+        Returns:
+            False nếu không nối được (header .npy đổi độ dài), cần ghi lại toàn bộ
+        """
+        num_saved = self._num_saved
+        rows = [row for row in range(num_saved, len(self.ids)) if not self._deleted[row]]
+        if rows:
+            vectors = self._rows(rows).astype(self.dtype, copy=False)
+            if vectors.shape[1] != self._matrix.shape[1]:
+                raise ValueError(f"Vector {vectors.shape[1]} chiều, store có {self._matrix.shape[1]} chiều")
+            
+            vectors_path = directory / VECTORS_FILE
+            _, _, offset = _read_npy_header(vectors_path)
+            count = num_saved + len(rows)
+            header = _npy_header(self.dtype, (count, vectors.shape[1]))
+            if len(header) != offset:
+                return False
+            
+            # Cắt phần ghi dở của lần trước (nếu có) rồi mới nối
+            with open(vectors_path, 'r+b') as f:
+                f.truncate(offset + num_saved * self._matrix.shape[1] * self.dtype.itemsize)
+                f.seek(0, os.SEEK_END)
+                f.write(np.ascontiguousarray(vectors).tobytes())
+                f.seek(0)
+                f.write(header)
+            
+            with open(directory / DOCSTORE_FILE, 'r+b') as f:
+                f.truncate(self._docstore_bytes)
+                f.seek(0, os.SEEK_END)
+                for row in rows:
+                    record = {'id': self.ids[row], 'text': self.texts[row], 'metadata': self.metadatas[row]}
+                    f.write((json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8'))
+                docstore_bytes = f.tell()
+            
+            self._write_meta(directory, count, vectors.shape[1], docstore_bytes)
+        
+        # Bỏ các hàng chưa save đã bị xóa/ghi đè khỏi bộ nhớ, hàng đã save giữ nguyên vị trí
+        self.ids = self.ids[:num_saved] + [self.ids[row] for row in rows]
+        self.texts = self.texts[:num_saved] + [self.texts[row] for row in rows]
+        self.metadatas = self.metadatas[:num_saved] + [self.metadatas[row] for row in rows]
+        for row in range(num_saved, len(self.ids)):
+            self._row_of[self.ids[row]] = row
+        self._open_files(directory)
+        return True
+    
+    def _write_files(self, directory: Path) -> None:
+        """
+        Ghi lại toàn bộ store (bỏ các hàng đã xóa), ma trận được ghi theo block
+        """
+        keep = sorted(self._row_of.values())
+        dim = self._matrix.shape[1] if self._matrix is not None else self._pending_vectors().shape[1]
+        if not keep:
+            dim = 0
+        
+        vectors_tmp = directory / (VECTORS_FILE + '.tmp')
+        with open(vectors_tmp, 'wb') as f:
+            f.write(_npy_header(self.dtype, (len(keep), dim)))
+            for start in range(0, len(keep), _BLOCK_ROWS):
+                block = self._rows(keep[start:start + _BLOCK_ROWS]).astype(self.dtype, copy=False)
+                f.write(np.ascontiguousarray(block).tobytes())
+        
+        docstore_tmp = directory / (DOCSTORE_FILE + '.tmp')
+        with open(docstore_tmp, 'wb') as f:
+            for row in keep:
+                record = {'id': self.ids[row], 'text': self.texts[row], 'metadata': self.metadatas[row]}
+                f.write((json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8'))
+            docstore_bytes = f.tell()
+        
+        # Bỏ mmap cũ trước khi thay file (Windows không cho thay file đang được map)
+        self._matrix = None
+        self._pending = []
+        os.replace(vectors_tmp, directory / VECTORS_FILE)
+        os.replace(docstore_tmp, directory / DOCSTORE_FILE)
+        self._write_meta(directory, len(keep), dim, docstore_bytes)
+        
+        self.ids = [self.ids[row] for row in keep]
+        self.texts = [self.texts[row] for row in keep]
+        self.metadatas = [self.metadatas[row] for row in keep]
+        self._row_of = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        self._open_files(directory)
+    
+    def _write_meta(self, directory: Path, count: int, dim: int, docstore_bytes: int) -> None:
+        meta_tmp = directory / (STORE_META_FILE + '.tmp')
+        with open(meta_tmp, 'w', encoding='utf-8') as f:
+            json.dump({
+                'dtype': self.dtype.name,
+                'dim': dim if count else None,
+                'count': count,
+                'docstore_bytes': docstore_bytes,
+            }, f)
+        os.replace(meta_tmp, directory / STORE_META_FILE)
+        self._docstore_bytes = docstore_bytes
+    
+    def _open_files(self, directory: Path) -> None:
+        """
+        Mở ma trận đã save bằng mmap (chỉ các hàng đã commit trong store.json)
+        """
+        with open(directory / STORE_META_FILE, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        
+        self.dtype = np.dtype(meta['dtype'])
+        self._matrix = None
+        if meta['count']:
+            shape, dtype, offset = _read_npy_header(directory / VECTORS_FILE)
+            if dtype != self.dtype or len(shape) != 2 or shape[0] < meta['count']:
+                raise ValueError(f"Numpy vectorstore tại {directory} không nhất quán (ghi dở?)")
+            self._matrix = np.memmap(directory / VECTORS_FILE, dtype=self.dtype, mode='r',
+                                     offset=offset, shape=(meta['count'], shape[1]))
+        self._pending = []
+        self._deleted = np.zeros(len(self.ids), dtype=bool)
+        self._directory = directory
+        self._docstore_bytes = meta.get('docstore_bytes', os.path.getsize(directory / DOCSTORE_FILE))
+    
+    def _load_files(self, directory: Path) -> None:
+        with open(directory / STORE_META_FILE, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        
+        # Chỉ đọc các dòng đã commit (phần nối dở phía sau bị bỏ qua)
+        self.ids, self.texts, self.metadatas = [], [], []
+        with open(directory / DOCSTORE_FILE, 'r', encoding='utf-8') as f:
+            for line in islice(f, meta['count']):
+                record = json.loads(line)
+                self.ids.append(record['id'])
+                self.texts.append(record['text'])
+                self.metadatas.append(record['metadata'])
+        
+        if len(self.ids) != meta['count']:
+            raise ValueError(f"Numpy vectorstore tại {directory} không nhất quán (ghi dở?)")
+        self._row_of = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        self._open_files(directory)
+    
+    @classmethod
+    def load_local(cls,
+                   directory: Union[str, Path],
+                   embedding: Embeddings) -> 'NumpyVectorStore':
+        """
+        Load store đã lưu (ma trận được mở bằng mmap, chỉ đọc)
+        
+        Args:
+            directory: Thư mục store
+            embedding: Embedding model
+        """
+        store = cls(embedding)
+        store._load_files(Path(directory))
+        return store
+    
+    @classmethod
+    def from_texts(cls,
+                   texts: List[str],
+                   embedding: Embeddings,
+                   metadatas: Optional[List[Dict[str, Any]]] = None,
+                   ids: Optional[List[str]] = None,
+                   dtype: str = 'float32',
+                   **kwargs: Any) -> 'NumpyVectorStore':
+        store = cls(embedding, dtype=dtype)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
@@ -0,0 +1,197 @@
+"""
+ONNX Embeddings Module
+Export model sentence-transformers sang ONNX (có thể lượng tử hóa int8) và chạy bằng ONNX Runtime
+"""
+
+import json
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Union
+
+import numpy as np
+
+try:
+    from langchain_core.embeddings import Embeddings
+except ImportError:
+    from langchain.embeddings.base import Embeddings
+
+from src.utils import batched
+
+
+ONNX_CONFIG_FILE = 'onnx_config.json'
+MODEL_FILE = 'model.onnx'
+QUANTIZED_MODEL_FILE = 'model_int8.onnx'
+
+_POOLING_MODES = ('mean', 'cls', 'max')
+
+
+def export_onnx(model_name: str,
+                output_dir: Union[str, Path],
+                quantize: bool = False,
+                opset: int = 14) -> Dict[str, Any]:
+    """
+    Export transformer của một model sentence-transformers sang ONNX
+    
+    Chỉ phần transformer được export (output last_hidden_state); pooling và
+    normalize được OnnxEmbeddings làm bằng numpy theo onnx_config.json.
+    Cần torch và sentence-transformers (chỉ lúc export).
+    
+    Args:
+        model_name: Tên hoặc đường dẫn model sentence-transformers
+        output_dir: Thư mục lưu model.onnx, tokenizer và onnx_config.json
+        quantize: Tạo thêm model_int8.onnx (dynamic quantization int8)
+        opset: ONNX opset version
+    
+    Returns:
+        Nội dung onnx_config.json
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+    
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    
+    model = SentenceTransformer(model_name, device='cpu')
+    transformer, pooling = model[0], model[1]
+    pooling_mode = pooling.get_pooling_mode_str()
+    if pooling_mode not in _POOLING_MODES:
+        raise ValueError(f"Pooling '{pooling_mode}' chưa được hỗ trợ (chỉ {', '.join(_POOLING_MODES)})")
+    
+    tokenizer = transformer.tokenizer
+    auto_model = transformer.auto_model.eval()
+    sample = tokenizer(["Quy định đào tạo"], return_tensors='pt')
+    input_names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in sample]
+    
+    class _LastHiddenState(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.model = auto_model
+        
+        def forward(self, *inputs):
+            return self.model(**dict(zip(input_names, inputs)))[0]
+    
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+    
+    print(f"📦 Export {model_name} -> {output_dir / MODEL_FILE}")
+    with torch.no_grad():
+        torch.onnx.export(
+            _LastHiddenState(),
+            tuple(sample[name] for name in input_names),
+            str(output_dir / MODEL_FILE),
+            input_names=input_names,
+            output_names=['last_hidden_state'],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+        )
+    tokenizer.save_pretrained(str(output_dir))
+    
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        
+        print(f"📦 Lượng tử hóa int8 -> {output_dir / QUANTIZED_MODEL_FILE}")
+        quantize_dynamic(
+            str(output_dir / MODEL_FILE),
+            str(output_dir / QUANTIZED_MODEL_FILE),
+            weight_type=QuantType.QInt8,
+        )
+    
+    onnx_config = {
+        'source_model': model_name,
+        'pooling': pooling_mode,
+        'max_seq_length': model.max_seq_length,
+        'dimension': model.get_sentence_embedding_dimension(),
+        'input_names': input_names,
+        'quantized': quantize,
+    }
+    with open(output_dir / ONNX_CONFIG_FILE, 'w', encoding='utf-8') as f:
+        json.dump(onnx_config, f, ensure_ascii=False, indent=2)
+    
+    return onnx_config
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    Embedding model chạy bằng ONNX Runtime (không cần torch)
+    
+    Dùng thư mục do export_onnx tạo ra. Vector được pool và normalize giống
+    sentence-transformers với normalize_embeddings=True, nên dùng được với
+    index đã build bằng HuggingFaceEmbeddings của cùng model (xem
+    EmbeddingManager.check_embedding_compatibility).
+    """
+    
+    def __init__(self,
+                 model_dir: Union[str, Path],
+                 quantized: bool = False,
+                 batch_size: int = 32,
+                 max_seq_length: Optional[int] = None,
+                 num_threads: Optional[int] = None):
+        """
+        Khởi tạo model
+        
+        Args:
+            model_dir: Thư mục model ONNX (xem export_onnx)
+            quantized: Dùng model_int8.onnx
+            batch_size: Số texts mỗi lần chạy model
+            max_seq_length: Số token tối đa (None = theo model lúc export)
+            num_threads: Số thread của ONNX Runtime (None = mặc định)
+        """
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise ImportError("Provider 'onnx' cần onnxruntime: pip install onnxruntime")
+        from transformers import AutoTokenizer
+        
+        model_dir = Path(model_dir)
+        with open(model_dir / ONNX_CONFIG_FILE, 'r', encoding='utf-8') as f:
+            self.onnx_config = json.load(f)
+        
+        model_path = model_dir / (QUANTIZED_MODEL_FILE if quantized else MODEL_FILE)
+        if not model_path.exists():
+            raise FileNotFoundError(f"Không tìm thấy {model_path} (chạy scripts/export_onnx.py export)")
+        
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(str(model_path), options, providers=['CPUExecutionProvider'])
+        self.input_names = {node.name for node in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(str(model_dir))
+        
+        self.source_model = self.onnx_config['source_model']
+        self.pooling = self.onnx_config['pooling']
+        self.quantized = quantized
+        self.batch_size = batch_size
+        self.max_seq_length = max_seq_length or self.onnx_config['max_seq_length']
+    
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        outputs = []
+        for batch in batched(texts, self.batch_size):
+            encoded = self.tokenizer(
+                batch,
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors='np',
+            )
+            feeds = {name: value.astype(np.int64) for name, value in encoded.items() if name in self.input_names}
+            hidden = self.session.run(None, feeds)[0]
+            mask = encoded['attention_mask'][..., None].astype(hidden.dtype)
+            
+            if self.pooling == 'cls':
+                pooled = hidden[:, 0]
+            elif self.pooling == 'max':
+                pooled = np.where(mask > 0, hidden, -1e9).max(axis=1)
+            else:
+                pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            
+            norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+            outputs.append(pooled / np.clip(norms, 1e-12, None))
+        
+        if not outputs:
+            return np.zeros((0, self.onnx_config['dimension']), dtype=np.float32)
+        return np.concatenate(outputs).astype(np.float32)
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._encode(texts).tolist()
+    
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([text])[0].tolist()
@@ -0,0 +1,225 @@
+"""
+Projection Module
+Giảm số chiều embedding (PCA hoặc cắt chiều kiểu Matryoshka) và đánh giá recall@k so với vector đầy đủ
+"""
+
+import json
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Union
+
+import numpy as np
+
+try:
+    from langchain_core.embeddings import Embeddings
+except ImportError:
+    from langchain.embeddings.base import Embeddings
+
+from src.utils import embed_queries
+
+
+PROJECTION_FILE = 'projection.npz'
+PROJECTION_META_FILE = 'projection.json'
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.clip(norms, 1e-12, None)
+
+
+class EmbeddingProjection:
+    """
+    Phép chiếu tuyến tính từ vector đầy đủ xuống output_dim chiều
+    
+    method 'pca': nhân với các thành phần chính fit trên corpus. Không trừ
+    mean, để inner product giữa các vector đã chiếu xấp xỉ inner product
+    gốc (ở đủ số chiều, thứ hạng kết quả không đổi). method 'truncate': giữ
+    output_dim chiều đầu (chỉ hợp với model train kiểu Matryoshka). Kết quả
+    luôn được normalize lại để dùng được với cả khoảng cách L2 lẫn cosine.
+    """
+    
+    def __init__(self,
+                 method: str,
+                 input_dim: int,
+                 output_dim: int,
+                 components: Optional[np.ndarray] = None,
+                 info: Optional[Dict[str, Any]] = None):
+        """
+        Khởi tạo phép chiếu (dùng fit hoặc load thay vì gọi trực tiếp)
+        
+        Args:
+            method: 'pca' hoặc 'truncate'
+            input_dim: Số chiều vector gốc
+            output_dim: Số chiều sau khi chiếu
+            components: Ma trận (output_dim, input_dim) các thành phần chính (pca)
+            info: Thông tin thêm lưu cùng phép chiếu (model, recall, ...)
+        """
+        if method not in ('pca', 'truncate'):
+            raise ValueError(f"Projection method không được hỗ trợ: {method}")
+        if output_dim > input_dim:
+            raise ValueError(f"Số chiều sau khi chiếu ({output_dim}) lớn hơn số chiều gốc ({input_dim})")
+        
+        self.method = method
+        self.input_dim = input_dim
+        self.output_dim = output_dim
+        self.components = components
+        self.info = info or {}
+    
+    @classmethod
+    def fit(cls,
+            vectors: np.ndarray,
+            output_dim: int,
+            method: str = 'pca',
+            info: Optional[Dict[str, Any]] = None) -> 'EmbeddingProjection':
+        """
+        Fit phép chiếu trên các vector của corpus
+        
+        Args:
+            vectors: Ma trận (n, input_dim)
+            output_dim: Số chiều sau khi chiếu
+            method: 'pca' hoặc 'truncate'
+            info: Thông tin thêm lưu cùng phép chiếu
+        
+        Returns:
+            EmbeddingProjection
+        """
+        vectors = np.asarray(vectors, dtype=np.float64)
+        input_dim = vectors.shape[1]
+        if method == 'truncate':
+            return cls('truncate', input_dim, output_dim, info=info)
+        
+        if len(vectors) < output_dim:
+            raise ValueError(f"Cần ít nhất {output_dim} vector để fit PCA {output_dim} chiều (có {len(vectors)})")
+        
+        # Ma trận moment bậc hai chỉ input_dim x input_dim nên eigh rẻ hơn SVD trên n vector
+        second_moment = vectors.T @ vectors / len(vectors)
+        eigenvalues, eigenvectors = np.linalg.eigh(second_moment)
+        order = np.argsort(eigenvalues)[::-1][:output_dim]
+        
+        info = dict(info or {})
+        info['explained_variance'] = float(eigenvalues[order].sum() / eigenvalues.sum())
+        return cls(
+            'pca', input_dim, output_dim,
+            components=eigenvectors[:, order].T.astype(np.float32),
+            info=info,
+        )
+    
+    def transform(self, vectors: Union[np.ndarray, List[List[float]]]) -> np.ndarray:
+        """
+        Chiếu và normalize các vector
+        
+        Args:
+            vectors: Ma trận (n, input_dim)
+        
+        Returns:
+            Ma trận float32 (n, output_dim)
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.shape[1] != self.input_dim:
+            raise ValueError(f"Vector {vectors.shape[1]} chiều, phép chiếu cần {self.input_dim} chiều")
+        
+        if self.method == 'truncate':
+            projected = vectors[:, :self.output_dim]
+        else:
+            projected = vectors @ self.components.T
+        return _normalize(projected).astype(np.float32)
+    
+    def save(self, directory: Union[str, Path]) -> None:
+        """
+        Lưu phép chiếu vào thư mục (cạnh index)
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        arrays = {}
+        if self.method == 'pca':
+            arrays = {'components': self.components}
+        np.savez(directory / PROJECTION_FILE, **arrays)
+        
+        with open(directory / PROJECTION_META_FILE, 'w', encoding='utf-8') as f:
+            json.dump({
+                'method': self.method,
+                'input_dim': self.input_dim,
+                'output_dim': self.output_dim,
+                'info': self.info,
+            }, f, ensure_ascii=False, indent=2)
+    
+    @classmethod
+    def load(cls, directory: Union[str, Path]) -> Optional['EmbeddingProjection']:
+        """
+        Load phép chiếu đã lưu trong thư mục
+        
+        Returns:
+            EmbeddingProjection, hoặc None nếu thư mục không có phép chiếu
+        """
+        directory = Path(directory)
+        if not (directory / PROJECTION_META_FILE).exists():
+            return None
+        
+        with open(directory / PROJECTION_META_FILE, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        arrays = np.load(directory / PROJECTION_FILE)
+        return cls(
+            meta['method'], meta['input_dim'], meta['output_dim'],
+            components=arrays['components'] if 'components' in arrays else None,
+            info=meta.get('info', {}),
+        )
+
+
+def recall_at_k(full_corpus: np.ndarray,
+                full_queries: np.ndarray,
+                projected_corpus: np.ndarray,
+                projected_queries: np.ndarray,
+                k: int = 10) -> float:
+    """
+    Recall@k của tìm kiếm trên vector đã chiếu so với tìm kiếm chính xác trên vector đầy đủ
+    
+    Args:
+        full_corpus, full_queries: Vector đầy đủ (đã normalize)
+        projected_corpus, projected_queries: Vector sau khi chiếu
+        k: Số kết quả
+    
+    Returns:
+        Tỉ lệ trung bình top-k đầy đủ được tìm thấy trong top-k sau khi chiếu
+    """
+    k = min(k, len(full_corpus))
+    
+    def top_k(corpus: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        scores = queries @ corpus.T
+        return np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    
+    expected = top_k(full_corpus, full_queries)
+    found = top_k(projected_corpus, projected_queries)
+    hits = [len(set(e) & set(f)) for e, f in zip(expected, found)]
+    return float(np.mean(hits)) / k
+
+
+class ProjectedEmbeddings(Embeddings):
+    """
+    Bọc embedding model, chiếu vector documents và query bằng cùng một phép chiếu
+    
+    projection = None thì vector được trả về nguyên vẹn.
+    """
+    
+    def __init__(self, embeddings: Embeddings, projection: Optional[EmbeddingProjection] = None):
+        self.embeddings = embeddings
+        self.projection = projection
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = self.embeddings.embed_documents(texts)
+        if self.projection is None or not vectors:
+            return vectors
+        return self.projection.transform(vectors).tolist()
+    
+    def embed_query(self, text: str) -> List[float]:
+        vector = self.embeddings.embed_query(text)
+        if self.projection is None:
+            return vector
+        return self.projection.transform([vector])[0].tolist()
+    
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        vectors = embed_queries(self.embeddings, texts)
+        if self.projection is None or not vectors:
+            return vectors
+        return self.projection.transform(vectors).tolist()
+    
+    def __getattr__(self, name):
+        return getattr(self.embeddings, name)
@@ -276,9 +276,9 @@ class HybridRetriever(AdvancedRetriever):
 
 
 if __name__ == "__main__":
-    # Test retriever
-    from utils import load_config, load_environment
-    from embeddings import EmbeddingManager
+    # Test retriever (chạy từ thư mục gốc: python -m src.retriever)
+    from src.utils import load_config, load_environment
+    from src.embeddings import EmbeddingManager
     
     config = load_config()
     env = load_environment()
@@ -5,8 +5,11 @@ Utility functions cho chatbot system
 import os
 import yaml
 import logging
+import queue
+import threading
+from itertools import islice
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Iterable, Iterator, List, TypeVar
 from dotenv import load_dotenv
 
 
@@ -86,6 +89,103 @@ def ensure_directory(directory: str) -> Path:
     return path
 
 
+T = TypeVar('T')
+
+
+def batched(iterable: Iterable[T], batch_size: int) -> Iterator[List[T]]:
+    """
+    Chia một iterable thành các batch có kích thước tối đa batch_size
+    
+    Args:
+        iterable: Iterable nguồn
+        batch_size: Kích thước mỗi batch
+        
+    Yields:
+        List các phần tử của từng batch
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def prefetch_iterator(iterable: Iterable[T], max_buffered: int = 2) -> Iterator[T]:
+    """
+    Chạy iterable trong một thread nền, giữ tối đa max_buffered phần tử chờ
+    
+    Dùng để overlap bước sinh dữ liệu (parse documents) với bước tiêu thụ
+    (embedding). Exception của thread nền được raise lại ở bên tiêu thụ.
+    
+    Args:
+        iterable: Iterable nguồn
+        max_buffered: Số phần tử tối đa nằm trong buffer
+        
+    Yields:
+        Các phần tử của iterable theo đúng thứ tự
+    """
+    buffer = queue.Queue(maxsize=max_buffered)
+    done = object()
+    stop = threading.Event()
+    
+    def put(entry) -> bool:
+        # Không block mãi khi buffer đầy mà bên tiêu thụ đã dừng
+        while not stop.is_set():
+            try:
+                buffer.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def producer():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+            put((done, None))
+        except BaseException as e:
+            put((done, e))
+    
+    thread = threading.Thread(target=producer, name="prefetch", daemon=True)
+    thread.start()
+    
+    try:
+        while True:
+            item, error = buffer.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        # Bên tiêu thụ dừng sớm: báo producer ngừng để thread kết thúc
+        stop.set()
+
+
+def embed_queries(embeddings: Any, texts: List[str]) -> List[List[float]]:
+    """
+    Embed nhiều query trong một lần gọi model
+    
+    Các wrapper (cache, projection) có embed_queries riêng; model gốc
+    (HuggingFace, ONNX, OpenAI) encode query giống document nên dùng
+    embed_documents để được một batch duy nhất.
+    
+    Args:
+        embeddings: Embedding model
+        texts: Các query
+        
+    Returns:
+        Vector của từng query theo đúng thứ tự
+    """
+    if not texts:
+        return []
+    if hasattr(embeddings, 'embed_queries'):
+        return embeddings.embed_queries(texts)
+    return embeddings.embed_documents(texts)
+
+
 def count_tokens(text: str, model: str = "gpt-3.5-turbo") -> int:
     """
     Đếm số lượng tokens trong text
@@ -2,16 +2,42 @@
 Unit tests cho chatbot system
 """
 
+import os
+import copy
+import json
+import time
+import zlib
+import sqlite3
+import threading
 import pytest
+import numpy as np
 from pathlib import Path
 import sys
+import importlib.util
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from src.utils import load_config, load_environment
+from src.utils import load_config, load_environment, batched, prefetch_iterator
 from src.document_processor import DocumentProcessor
 from src.embeddings import EmbeddingManager
+from src.manifest import IndexManifest
+from src.chunking import RegulationTextSplitter
+from src.dedup import NearDuplicateFilter
+from src.cleaning import TextCleaner
+from src.chunk_store import ChunkStore
+from src.ingest_report import build_ingest_report, save_ingest_report, print_ingest_summary
+from src.loaders import get_loader, load_pdf_pypdf, load_txt, load_md_unstructured, load_md_plain
+from src.embedding_cache import DiskEmbeddingCache, CachedEmbeddings, QueryCachedEmbeddings
+from src.batch_encoder import BatchEncoder
+from src.projection import EmbeddingProjection, recall_at_k
+from src.numpy_store import NumpyVectorStore
+from src.onnx_embeddings import OnnxEmbeddings
+from src.jobs import JobQueue
+from src.ann_index import (
+    faiss_index_settings, faiss_factory_string, chroma_collection_metadata, build_faiss_index, faiss_reconstructable,
+    with_faiss_ids,
+)
 from langchain.schema import Document
 
 
@@ -37,6 +63,898 @@ class TestDocumentProcessor:
         chunks = processor.split_documents(docs)
         assert len(chunks) > 0
         assert all(isinstance(chunk, Document) for chunk in chunks)
+    
+    @pytest.mark.parametrize("splitter", ["recursive", "regulation"])
+    def test_token_mode_lengths(self, splitter):
+        class WordCounter:
+            """Mỗi từ là một token"""
+            window = 40
+            
+            def __call__(self, text):
+                return len(text.split())
+        
+        config = copy.deepcopy(load_config())
+        config['document_processing'].update(length_unit='tokens', splitter=splitter,
+                                             chunk_size_tokens=100, chunk_overlap_tokens=5)
+        processor = DocumentProcessor(config)
+        processor.token_counter = WordCounter()
+        
+        docs = [Document(page_content=" ".join(f"từ{i}" for i in range(500)), metadata={"source": "a.txt"})]
+        chunks = processor.split_documents(docs)
+        
+        # chunk_size_tokens bị giới hạn bởi window của model; thiết lập ký tự không bị ghi đè
+        assert len(chunks) > 1
+        assert all(len(chunk.page_content.split()) <= 40 for chunk in chunks)
+        assert processor.chunk_size == config['document_processing']['chunk_size']
+        assert processor.chunk_overlap == config['document_processing']['chunk_overlap']
+    
+    def test_parallel_loading_matches_sequential(self, tmp_path):
+        config = load_config()
+        processor = DocumentProcessor(config)
+        
+        for i in range(4):
+            (tmp_path / f"doc_{i}.txt").write_text(f"Tài liệu số {i}", encoding='utf-8')
+        
+        sequential = processor.load_documents_from_directory(str(tmp_path), num_workers=1)
+        parallel = processor.load_documents_from_directory(str(tmp_path), num_workers=2)
+        
+        assert [d.page_content for d in parallel] == [d.page_content for d in sequential]
+        assert [d.metadata for d in parallel] == [d.metadata for d in sequential]
+        assert len(processor.load_stats) == 4
+    
+    def test_load_errors_are_recorded(self, tmp_path):
+        processor = DocumentProcessor(load_config())
+        (tmp_path / "ok.txt").write_text("Quy định", encoding='utf-8')
+        
+        assert processor.load_document(str(tmp_path / "missing.txt")) == []
+        assert processor.load_stats[-1]['error']
+        assert processor.load_document(str(tmp_path / "ok.txt"))
+        assert processor.load_stats[-1]['error'] is None
+    
+    def test_pdf_skipped_only_when_ocr_complete(self, tmp_path):
+        processor = DocumentProcessor(load_config())
+        (tmp_path / "scan.pdf").write_bytes(b"%PDF-1.4")
+        (tmp_path / "scan_ocr.txt.tmp").write_text("--- Trang 1 ---", encoding='utf-8')
+        assert [f.name for f in processor.find_files(str(tmp_path))] == ["scan.pdf"]
+        
+        (tmp_path / "scan_ocr.txt.tmp").rename(tmp_path / "scan_ocr.txt")
+        assert [f.name for f in processor.find_files(str(tmp_path))] == ["scan_ocr.txt"]
+    
+    def test_chunk_ids_are_stable(self):
+        config = load_config()
+        processor = DocumentProcessor(config)
+        
+        def make_docs():
+            return [Document(
+                page_content="Quy định về học phí. " * 100,
+                metadata={"source": "a.txt", "file_path": "data/documents/a.txt"}
+            )]
+        
+        first = [c.metadata['chunk_id'] for c in processor.split_documents(make_docs())]
+        second = [c.metadata['chunk_id'] for c in processor.split_documents(make_docs())]
+        
+        assert first == second
+        assert len(set(first)) == len(first)
+
+
+
+class TestStreamingPipeline:
+    """Test prefetch_iterator và chế độ streaming"""
+    
+    def test_buffer_is_bounded_and_ordered(self):
+        produced = []
+        
+        def source():
+            for i in range(50):
+                produced.append(i)
+                yield i
+        
+        batches = prefetch_iterator(source(), max_buffered=2)
+        assert next(batches) == 0
+        time.sleep(0.2)
+        # 1 phần tử đã lấy, 2 trong buffer, producer giữ thêm tối đa 1
+        assert len(produced) <= 4
+        assert [0] + list(batches) == list(range(50))
+    
+    @pytest.mark.parametrize("num_items", [2, 1000])
+    def test_consumer_stop_ends_producer(self, num_items):
+        # 2 phần tử: producer đang chờ đặt marker kết thúc vào buffer đầy
+        batches = prefetch_iterator(iter(range(num_items)), max_buffered=1)
+        next(batches)
+        time.sleep(0.2)
+        batches.close()
+        
+        deadline = time.time() + 2
+        while any(thread.name == "prefetch" for thread in threading.enumerate()) and time.time() < deadline:
+            time.sleep(0.05)
+        assert not any(thread.name == "prefetch" for thread in threading.enumerate())
+    
+    def test_errors_are_raised_in_consumer(self):
+        def source():
+            yield 1
+            raise RuntimeError("lỗi parse")
+        
+        with pytest.raises(RuntimeError, match="lỗi parse"):
+            list(prefetch_iterator(source(), max_buffered=1))
+    
+    def test_stream_matches_batch(self, tmp_path):
+        processor = DocumentProcessor(load_config())
+        for i in range(5):
+            (tmp_path / f"doc_{i}.txt").write_text(f"Điều {i}. Quy định số {i}. " * 80, encoding='utf-8')
+        
+        expected = processor.process_documents(str(tmp_path))
+        streamed = [
+            chunk
+            for batch in prefetch_iterator(batched(processor.iter_chunks(str(tmp_path)), 3), max_buffered=2)
+            for chunk in batch
+        ]
+        
+        assert [c.metadata['chunk_id'] for c in streamed] == [c.metadata['chunk_id'] for c in expected]
+        assert [c.page_content for c in streamed] == [c.page_content for c in expected]
+
+
+class TestLoaders:
+    """Test registry loader"""
+    
+    def test_default_backends(self):
+        assert get_loader('pdf') is load_pdf_pypdf
+        assert get_loader('txt') is load_txt
+        assert get_loader('md') is load_md_unstructured
+        assert get_loader('md', 'markdown') is load_md_plain
+        assert get_loader('xlsx') is None
+    
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError, match="không tồn tại"):
+            get_loader('pdf', 'khong-co')
+    
+    def test_markdown_plain_strips_syntax(self, tmp_path):
+        path = tmp_path / "quy_che.md"
+        path.write_text(
+            "# Quy chế học vụ\n\n"
+            "> Áp dụng từ **năm học 2024**.\n\n"
+            "- Xem [quy định](https://example.com) và ![sơ đồ](a.png)\n"
+            "* Học phí _theo tín chỉ_ và `mã HP`\n\n"
+            "---\n\n"
+            "```python\nprint(1)\n```\n"
+            "<br/>Hết\n",
+            encoding='utf-8',
+        )
+        
+        documents = load_md_plain(str(path), {})
+        
+        assert documents[0].metadata == {'source': str(path)}
+        assert documents[0].page_content == (
+            "Quy chế học vụ\n\n"
+            "Áp dụng từ năm học 2024.\n\n"
+            "Xem quy định và sơ đồ\n"
+            "Học phí theo tín chỉ và mã HP\n\n"
+            "print(1)\n\n"
+            "Hết"
+        )
+
+class TestIndexManifest:
+    """Test IndexManifest"""
+    
+    def test_diff(self, tmp_path):
+        kept = tmp_path / "kept.txt"
+        changed = tmp_path / "changed.txt"
+        removed = tmp_path / "removed.txt"
+        for path in (kept, changed, removed):
+            path.write_text(path.name, encoding='utf-8')
+        
+        manifest = IndexManifest(tmp_path / "manifest.json")
+        for path in (kept, changed, removed):
+            manifest.update(path, num_chunks=1)
+        manifest.save()
+        
+        changed.write_text("nội dung mới", encoding='utf-8')
+        removed.unlink()
+        added = tmp_path / "added.txt"
+        added.write_text("added", encoding='utf-8')
+        
+        diff = IndexManifest(tmp_path / "manifest.json").diff([kept, changed, added])
+        assert diff['unchanged'] == [str(kept)]
+        assert diff['changed'] == [str(changed)]
+        assert diff['new'] == [str(added)]
+        assert diff['deleted'] == [str(removed)]
+    
+    def test_duplicate_holders(self, tmp_path):
+        a, b, c = (tmp_path / name for name in ("a.txt", "b.txt", "c.txt"))
+        for path in (a, b, c):
+            path.write_text(path.name, encoding='utf-8')
+        
+        manifest = IndexManifest(tmp_path / "manifest.json")
+        for path in (a, b, c):
+            manifest.update(path, num_chunks=1)
+        manifest.add_duplicates({str(a): [str(b), str(c)]})
+        manifest.save()
+        
+        manifest = IndexManifest(tmp_path / "manifest.json")
+        assert manifest.duplicate_holders(a) == [str(b), str(c)]
+        
+        # b được index lại nguyên vẹn, a bị xóa: không còn gì phải index lại
+        manifest.update(b, num_chunks=1)
+        assert manifest.duplicate_holders(a) == [str(c)]
+        manifest.remove(a)
+        assert manifest.duplicate_holders(a) == []
+        assert manifest.duplicates == {}
+
+
+class TestChunkStore:
+    """Test ChunkStore"""
+    
+    def test_round_trip(self, tmp_path):
+        source = tmp_path / "a.txt"
+        source.write_text("nội dung", encoding="utf-8")
+        chunks = [
+            Document(page_content="Điều 1. Phạm vi", metadata={"file_path": str(source), "chunk_id": "c1", "content_hash": "h1"}),
+            Document(page_content="Điều 2. Đối tượng", metadata={"file_path": str(source), "chunk_id": "c2", "content_hash": "h2"}),
+        ]
+        
+        store = ChunkStore(tmp_path / "chunks")
+        assert store.save(chunks, {"chunk_size": 1000}) == 2
+        
+        loaded = list(store.iter_documents())
+        assert [d.page_content for d in loaded] == [d.page_content for d in chunks]
+        assert [d.metadata for d in loaded] == [d.metadata for d in chunks]
+        assert store.read_meta()['settings'] == {"chunk_size": 1000}
+        assert store.unchanged_files() == {str(source): 2}
+    
+    def test_stream_records_duplicate_files(self, tmp_path):
+        docs_dir = tmp_path / "docs"
+        docs_dir.mkdir()
+        text = " ".join(f"từ{i}" for i in range(120))
+        (docs_dir / "a.txt").write_text(text, encoding="utf-8")
+        (docs_dir / "b.txt").write_text(text.replace("từ60", "khác"), encoding="utf-8")
+        
+        config = copy.deepcopy(load_config())
+        config['document_processing'].update(dedup={'enabled': True, 'threshold': 0.8}, num_workers=1)
+        processor = DocumentProcessor(config)
+        store = ChunkStore(tmp_path / "chunks")
+        
+        # Đại diện đã được ghi trước khi gặp bản trùng ở file sau
+        written = list(store.write(processor.iter_chunks(str(docs_dir)), {}, processor.duplicate_files))
+        
+        assert len(written) == 1
+        kept = written[0].metadata['file_path']
+        dropped = str(docs_dir / ("b.txt" if kept.endswith("a.txt") else "a.txt"))
+        expected = {kept: [dropped]}
+        assert processor.duplicate_files == expected
+        assert store.read_meta()['duplicate_files'] == expected
+
+
+class TestDiskEmbeddingCache:
+    """Test DiskEmbeddingCache"""
+    
+    def test_hit_and_eviction(self, tmp_path):
+        cache = DiskEmbeddingCache(tmp_path, "test-model", max_entries=2, evict_fraction=0.5)
+        keys = [cache.make_key(text) for text in ["a", "b", "c"]]
+        
+        cache.put_many(keys[:2], [[1.0, 0.0], [0.0, 1.0]])
+        assert cache.make_key(" a ") == keys[0]
+        time.sleep(0.05)
+        assert cache.get_many(keys[:1])[0].tolist() == [1.0, 0.0]
+        
+        # Cache đầy: "b" ít được dùng gần đây nhất nên bị xóa
+        cache.put_many(keys[2:], [[0.5, 0.5]])
+        assert cache.get_many(keys[1:2]) == [None]
+        
+        reopened = DiskEmbeddingCache(tmp_path, "test-model", max_entries=2)
+        assert reopened.get_many(keys[2:])[0].tolist() == [0.5, 0.5]
+        assert cache.stats()['evictions'] == 1
+    
+    def test_shared_directory(self, tmp_path):
+        # Hai instance (như app và job ingest) ghi vào cùng một thư mục
+        first = DiskEmbeddingCache(tmp_path, "test-model")
+        second = DiskEmbeddingCache(tmp_path, "test-model")
+        alpha, beta = first.make_key("alpha"), first.make_key("beta")
+        
+        first.put_many([alpha], [[1.0, 0.0]])
+        second.put_many([beta], [[0.0, 1.0]])
+        keys = [first.make_key(str(i)) for i in range(1500)]
+        second.put_many(keys, [[float(i), 1.0] for i in range(1500)])
+        first.put_many([first.make_key("gamma")], [[0.5, 0.5]])
+        
+        fresh = DiskEmbeddingCache(tmp_path, "test-model")
+        assert fresh.get_many([alpha, beta])[0].tolist() == [1.0, 0.0]
+        assert fresh.get_many([beta])[0].tolist() == [0.0, 1.0]
+        assert first.get_many(keys[-1:])[0].tolist() == [1499.0, 1.0]
+        assert second.get_many([second.make_key("gamma")])[0].tolist() == [0.5, 0.5]
+
+    
+    def test_reads_do_not_write(self, tmp_path):
+        cache = DiskEmbeddingCache(tmp_path, "test-model")
+        key = cache.make_key("a")
+        cache.put_many([key], [[1.0, 0.0]])
+        
+        # Process khác đang giữ khóa ghi: đọc không bị chặn, last_used ghi sau theo lô
+        writer = sqlite3.connect(cache.directory / 'index.sqlite3', isolation_level=None)
+        writer.execute('BEGIN IMMEDIATE')
+        cache._conn.execute('PRAGMA busy_timeout = 100')
+        assert cache.get_many([key])[0].tolist() == [1.0, 0.0]
+        writer.execute('ROLLBACK')
+        writer.close()
+    
+    def test_queries_skip_disk_cache(self, tmp_path):
+        cache = DiskEmbeddingCache(tmp_path, "test-model")
+        embeddings = CachedEmbeddings(HashEmbeddings(), cache)
+        
+        embeddings.embed_query("Học phí bao nhiêu?")
+        embeddings.embed_documents(["Điều 1. Học phí"])
+        stats = cache.stats()
+        assert stats['entries'] == 1 and stats['misses'] == 1
+
+class TestQueryCachedEmbeddings:
+    """Test QueryCachedEmbeddings"""
+    
+    class CountingEmbeddings:
+        def __init__(self):
+            self.calls = 0
+        
+        def embed_query(self, text):
+            self.calls += 1
+            return [float(len(text))]
+    
+    def test_lru_and_ttl(self):
+        model = self.CountingEmbeddings()
+        cache = QueryCachedEmbeddings(model, "test-model", max_entries=2)
+        
+        cache.embed_query("Điều kiện tốt nghiệp?")
+        cache.embed_query("  Điều kiện   tốt nghiệp? ")
+        assert model.calls == 1
+        
+        cache.embed_query("a")
+        cache.embed_query("b")
+        cache.embed_query("Điều kiện tốt nghiệp?")
+        assert model.calls == 4
+        assert cache.stats()['hits'] == 1
+        
+        expired = QueryCachedEmbeddings(model, "test-model", ttl_seconds=0)
+        expired.embed_query("a")
+        expired.embed_query("a")
+        assert expired.stats()['misses'] == 2
+    
+    def test_embed_queries_batches_misses(self):
+        class BatchCountingEmbeddings:
+            def __init__(self):
+                self.batches = []
+            
+            def embed_documents(self, texts):
+                self.batches.append(list(texts))
+                return [[float(len(text))] for text in texts]
+        
+        model = BatchCountingEmbeddings()
+        cache = QueryCachedEmbeddings(model, "test-model")
+        assert cache.embed_queries(["ab", "abc"]) == [[2.0], [3.0]]
+        assert cache.embed_queries(["abc", "abcd", "abcd"]) == [[3.0], [4.0], [4.0]]
+        assert model.batches == [["ab", "abc"], ["abcd"]]
+
+
+class TestBatchEncoder:
+    """Test BatchEncoder"""
+    
+    class RecordingEmbeddings:
+        def __init__(self):
+            self.batches = []
+        
+        def embed_documents(self, texts):
+            self.batches.append(list(texts))
+            return [[float(len(text)), float(sum(map(ord, text)))] for text in texts]
+    
+    def test_length_bucketing_keeps_input_order(self):
+        texts = ["x" * length + str(i) for i, length in enumerate([40, 3, 17, 0, 25, 3, 60, 9, 12, 1, 33])]
+        model = self.RecordingEmbeddings()
+        encoder = BatchEncoder(model, batch_size=4)
+        
+        vectors = encoder.embed_documents(texts)
+        assert vectors == [[float(len(text)), float(sum(map(ord, text)))] for text in texts]
+        
+        # 11 texts / batch 4: hai batch đầy và một batch lẻ, mỗi batch gồm các text dài gần nhau
+        assert [len(batch) for batch in model.batches] == [4, 4, 3]
+        lengths = [len(text) for batch in model.batches for text in batch]
+        assert lengths == sorted(lengths)
+        assert encoder.stats()['texts'] == len(texts)
+        
+        unbucketed = BatchEncoder(self.RecordingEmbeddings(), batch_size=4, length_bucketing=False)
+        assert unbucketed.embed_documents(texts) == vectors
+
+
+class TestEmbeddingProjection:
+    """Test EmbeddingProjection"""
+    
+    def test_pca_round_trip(self, tmp_path):
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(500, 4)) @ rng.normal(size=(4, 16))
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        queries, corpus = vectors[:50], vectors[50:]
+        
+        projection = EmbeddingProjection.fit(corpus, 4)
+        projection.save(tmp_path)
+        loaded = EmbeddingProjection.load(tmp_path)
+        
+        assert loaded.transform(queries).shape == (50, 4)
+        assert np.allclose(loaded.transform(queries), projection.transform(queries))
+        # Dữ liệu có hạng 4 nên chiếu xuống 4 chiều không làm mất kết quả
+        recall = recall_at_k(corpus, queries, loaded.transform(corpus), loaded.transform(queries), k=5)
+        assert recall > 0.99
+
+
+
+class TestOnnxEmbeddings:
+    """Test pooling/normalize của OnnxEmbeddings với session giả (không cần onnxruntime)"""
+    
+    class FakeTokenizer:
+        def __call__(self, texts, padding, truncation, max_length, return_tensors):
+            # Mỗi từ một token, pad bằng 0
+            lengths = [min(len(text.split()), max_length) for text in texts]
+            width = max(lengths)
+            mask = np.array([[1] * n + [0] * (width - n) for n in lengths])
+            return {'input_ids': mask * 7, 'attention_mask': mask, 'token_type_ids': np.zeros_like(mask)}
+    
+    class FakeSession:
+        def __init__(self):
+            self.feeds = []
+        
+        def run(self, output_names, feeds):
+            self.feeds.append(feeds)
+            batch, width = feeds['input_ids'].shape
+            # Hidden state của token j là [j + 1, 1]; token pad mang giá trị lớn
+            hidden = np.zeros((batch, width, 2), dtype=np.float32)
+            hidden[..., 0] = np.arange(1, width + 1)
+            hidden[..., 1] = 1.0
+            hidden[feeds['attention_mask'] == 0] = 100.0
+            return [hidden]
+    
+    def make_embeddings(self, pooling):
+        embeddings = OnnxEmbeddings.__new__(OnnxEmbeddings)
+        embeddings.session = self.FakeSession()
+        embeddings.tokenizer = self.FakeTokenizer()
+        embeddings.input_names = {'input_ids', 'attention_mask'}
+        embeddings.onnx_config = {'dimension': 2}
+        embeddings.pooling = pooling
+        embeddings.batch_size = 2
+        embeddings.max_seq_length = 8
+        return embeddings
+    
+    @pytest.mark.parametrize("pooling, expected", [
+        ("mean", [[2.0, 1.0], [1.0, 1.0], [1.5, 1.0]]),
+        ("cls", [[1.0, 1.0], [1.0, 1.0], [1.0, 1.0]]),
+        ("max", [[3.0, 1.0], [1.0, 1.0], [2.0, 1.0]]),
+    ])
+    def test_pooling_ignores_padding_and_normalizes(self, pooling, expected):
+        embeddings = self.make_embeddings(pooling)
+        
+        vectors = np.array(embeddings.embed_documents(["a b c", "a", "a b"]))
+        
+        expected = np.array(expected)
+        expected /= np.linalg.norm(expected, axis=1, keepdims=True)
+        assert np.allclose(vectors, expected, atol=1e-6)
+        assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0)
+        # batch_size 2: hai lần chạy, chỉ truyền input model nhận
+        assert len(embeddings.session.feeds) == 2
+        assert set(embeddings.session.feeds[0]) == {'input_ids', 'attention_mask'}
+        assert embeddings.session.feeds[0]['input_ids'].dtype == np.int64
+    
+    def test_empty_input(self):
+        assert self.make_embeddings("mean")._encode([]).shape == (0, 2)
+
+class TestNumpyVectorStore:
+    """Test NumpyVectorStore"""
+    
+    class AxisEmbeddings:
+        """Mỗi text là một vector đơn vị theo trục của chữ cái đầu"""
+        
+        def embed_documents(self, texts):
+            return [self.embed_query(text) for text in texts]
+        
+        def embed_query(self, text):
+            vector = [0.0] * 4
+            vector["abcd".index(text[0])] = 1.0
+            return vector
+    
+    def test_search_upsert_and_reload(self, tmp_path):
+        store = NumpyVectorStore(self.AxisEmbeddings())
+        store.add_texts(["a1", "b1", "c1"], metadatas=[{"file_path": "x"}, {"file_path": "y"}, {"file_path": "x"}],
+                        ids=["1", "2", "3"])
+        store.add_texts(["d1"], metadatas=[{"file_path": "y"}], ids=["2"])
+        store.save_local(tmp_path)
+        
+        loaded = NumpyVectorStore.load_local(tmp_path, self.AxisEmbeddings())
+        assert len(loaded) == 3
+        doc, score = loaded.similarity_search_with_score("d", k=1)[0]
+        assert doc.page_content == "d1" and score == pytest.approx(0.0)
+        assert not [d for d in loaded.similarity_search("b", k=3) if d.page_content == "b1"]
+        assert sorted(loaded.get_ids({"file_path": "x"})) == ["1", "3"]
+    
+    def test_batch_search_matches_single(self):
+        store = NumpyVectorStore(self.AxisEmbeddings(), dtype='float16')
+        store.add_texts(["a1", "b1", "c1", "d1"])
+        queries = [store.embedding.embed_query(q) for q in ["c", "a", "d"]]
+        batch = store.similarity_search_with_score_by_vectors(queries, k=2)
+        assert [[d.page_content for d, _ in r] for r in batch] == \
+            [[d.page_content for d, _ in store.similarity_search_with_score_by_vector(q, k=2)] for q in queries]
+        assert batch[0][0][0].page_content == "c1"
+    
+    def test_save_appends_and_compacts_on_delete(self, tmp_path):
+        store = NumpyVectorStore(self.AxisEmbeddings())
+        store.add_texts(["a1", "b1"], ids=["1", "2"])
+        store.save_local(tmp_path)
+        inode = (tmp_path / "vectors.npy").stat().st_ino
+        
+        store.add_texts(["c1"], ids=["3"])
+        store.save_local(tmp_path)
+        assert (tmp_path / "vectors.npy").stat().st_ino == inode
+        
+        # Phần nối dở của một lần save bị ngắt bị bỏ qua khi load và bị cắt ở lần save sau
+        with open(tmp_path / "docstore.jsonl", "ab") as f:
+            f.write(b'{"id": "x", "te')
+        with open(tmp_path / "vectors.npy", "ab") as f:
+            f.write(b"\0" * 6)
+        store = NumpyVectorStore.load_local(tmp_path, self.AxisEmbeddings())
+        assert store.ids == ["1", "2", "3"]
+        store.add_texts(["d1"], ids=["4"])
+        store.save_local(tmp_path)
+        assert NumpyVectorStore.load_local(tmp_path, self.AxisEmbeddings()).similarity_search("d", k=1)[0].page_content == "d1"
+        
+        store.delete(["1"])
+        store.save_local(tmp_path)
+        assert (tmp_path / "vectors.npy").stat().st_ino != inode
+        loaded = NumpyVectorStore.load_local(tmp_path, self.AxisEmbeddings())
+        assert loaded.ids == ["2", "3", "4"]
+        assert [d.page_content for d in loaded.similarity_search("c", k=10)][0] == "c1"
+    
+    def test_generated_ids_and_k(self, tmp_path):
+        store = NumpyVectorStore(self.AxisEmbeddings())
+        first = store.add_texts(["a1", "b1"])
+        store.delete(first[:1])
+        store.save_local(tmp_path)
+        second = store.add_texts(["c1"])
+        
+        assert len(set(first + second)) == 3
+        assert sorted(d.page_content for d in store.similarity_search("a", k=10)) == ["b1", "c1"]
+        assert store.similarity_search("a", k=0) == []
+
+
+
+class TestAnnIndex:
+    """Test cấu hình index ANN"""
+    
+    def test_faiss_settings(self):
+        assert faiss_factory_string(faiss_index_settings({})) == "Flat"
+        settings = faiss_index_settings({'index_type': 'ivf_pq', 'nlist': 64, 'pq_m': 8, 'ef_search': 10})
+        assert faiss_factory_string(settings) == "IVF64,PQ8x8"
+        assert 'ef_search' not in settings and settings['nprobe'] == 16
+        assert faiss_factory_string(faiss_index_settings({'index_type': 'hnsw', 'hnsw_m': 48})) == "HNSW48"
+        with pytest.raises(ValueError):
+            faiss_index_settings({'index_type': 'lsh'})
+    
+    def test_chroma_metadata(self):
+        metadata = chroma_collection_metadata({'distance_metric': 'cosine', 'chroma': {'search_ef': 128}})
+        assert metadata['hnsw:space'] == 'cosine' and metadata['hnsw:search_ef'] == 128
+    
+    def test_ivf_reconstruct_by_label(self):
+        pytest.importorskip("faiss")
+        vectors = np.random.default_rng(0).random((500, 8), dtype=np.float32)
+        index = build_faiss_index(vectors, faiss_index_settings({'index_type': 'ivf_flat', 'nlist': 4}))
+        index.add_with_ids(vectors, np.arange(1000, 1500, dtype=np.int64))
+        
+        with faiss_reconstructable(index):
+            assert np.allclose(index.reconstruct(1003), vectors[3])
+        index.remove_ids(np.array([1003], dtype=np.int64))
+        assert index.ntotal == 499
+    
+    @pytest.mark.parametrize("index_type", ["flat", "ivf_pq"])
+    def test_remove_ids_keeps_labels(self, index_type):
+        pytest.importorskip("faiss")
+        vectors = np.random.default_rng(0).random((500, 8), dtype=np.float32)
+        settings = faiss_index_settings({'index_type': index_type, 'nlist': 4, 'nprobe': 4, 'pq_m': 4})
+        index = build_faiss_index(vectors, settings)
+        index.add_with_ids(vectors, np.arange(500, dtype=np.int64))
+        _, before = index.search(vectors[[1, 250]], 3)
+        
+        index.remove_ids(np.array([0, 10, 499], dtype=np.int64))
+        _, after = index.search(vectors[[1, 250]], 3)
+        assert index.ntotal == 497
+        # Label của vector còn lại không đổi, mã PQ không bị quantize lại
+        assert after.tolist() == before.tolist()
+    
+    def test_legacy_flat_gets_ids(self):
+        faiss = pytest.importorskip("faiss")
+        vectors = np.random.default_rng(0).random((20, 8), dtype=np.float32)
+        legacy = faiss.IndexFlatL2(8)
+        legacy.add(vectors)
+        
+        index = with_faiss_ids(legacy)
+        index.remove_ids(np.array([0], dtype=np.int64))
+        _, found = index.search(vectors[[5]], 1)
+        assert found[0, 0] == 5
+
+
+
+def write_pdf(path, page_texts):
+    """PDF tối thiểu: mỗi phần tử là text của một trang (None: trang không có text như bản scan)"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in page_texts:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode('latin-1') if text else b""
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects))
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), len(kids))
+    
+    data = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(data))
+        data += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(data)
+    data += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    data += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    data += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(data)
+
+
+@pytest.fixture
+def ocr_module():
+    """scripts/ocr_pdfs.py (bỏ qua nếu thiếu dependency OCR)"""
+    for name in ("pdfplumber", "pytesseract", "pdf2image", "PIL"):
+        pytest.importorskip(name)
+    path = Path(__file__).parent.parent / "scripts" / "ocr_pdfs.py"
+    spec = importlib.util.spec_from_file_location("ocr_pdfs", path)
+    module = importlib.util.module_from_spec(spec)
+    # Đăng ký theo tên để worker process unpickle được ocr_window
+    sys.modules["ocr_pdfs"] = module
+    spec.loader.exec_module(module)
+    yield module
+    sys.modules.pop("ocr_pdfs", None)
+
+
+class TestOCR:
+    """Test scripts/ocr_pdfs.py"""
+    
+    def test_cache_keys(self, ocr_module):
+        options = dict(ocr_module.DEFAULT_OCR_OPTIONS)
+        key = ocr_module.OCRCache.make_key("abc", 1, ocr_module.ocr_signature(options))
+        
+        assert key == ocr_module.OCRCache.make_key("abc", 1, ocr_module.ocr_signature(dict(options)))
+        assert key != ocr_module.OCRCache.make_key("abc", 2, ocr_module.ocr_signature(options))
+        assert key != ocr_module.OCRCache.make_key("abd", 1, ocr_module.ocr_signature(options))
+        assert key != ocr_module.OCRCache.make_key("abc", 1, ocr_module.ocr_signature({**options, 'dpi': 200}))
+        assert key != ocr_module.OCRCache.make_key("abc", 1, ocr_module.ocr_signature({**options, 'deskew': True}))
+    
+    def test_cache_hit_miss_and_eviction(self, ocr_module, tmp_path):
+        cache = ocr_module.OCRCache(tmp_path, max_bytes=250)
+        assert cache.get("k1") is None
+        
+        cache.put("k1", "a" * 100)
+        cache.put("k2", "b" * 100)
+        assert cache.get("k1") == "a" * 100
+        # k2 được dùng lâu nhất: bị xóa khi vượt dung lượng
+        os.utime(cache._path("k2"), (0, 0))
+        cache.put("k3", "c" * 100)
+        
+        assert cache.get("k2") is None
+        assert cache.get("k1") == "a" * 100 and cache.get("k3") == "c" * 100
+        stats = cache.stats()
+        assert stats['evictions'] == 1 and stats['hits'] == 3 and stats['misses'] == 2
+        assert ocr_module.OCRCache(tmp_path, max_bytes=250).total_bytes == 200
+    
+    def test_classify_mixed_pdf(self, ocr_module, tmp_path):
+        pdf_path = tmp_path / "mixed.pdf"
+        write_pdf(pdf_path, ["Quy dinh hoc vu " * 8, None, "Dieu 2 hoc phi " * 8])
+        
+        native_text = ocr_module.classify_pages(str(pdf_path), min_chars=50, min_density=0.5)
+        
+        assert [text is not None for text in native_text] == [True, False, True]
+        assert "Quy dinh hoc vu" in native_text[0]
+    
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_windowed_pages_keep_order(self, ocr_module, monkeypatch, workers):
+        def fake_rasterize(pdf_path, first_page, last_page, dpi, options):
+            return list(range(first_page, last_page + 1))
+        
+        def fake_image_to_string(image, lang):
+            # Cửa sổ đầu về muộn nhất: kết quả vẫn phải theo thứ tự trang
+            time.sleep(0.3 if image <= 2 else 0.0)
+            return f"trang {image}"
+        
+        monkeypatch.setattr(ocr_module, "rasterize", fake_rasterize)
+        monkeypatch.setattr(ocr_module.pytesseract, "image_to_string", fake_image_to_string)
+        options = {**ocr_module.DEFAULT_OCR_OPTIONS, 'workers': workers, 'window_size': 2}
+        pages = [1, 2, 3, 5, 6, 7, 9]
+        
+        results = list(ocr_module.iter_ocr_pages("scan.pdf", pages, options))
+        
+        assert results == [(page, f"trang {page}") for page in pages]
+    
+    def test_auto_dpi_cache_key_uses_chosen_dpi(self, ocr_module, monkeypatch, tmp_path):
+        pdf_path = tmp_path / "scan.pdf"
+        write_pdf(pdf_path, [None, None])
+        chosen = []
+        
+        def fake_choose_dpi(path, probe_page, options):
+            chosen.append(probe_page)
+            return 200
+        
+        monkeypatch.setattr(ocr_module, "get_page_count", lambda path: 2)
+        monkeypatch.setattr(ocr_module, "choose_dpi", fake_choose_dpi)
+        monkeypatch.setattr(ocr_module, "rasterize",
+                            lambda path, first, last, dpi, options: [f"{page}@{dpi}" for page in range(first, last + 1)])
+        monkeypatch.setattr(ocr_module.pytesseract, "image_to_string", lambda image, lang: f"trang {image}")
+        cache = ocr_module.OCRCache(tmp_path / "cache", max_bytes=1 << 20)
+        options = {**ocr_module.DEFAULT_OCR_OPTIONS, 'dpi': 'auto'}
+        
+        ocr_module.ocr_pdf(str(pdf_path), str(tmp_path / "scan_ocr.txt"), options=options, cache=cache)
+        ocr_module.ocr_pdf(str(pdf_path), str(tmp_path / "again_ocr.txt"), options=options, cache=cache)
+        
+        # DPI được chọn một lần, các trang được cache với key chứa DPI thực tế
+        assert chosen == [1]
+        key = ocr_module.OCRCache.make_key(
+            ocr_module.file_sha256(str(pdf_path)), 1, ocr_module.ocr_signature({**options, 'dpi': 200}))
+        assert cache.get(key) == "trang 1@200"
+        assert (tmp_path / "again_ocr.txt").read_text(encoding='utf-8') == \
+            (tmp_path / "scan_ocr.txt").read_text(encoding='utf-8')
+    
+    def test_output_path(self, ocr_module):
+        assert ocr_module.ocr_output_path(Path("data/documents/quy.pdf.dinh.PDF")) == \
+            Path("data/documents/quy.pdf.dinh_ocr.txt")
+
+class TestJobQueue:
+    """Test JobQueue"""
+    
+    def test_lifecycle(self, tmp_path):
+        queue = JobQueue(tmp_path / "jobs.sqlite3")
+        first = queue.enqueue("a.pdf")
+        second = queue.enqueue("b.pdf")
+        
+        job = queue.claim_next()
+        assert job['id'] == first and job['status'] == 'running'
+        assert queue.get(first)['owner'] == queue.owner
+        queue.update_progress(first, 0.5, 'Đang embed')
+        queue.finish(first, 12)
+        assert queue.get(first)['status'] == 'done' and queue.get(first)['num_chunks'] == 12
+        
+        assert queue.claim_next()['id'] == second
+        queue.fail(second, "hỏng")
+        assert queue.get(second)['status'] == 'failed' and queue.get(second)['error'] == "hỏng"
+        assert queue.claim_next() is None
+    
+    def test_requeue_only_stale_jobs(self, tmp_path):
+        import sqlite3
+        import subprocess
+        
+        queue = JobQueue(tmp_path / "jobs.sqlite3", stale_after=60)
+        live, old, orphaned = (queue.enqueue(name) for name in ["a.pdf", "b.pdf", "c.pdf"])
+        for _ in range(3):
+            queue.claim_next()
+        
+        # Job của một worker khác đang chạy không bị đưa lại hàng đợi
+        assert queue.requeue_stale() == 0
+        
+        finished = subprocess.Popen([sys.executable, "-c", "pass"])
+        finished.wait()
+        host = queue.owner.rpartition(':')[0]
+        with sqlite3.connect(queue.db_path) as conn:
+            conn.execute("UPDATE jobs SET updated_at = ? WHERE id = ?", (time.time() - 120, old))
+            conn.execute("UPDATE jobs SET owner = ? WHERE id = ?", (f"{host}:{finished.pid}", orphaned))
+        
+        assert queue.requeue_stale() == 2
+        assert [queue.get(job_id)['status'] for job_id in (live, old, orphaned)] == ['running', 'queued', 'queued']
+        assert queue.claim_next()['id'] == old
+
+class TestRegulationTextSplitter:
+    """Test RegulationTextSplitter"""
+    
+    TEXT = (
+        "--- Trang 1 ---\n"
+        "Chương I\nQUY ĐỊNH CHUNG\n"
+        "Điều 1. Phạm vi điều chỉnh\n"
+        "1. Quy định này áp dụng cho sinh viên hệ chính quy của trường.\n"
+        "--- Trang 2 ---\n"
+        "Điều 2. Giải thích từ ngữ\n"
+        "1. Tín chỉ là đơn vị đo khối lượng học tập của sinh viên.\n"
+        "2. Học phần là tập hợp hoạt động giảng dạy và học tập.\n"
+    )
+    
+    def test_one_chunk_per_article(self):
+        config = load_config()
+        fallback = DocumentProcessor(config).text_splitter
+        splitter = RegulationTextSplitter(chunk_size=1000, fallback_splitter=fallback)
+        
+        chunks = splitter.split_documents([Document(page_content=self.TEXT, metadata={"source": "qd.txt"})])
+        
+        assert [c.metadata['dieu'] for c in chunks] == ["Điều 1", "Điều 2"]
+        assert chunks[0].metadata['article_path'] == "Chương I > Điều 1 > Khoản 1"
+        assert chunks[1].metadata['page'] == 2
+        assert "--- Trang" not in chunks[1].page_content
+    
+    def test_long_article_split_by_clause(self):
+        config = load_config()
+        fallback = DocumentProcessor(config).text_splitter
+        splitter = RegulationTextSplitter(chunk_size=90, fallback_splitter=fallback)
+        
+        chunks = splitter.split_documents([Document(page_content=self.TEXT, metadata={"source": "qd.txt"})])
+        clause_chunks = [c for c in chunks if c.metadata['dieu'] == "Điều 2"]
+        
+        assert [c.metadata['article_path'] for c in clause_chunks] == [
+            "Chương I > Điều 2 > Khoản 1", "Chương I > Điều 2 > Khoản 2"
+        ]
+        assert all(c.page_content.startswith("Điều 2.") for c in clause_chunks)
+        assert all(len(c.page_content) <= 90 for c in chunks)
+
+
+class TestNearDuplicateFilter:
+    """Test NearDuplicateFilter"""
+    
+    def test_keeps_one_representative(self):
+        text = " ".join(f"từ{i}" for i in range(120))
+        near_copy = text.replace("từ60", "khác")
+        other = " ".join(f"chữ{i}" for i in range(120))
+        
+        dedup = NearDuplicateFilter(threshold=0.8)
+        kept = dedup.filter_documents([
+            Document(page_content=text, metadata={"source": "a.txt", "file_path": "docs/a.txt"}),
+            Document(page_content=near_copy, metadata={"source": "b.txt", "file_path": "docs/b.txt"}),
+            Document(page_content=other, metadata={"source": "a.txt", "file_path": "docs/a.txt"}),
+        ])
+        
+        assert [d.page_content for d in kept] == [text, other]
+        assert kept[0].metadata['duplicate_sources'] == "b.txt"
+        assert dedup.duplicate_files == {"docs/a.txt": ["docs/b.txt"]}
+        assert dedup.stats()['duplicates'] == 1
+
+
+class TestTextCleaner:
+    """Test TextCleaner"""
+    
+    def test_removes_repeated_header_and_page_numbers(self):
+        bodies = ["Phạm vi áp dụng.", "Đối tượng áp dụng.", "Giải thích từ ngữ.", "Hiệu lực thi hành."]
+        pages = [
+            f"--- Trang {i} ---\nTRƯỜNG ĐẠI HỌC KHXH&NV\nĐiều {i}. Nội dung\n{body}\n{i}"
+            for i, body in enumerate(bodies, start=1)
+        ]
+        text = "\n\n".join(pages)
+        
+        cleaned, stats = TextCleaner().clean_documents([Document(page_content=text, metadata={"source": "a.txt"})])
+        content = cleaned[0].page_content
+        
+        assert "TRƯỜNG ĐẠI HỌC" not in content
+        assert "Điều 4. Nội dung\nHiệu lực thi hành." in content
+        assert content.count("--- Trang") == 4
+        assert "\n4\n" not in content + "\n"
+        assert stats['bytes_after'] < stats['bytes_before']
+
+
+class HashEmbeddings:
+    """Embedding giả: vector ngẫu nhiên cố định theo nội dung text"""
+    
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+    
+    def embed_query(self, text):
+        rng = np.random.default_rng(zlib.crc32(text.encode('utf-8')))
+        return rng.standard_normal(8).tolist()
+
+
+@pytest.fixture
+def numpy_manager(tmp_path, monkeypatch):
+    """EmbeddingManager với numpy vectorstore trong tmp_path và HashEmbeddings"""
+    config = copy.deepcopy(load_config())
+    config['embedding'].update(cache={'enabled': False}, query_cache={'enabled': False},
+                               projection={'enabled': False}, index_batch_size=4)
+    config['vectorstore'].update(type='numpy', persist_directory=str(tmp_path / "vectorstore"),
+                                 checkpoint_every=1)
+    monkeypatch.setattr(EmbeddingManager, '_initialize_embeddings', lambda self: HashEmbeddings())
+    return EmbeddingManager(config, {})
+
+
+def make_chunks(file_path, texts):
+    return [
+        Document(page_content=text, metadata={'file_path': file_path, 'chunk_id': f"{file_path}#{i}"})
+        for i, text in enumerate(texts)
+    ]
 
 
 class TestEmbeddingManager:
@@ -52,6 +970,115 @@ class TestEmbeddingManager:
         
         manager = EmbeddingManager(config, env)
         assert manager.embeddings is not None
+    
+    def test_create_vectorstore_uses_faiss_settings(self, numpy_manager, tmp_path):
+        pytest.importorskip("faiss")
+        config = copy.deepcopy(numpy_manager.config)
+        config['vectorstore'].update(type='faiss', persist_directory=str(tmp_path / "faiss"),
+                                     faiss={'index_type': 'ivf_flat', 'nlist': 2, 'train_size': 100})
+        manager = EmbeddingManager(config, {})
+        
+        # Chưa có vectorstore: upsert tạo mới, index phải theo vectorstore.faiss
+        manager.upsert_documents(make_chunks("docs/a.txt", [f"Điều {i}. Quy định số {i}" for i in range(40)]))
+        
+        assert type(manager.vectorstore.index).__name__ == 'IndexIVFFlat'
+        assert json.loads((tmp_path / "faiss" / "index_config.json").read_text())['index_type'] == 'ivf_flat'
+        assert manager.similarity_search("Điều 7. Quy định số 7", k=1)[0].metadata['chunk_id'] == "docs/a.txt#7"
+    
+    def test_replace_source_writes_before_deleting(self, numpy_manager, monkeypatch):
+        numpy_manager.upsert_documents(make_chunks("docs/a.txt", [f"Điều {i}. Quy định cũ" for i in range(6)]))
+        saves = []
+        monkeypatch.setattr(numpy_manager.vectorstore, 'save_local',
+                            lambda directory: saves.append(len(numpy_manager.vectorstore._row_of)))
+        
+        # Chunk 0-1 giữ nguyên ID, 2-5 bị thay bằng 2 chunks mới (10 chunks mới ghi trong 3 batch)
+        chunks = make_chunks("docs/a.txt", [f"Điều {i}. Quy định cũ" for i in range(2)])
+        chunks += [Document(page_content=f"Điều {i}. Quy định mới", metadata={'file_path': "docs/a.txt",
+                                                                            'chunk_id': f"new#{i}"})
+                   for i in range(8)]
+        progress = []
+        assert numpy_manager.replace_source("docs/a.txt", chunks, on_batch=progress.append) == 4
+        
+        assert progress == [4, 8, 10]
+        assert saves == [10]
+        assert sorted(numpy_manager.vectorstore._row_of) == sorted(c.metadata['chunk_id'] for c in chunks)
+    
+    def test_ingest_report(self, numpy_manager, tmp_path):
+        docs_dir = tmp_path / "docs"
+        docs_dir.mkdir()
+        for i in range(3):
+            (docs_dir / f"doc_{i}.txt").write_text(f"Điều {i}. Quy định số {i}. " * (40 * (i + 1)), encoding='utf-8')
+        processor = DocumentProcessor(numpy_manager.config)
+        chunks = processor.process_documents(str(docs_dir))
+        numpy_manager.build_vectorstore(chunks)
+        chunk_counts = {}
+        for chunk in chunks:
+            chunk_counts[chunk.metadata['file_path']] = chunk_counts.get(chunk.metadata['file_path'], 0) + 1
+        
+        report = build_ingest_report(numpy_manager.config, processor, numpy_manager, chunk_counts,
+                                     {'process': 0.123456789, 'index': 2.5}, slowest_files=2)
+        path = save_ingest_report(report, tmp_path / "reports")
+        saved = json.loads(path.read_text(encoding='utf-8'))
+        print_ingest_summary(saved)
+        
+        assert set(saved) == {'created_at', 'mode', 'settings', 'stages', 'totals', 'dedup', 'embedding',
+                              'embedding_encoder', 'embedding_cache', 'slowest_files', 'files'}
+        assert saved['stages'] == {'process': 0.1235, 'index': 2.5}
+        assert saved['totals']['files'] == 3 and saved['totals']['failed_files'] == 0
+        assert saved['totals']['chunks'] == saved['totals']['indexed_chunks'] == len(chunks)
+        assert saved['embedding']['vectors'] == len(chunks)
+        assert len(saved['slowest_files']) == 2
+        for entry in saved['files']:
+            assert entry['total_seconds'] == pytest.approx(entry['load_seconds'] + entry['split_seconds'], abs=1e-3)
+            assert entry['indexed_chunks'] == chunk_counts[entry['file']]
+    
+    def test_faiss_hnsw_reports_no_delete(self, numpy_manager, tmp_path):
+        pytest.importorskip("faiss")
+        config = copy.deepcopy(numpy_manager.config)
+        config['vectorstore'].update(type='faiss', persist_directory=str(tmp_path / "faiss"),
+                                     faiss={'index_type': 'hnsw'})
+        manager = EmbeddingManager(config, {})
+        manager.upsert_documents(make_chunks("docs/a.txt", ["Điều 1. Học phí", "Điều 2. Học bổng"]))
+        
+        reloaded = EmbeddingManager(config, {})
+        assert reloaded.load_vectorstore()
+        assert not reloaded.supports_delete()
+        with pytest.raises(ValueError, match="HNSW"):
+            reloaded.delete_by_source("docs/a.txt")
+    
+    def test_build_resumes_after_interruption(self, numpy_manager, tmp_path, monkeypatch):
+        chunks = make_chunks("docs/a.txt", [f"Điều {i}. Quy định số {i}" for i in range(18)])
+        
+        def interrupted():
+            for i, chunk in enumerate(chunks):
+                if i == 10:
+                    raise RuntimeError("ngắt")
+                yield chunk
+        
+        # batch 4, checkpoint mỗi batch: 2 batch đầy đủ đã commit trước khi bị ngắt
+        with pytest.raises(RuntimeError, match="ngắt"):
+            numpy_manager.build_vectorstore(interrupted())
+        build_dir = Path(numpy_manager.build_directory)
+        progress = json.loads((build_dir / 'build_progress.json').read_text())
+        assert progress['committed'] == 8
+        assert not Path(numpy_manager.persist_directory).exists()
+        
+        written = []
+        write_batch = EmbeddingManager._write_batch
+        monkeypatch.setattr(EmbeddingManager, '_write_batch',
+                            lambda self, batch: (written.extend(d.metadata['chunk_id'] for d in batch),
+                                                 write_batch(self, batch)))
+        assert numpy_manager.build_vectorstore(iter(chunks)) == 18
+        assert written == [c.metadata['chunk_id'] for c in chunks[8:]]
+        assert not build_dir.exists()
+        
+        config = copy.deepcopy(numpy_manager.config)
+        config['vectorstore']['persist_directory'] = str(tmp_path / "uninterrupted")
+        reference = EmbeddingManager(config, {})
+        reference.build_vectorstore(iter(chunks))
+        
+        assert numpy_manager.vectorstore.ids == reference.vectorstore.ids
+        assert np.array_equal(numpy_manager.vectorstore._matrix, reference.vectorstore._matrix)
 
 
 def test_config_loading():